@@ -0,0 +1,71 @@
+'''benchmark: fused TextCleaner.process vs the step-by-step process_multipass
+on the test_file/ corpus (docx paragraphs joined as the scorer does, PDF text
+layers). Fails if the two outputs differ anywhere.
+
+    python scripts/bench_clean.py [corpus_dir] [--rounds N]
+'''
+import argparse
+import glob
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import fitz
+
+from src.preprocess.Clean import TextCleaner
+from src.preprocess.DocCache import load_docx_cached
+
+DEFAULT_CORPUS = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "test_file"))
+
+
+def load_corpus(root):
+    texts = []
+    for path in sorted(glob.glob(os.path.join(root, "**", "*"), recursive=True)):
+        ext = os.path.splitext(path)[1].lower()
+        if ext == ".docx":
+            doc = load_docx_cached(path)
+            texts.append("\n".join(p["text"] for p in doc["paragraphs"]))
+        elif ext == ".pdf":
+            with fitz.open(path) as pdf:
+                texts.append("\n".join(page.get_text("text") for page in pdf))
+    return [t for t in texts if t]
+
+
+def timed(fn, texts, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for t in texts:
+            fn(t)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("corpus", nargs="?", default=DEFAULT_CORPUS)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    texts = load_corpus(args.corpus)
+    if not texts:
+        raise SystemExit(f"[EXIT] No .docx/.pdf text found under {args.corpus}")
+    cleaner = TextCleaner()
+    for t in texts:
+        if cleaner.process(t) != cleaner.process_multipass(t):
+            raise SystemExit("[EXIT] Fused output differs from process_multipass")
+
+    chars = sum(len(t) for t in texts)
+    paras = sum(len(cleaner.process(t)["paragraphs"]) for t in texts)
+    print(f"[INFO] {len(texts)} document(s), {chars} chars, {paras} paragraphs; outputs identical")
+    old = timed(cleaner.process_multipass, texts, args.rounds)
+    new = timed(cleaner.process, texts, args.rounds)
+    print(f"[INFO] process_multipass: {old * 1000:8.2f} ms  ({chars / old / 1e6:.1f} M chars/s)")
+    print(f"[INFO] process (fused):   {new * 1000:8.2f} ms  ({chars / new / 1e6:.1f} M chars/s)")
+    print(f"[INFO] speed-up: {old / new:.2f}x (best of {args.rounds} rounds)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,7 @@
 import os
 import re
+import time
+import uuid
 BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 
 TOTAL_SCORE = 30
@@ -42,12 +44,57 @@ MARKED_ASSIGN_DIR = os.path.join(MARKED_DIR, "assignments/")
 LLM_PREDICTION_DIR = os.path.join(BASE_DIR, "artifacts/prediction/")
 TEST_DIR = os.path.join(BASE_DIR, "data/test")
 LLM_PREDICTION = os.path.join(LLM_PREDICTION_DIR,"assignements_score.json") #marked by llm
+SCORE_CACHE_DIR = os.path.join(LLM_PREDICTION_DIR, "cache") # content-hash keyed results per assignment
 # LLM_PREDICTION_DIR =  os.path.abspath(os.path.join(BASE_DIR, "../backend/marking_result"))
 # TEST_DIR =os.path.abspath(os.path.join(BASE_DIR, "../backend/uploads"))
 # LLM_PREDICTION = os.path.join(LLM_PREDICTION_DIR, "ai_latest_results.json") #marked by llm
 TEST_IMAGES = os.path.join(TEST_DIR, "images/")
 
 
+def score_cache_path(assignment_id) -> str:
+    return os.path.join(SCORE_CACHE_DIR, f"assignment_{assignment_id}.json")
+
+
+WORKSPACE_ROOT = os.path.join(BASE_DIR, "workspaces") # one folder per pipeline run
+
+
+def workspace_paths(workspace_dir: str | None = None) -> dict:
+    """
+    Input/output locations of one pipeline run.
+    Without a workspace the legacy shared folders are returned. Rubric
+    artifacts (RUBRIC_DIR) and the score cache stay shared between runs.
+    """
+    if not workspace_dir:
+        return {
+            "root": None,
+            "test_dir": TEST_DIR,
+            "test_images": TEST_IMAGES,
+            "marked_dir": MARKED_DIR,
+            "prediction_dir": LLM_PREDICTION_DIR,
+            "prediction": LLM_PREDICTION,
+        }
+    test_dir = os.path.join(workspace_dir, "data", "test")
+    prediction_dir = os.path.join(workspace_dir, "prediction")
+    return {
+        "root": workspace_dir,
+        "test_dir": test_dir,
+        "test_images": os.path.join(test_dir, "images"),
+        "marked_dir": os.path.join(workspace_dir, "data", "marked"),
+        "prediction_dir": prediction_dir,
+        "prediction": os.path.join(prediction_dir, "assignements_score.json"),
+    }
+
+
+def create_workspace(label: str) -> dict:
+    """Create a fresh, uniquely named workspace under WORKSPACE_ROOT."""
+    safe = re.sub(r"[^A-Za-z0-9_.-]+", "_", label) or "run"
+    name = f"{safe}-{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+    paths = workspace_paths(os.path.join(WORKSPACE_ROOT, name))
+    for key in ("test_dir", "marked_dir", "prediction_dir"):
+        os.makedirs(paths[key], exist_ok=True)
+    return paths
+
+
 def extract_student_id(filename: str) -> str | None:
     m = re.search(r"[zZ]\d{7}", filename or "")
     return m.group(0).lower() if m else None
@@ -9,32 +9,59 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
 
 import AI.scripts.config as cfg
 from src.preprocess.Clean import TextCleaner
-from src.preprocess.Loader import DataLoader
+from src.preprocess.DocCache import doc_cache_stats, stats_since
+from src.preprocess.Loader import DataLoader, ocr_cache_stats
 from src.LLM.LLM_Client import LLMClient
 
-def run_predict_pipeline(course_id: int | None = None, backend_url: str = "http://localhost:8000"):
+def run_predict_pipeline(course_id: int | None = None, backend_url: str = "http://localhost:8000",
+                         cache_path: str | None = None, cancel_token=None, progress=None,
+                         workspace: str | None = None, manifest: list | None = None):
     """
     Run the AI grading pipeline.
     If course_id is provided, upload results to backend marking_result.
+    cache_path selects the score cache used to skip unchanged students.
+    cancel_token (optional) is checked between students and LLM retries;
+    its check() raises to abort the run.
+    progress(done, total, message) (optional) is called as students finish.
+    workspace selects the run's own input/output folders (see
+    cfg.workspace_paths); without it the shared data/test folder is used.
+    manifest (optional) lists the submissions to score as dicts with zid,
+    path, sha256, mime and filename; the files are read where they are and
+    the input folder is not scanned.
+    The summary's "cache" entry holds what this run did to the OCR page and
+    parsed-document caches; their counters live in this process only.
     """
+    ocr_before, doc_before = ocr_cache_stats(), doc_cache_stats()
+    paths = cfg.workspace_paths(workspace)
     prompt_path = os.path.join(cfg.PROMPT_DIR, "teacher_guided_scoring.md")
     if not os.path.exists(prompt_path):
         raise FileNotFoundError(f"Prompt template not found: {prompt_path}")
     scorer = TeacherGuidedScorer(
         rubric_path=cfg.RUBRIC_GENERATION_PATH,
         teacher_style_path=cfg.RUBRIC_TEACHER_PATH,
-        output_dir=cfg.LLM_PREDICTION_DIR,
-        prompt_template=prompt_path
+        output_dir=paths["prediction_dir"],
+        prompt_template=prompt_path,
+        images_dir=paths["test_images"],
     )
-    if not os.path.exists(cfg.TEST_DIR):
-        raise FileNotFoundError(f"Input directory not found: {cfg.TEST_DIR}")
+    output_summary = paths["prediction"]
+    if manifest is not None:
+        print(f"[INFO] Scoring {len(manifest)} submission(s) from manifest")
+        summary = scorer.process_manifest(manifest, output_summary, cache_path=cache_path,
+                                          cancel_token=cancel_token, progress=progress)
     else:
-        print(f"[INFO] Found test assignments in: {cfg.TEST_DIR}")
-    output_summary = cfg.LLM_PREDICTION
-    summary = scorer.process_folder(cfg.TEST_DIR, output_summary)
+        if not os.path.exists(paths["test_dir"]):
+            raise FileNotFoundError(f"Input directory not found: {paths['test_dir']}")
+        else:
+            print(f"[INFO] Found test assignments in: {paths['test_dir']}")
+        summary = scorer.process_folder(paths["test_dir"], output_summary, cache_path=cache_path,
+                                        cancel_token=cancel_token, progress=progress)
     results = summary.get("results") if isinstance(summary, dict) else summary
     failed_students = summary.get("failed_students", []) if isinstance(summary, dict) else []
+    reused = summary.get("reused", 0) if isinstance(summary, dict) else 0
     print(f"[INFO] All results saved to: {output_summary}")
+    cache = {"ocr": stats_since(ocr_before, ocr_cache_stats()),
+             "doc": stats_since(doc_before, doc_cache_stats())}
+    print(f"[INFO] Cache use this run: {cache}")
 
     # Normalize result records for downstream uploads (legacy path)
     if isinstance(results, dict):
@@ -85,6 +112,8 @@ def run_predict_pipeline(course_id: int | None = None, backend_url: str = "http:
     return {
         "results": results,
         "failed_students": failed_students,
+        "reused": reused,
+        "cache": cache,
         "output_path": output_summary,
     }
 
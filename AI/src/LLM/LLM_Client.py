@@ -34,10 +34,12 @@ class LLMClient:
         combined_json_str = json.dumps(data, ensure_ascii=False, indent=2)
         return  promt_txt.replace(location, combined_json_str)
     
-    def call_llm(self, prompt,as_json, temperature, max_retries,output_path, timeout: Optional[int] = None):
+    def call_llm(self, prompt,as_json, temperature, max_retries,output_path, timeout: Optional[int] = None,
+                 cancel_token=None):
         print("[INFO] Calling LLM...")
         req_timeout = timeout or self.request_timeout
         for attempt in range(1, max_retries + 1):
+            self._check_cancel(cancel_token)
             try:
                 response = self.client.chat.completions.create(
                     model=self.model,
@@ -60,12 +62,14 @@ class LLMClient:
                     self._save_log(prompt, {"error": str(e)}, success=False)
                     raise RuntimeError("LLM call failed after maximum retries.") from e
                 
-    def call_llm_with_images(self, prompt, image_inputs, as_json, temperature, max_retries, timeout: Optional[int] = None):
+    def call_llm_with_images(self, prompt, image_inputs, as_json, temperature, max_retries, timeout: Optional[int] = None,
+                             cancel_token=None):
 
         print("[INFO] Calling GPT with multimodal inputs...")
 
         req_timeout = timeout or self.request_timeout
         for attempt in range(1, max_retries + 1):
+            self._check_cancel(cancel_token)
             try:
                 messages = [
                     {
@@ -95,6 +99,12 @@ class LLMClient:
                     self._save_log(prompt, {"error": str(e)}, success=False)
                     raise RuntimeError("LLM multimodal call failed after maximum retries.") from e
 
+    @staticmethod
+    def _check_cancel(cancel_token) -> None:
+        """Stop retrying once the caller's job was cancelled or timed out."""
+        if cancel_token is not None:
+            cancel_token.check()
+
     def save_result(self,result, output_path):
         os.makedirs(os.path.dirname(output_path), exist_ok=True)  
 
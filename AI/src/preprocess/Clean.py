@@ -20,6 +20,9 @@ class TextCleaner:
         self.num_head  = re.compile(r"^\s*(\d+[\.\)]|\(\d+\)|[IVXLCM]+\.)\s+")
         self.trail_col = re.compile(r"[:：]\s*$")
         self.punct     = re.compile(r"[^\w\s]")  
+        # Fused path (process): without url/html/email triggers, the ctrl, markdown
+        # and whitespace steps of basic_clean all turn runs into one space.
+        self.blank_run = re.compile(r"[\s\x00-\x1F\x7F#*_>`]+")
         # print('initial finished')
 #(1) hyphenation & diplicate
     def fix_hyphenation(self, text):
@@ -63,7 +66,8 @@ class TextCleaner:
 
         return score >= 3  # Adjustable threshold
     def segment(self, text):
-        lines = [ln.strip() for ln in text.split("\n") if ln.strip()]
+        return self.segment_lines([ln.strip() for ln in text.split("\n") if ln.strip()])
+    def segment_lines(self, lines):
         paragraphs, bucket = [], []
 
         for i, ln in enumerate(lines):
@@ -107,7 +111,42 @@ class TextCleaner:
         return text
 
 #(5) all process
+    def dedup_lines(self, text):
+        """rm_duplicate + the line split of segment in one sweep: stripped, non-empty, no line equal to the one before."""
+        lines, prev = [], None
+        for ln in text.split("\n"):
+            ln = ln.strip()
+            if ln and ln != prev:
+                lines.append(ln)
+            prev = ln
+        return lines
+    def clean_paragraph(self, para):
+        """basic_clean + unicode_normalize + case_number_normalize, same output, fewer passes."""
+        if "://" in para or "<" in para or "@" in para or "www." in para.lower():
+            text = self.basic_clean(para)  # order of the url/html/md/email subs matters here
+        else:
+            text = self.blank_run.sub(" ", para).strip()
+        if not text.isascii():  # NFKC and the quote/dash replacements only touch non-ASCII
+            text = self.unicode_normalize(text)
+        if "," in text:
+            text = self.thousands.sub("", text)
+        return text.lower()
     def process(self, text):
+        if not text: 
+            return {"full_text": "", "paragraphs": []}
+        if "-\n" in text:
+            text = self.fix_hyphenation(text)
+        text = self.segment_lines(self.dedup_lines(text))
+        cleaned_paras = []
+        for i, item in enumerate(text["paragraphs"], start=1):
+            para = item.get("text", "").strip()
+            if not para:   # Skip empty sections
+                continue
+            cleaned_paras.append({"para_id": i, "text": self.clean_paragraph(para)})
+
+        return {"full_text": text['full_text'], "paragraphs": cleaned_paras}
+    def process_multipass(self, text):
+        # Step-by-step reference for process (kept for the equivalence check in scripts/bench_clean.py).
         if not text: 
             return {"full_text": "", "paragraphs": []}
         text = self.fix_hyphenation(text)
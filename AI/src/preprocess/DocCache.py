@@ -0,0 +1,255 @@
+'''parsed-document cache
+DataLoader.load_file output stored once per file content, so the scorer, the
+teacher report and the tutor-mark extractor read a submission parsed by
+whichever stage saw it first instead of parsing it again.
+Entries are zlib-compressed JSON keyed by the file's sha256, the loader
+version and the options that change the output (OCR settings for PDFs,
+the near-duplicate image threshold for docx).
+Light on purpose (stdlib + lxml): the backend imports it without the OCR stack.
+'''
+import hashlib
+import json
+import os
+import threading
+import zlib
+
+from src.preprocess.DocxStream import _empty, assemble_docx, load_docx_stream, parse_docx
+from src.preprocess.ImagePayload import PHASH_MAX_DISTANCE
+
+# Bump whenever load_file output changes shape or content, so stale entries miss.
+LOADER_VERSION = 3
+
+# 0 MB disables the cache.
+DOC_CACHE_DIR = os.environ.get("DOC_CACHE_DIR") or os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "artifacts", "doc_cache")
+)
+DOC_CACHE_MAX_BYTES = int(float(os.environ.get("DOC_CACHE_MAX_MB") or 1024) * 1024 * 1024)
+
+
+def sha256_file(path, chunk_size=1024 * 1024):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def utf8_normalize(value):
+    if isinstance(value, str):
+        data = value.strip()
+        return data.encode("utf-8", errors="ignore").decode("utf-8")
+    elif isinstance(value, list):
+        return [utf8_normalize(item) for item in value]
+    elif isinstance(value, dict):
+        return {k: utf8_normalize(v) for k, v in value.items()}
+    else:
+        return value
+
+
+class DiskCache:
+    """
+    One file per key under root (fanned out by the first two hex digits).
+    Hits refresh the file's mtime; once the cache outgrows max_bytes the
+    least recently used entries go. Subclasses pick the suffix and encoding.
+    """
+
+    suffix = ".bin"
+
+    def __init__(self, root, max_bytes):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "bytes_evicted": 0}
+        self._size = None  # bytes on disk, scanned on first need
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], key + self.suffix)
+
+    def _count(self, name, n=1):
+        with self._lock:
+            self.stats[name] += n
+
+    def get_bytes(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            self._count("misses")
+            return None
+        self._count("hits")
+        return data
+
+    def put_bytes(self, key, data):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self._lock:
+            self.stats["writes"] += 1
+            if self._size is not None:
+                self._size += len(data)
+
+    def _entries(self):
+        entries = []
+        for dirpath, _dirs, files in os.walk(self.root):
+            for name in files:
+                try:
+                    st = os.stat(os.path.join(dirpath, name))
+                except OSError:
+                    continue
+                entries.append((st.st_mtime, st.st_size, os.path.join(dirpath, name)))
+        return entries
+
+    def size(self):
+        with self._lock:
+            if self._size is None:
+                self._size = sum(size for _, size, _ in self._entries())
+            return self._size
+
+    def evict(self):
+        """Drop least recently used entries until the cache is back under 90% of max_bytes."""
+        if not self.max_bytes or self.size() <= self.max_bytes:
+            return
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        evicted = freed = 0
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+            freed += size
+        with self._lock:
+            self._size = total
+            self.stats["evictions"] += evicted
+            self.stats["bytes_evicted"] += freed
+
+    def snapshot(self):
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        stats["bytes"] = self.size()
+        return stats
+
+
+class ParsedDocCache(DiskCache):
+    """
+    load_file results by content. A docx entry holds paragraphs, tables and
+    image refs (zip member + caption), not extracted files: images are
+    written to whatever image_dir the caller asks for on each load.
+    """
+
+    suffix = ".json.z"
+
+    @staticmethod
+    def key(sha256, file_form, options=""):
+        return hashlib.sha256(f"{LOADER_VERSION}|{file_form}|{options}|{sha256}".encode()).hexdigest()
+
+    def get(self, key):
+        data = self.get_bytes(key)
+        if data is None:
+            return None
+        try:
+            return json.loads(zlib.decompress(data))
+        except (zlib.error, ValueError):
+            # A torn or foreign file counts as a miss and is rewritten.
+            self._count("hits", -1)
+            self._count("misses")
+            return None
+
+    def put(self, key, record):
+        data = zlib.compress(json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8"), 6)
+        self.put_bytes(key, data)
+
+
+_doc_cache = None
+_doc_cache_lock = threading.Lock()
+
+
+def get_doc_cache():
+    """Process-wide parsed-document cache, or None when DOC_CACHE_MAX_MB=0."""
+    global _doc_cache
+    with _doc_cache_lock:
+        if _doc_cache is None and DOC_CACHE_MAX_BYTES > 0:
+            _doc_cache = ParsedDocCache(DOC_CACHE_DIR, DOC_CACHE_MAX_BYTES)
+        return _doc_cache
+
+
+def doc_cache_stats():
+    """Hit/miss/eviction counters of the parsed-document cache, for monitoring."""
+    cache = get_doc_cache()
+    return cache.snapshot() if cache is not None else {}
+
+
+def stats_since(before, after):
+    """
+    Counter increments between two snapshot()s of one cache, with the hit
+    rate of that window: what a single run did to a process-wide cache.
+    """
+    delta = {k: after.get(k, 0) - before.get(k, 0)
+             for k in ("hits", "misses", "writes", "evictions", "bytes_evicted")}
+    lookups = delta["hits"] + delta["misses"]
+    delta["hit_rate"] = delta["hits"] / lookups if lookups else 0.0
+    return delta
+
+
+def _docx_cache_options():
+    # parse_docx drops near-duplicate images; what counts as one changes the record.
+    return f"phash<={PHASH_MAX_DISTANCE}"
+
+
+def _parsed_docx(path, sha256=None, cache=None):
+    """parse_docx record (utf8-normalized) through the cache, or None if unreadable."""
+    if cache is None:
+        parsed = parse_docx(path)
+        return utf8_normalize(parsed) if parsed is not None else None
+    key = cache.key(sha256 or sha256_file(path), ".docx", _docx_cache_options())
+    parsed = cache.get(key)
+    if parsed is None:
+        parsed = parse_docx(path)
+        if parsed is None:
+            return None
+        parsed = utf8_normalize(parsed)
+        cache.put(key, parsed)
+        cache.evict()
+    else:
+        print(f"[INFO] Parsed-document cache hit for {os.path.basename(path)}")
+    return parsed
+
+
+def load_docx_cached(path, image_dir=None, sha256=None, cache=None):
+    """
+    DataLoader.load_file output for a docx (already utf8-normalized), parsed
+    at most once per content. sha256 saves re-hashing when the caller knows it.
+    """
+    if cache is None:
+        return utf8_normalize(load_docx_stream(path, image_dir))
+    parsed = _parsed_docx(path, sha256, cache)
+    if parsed is None:
+        return _empty()
+    return utf8_normalize(assemble_docx(path, parsed, image_dir))
+
+
+def load_docx_lines(path, sha256=None, cache=None):
+    """
+    Text of every body paragraph, empty ones included (as python-docx's
+    document.paragraphs lists them, each stripped), from the same cache
+    entry as load_docx_cached. Raises ValueError if the file is unreadable.
+    """
+    parsed = _parsed_docx(path, sha256, cache)
+    if parsed is None:
+        raise ValueError(f"Unreadable docx file: {path}")
+    lines = [""] * parsed["para_count"]
+    for p in parsed["paragraphs"]:
+        lines[p["para_id"]] = p["text"]
+    return lines
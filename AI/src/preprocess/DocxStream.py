@@ -0,0 +1,233 @@
+'''streaming docx reader
+one lxml iterparse sweep over word/document.xml -> paragraphs, tables, image refs + captions
+same paragraphs, tables and captions as DataLoader.load_docx_dom (python-docx), without building the whole DOM:
+body-level elements are dropped as soon as they are read, so memory stays flat
+for 100+ MB reports; media stay in the archive as refs (see ImagePayload).
+parse_docx is the cacheable part (see DocCache); assemble_docx places the images.
+'''
+import os
+import re
+import shutil
+import zipfile
+
+from lxml import etree
+
+from src.preprocess.ImagePayload import IMAGE_DEBUG, dedupe_images, perceptual_hash
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+
+
+def _w(tag):
+    return f"{{{W_NS}}}{tag}"
+
+
+BODY, P, TBL, TR, TC, R, HYPERLINK = (_w(t) for t in ("body", "p", "tbl", "tr", "tc", "r", "hyperlink"))
+T, TAB, PTAB, BR, CR, NO_BREAK_HYPHEN = (_w(t) for t in ("t", "tab", "ptab", "br", "cr", "noBreakHyphen"))
+TC_PR, GRID_SPAN, V_MERGE, TR_PR, GRID_BEFORE = (_w(t) for t in ("tcPr", "gridSpan", "vMerge", "trPr", "gridBefore"))
+VAL, TYPE = _w("val"), _w("type")
+
+CAPTION_PREFIXES = ("figure", "fig.")
+_DIGITS = re.compile(r"\d+")
+
+
+def run_text(r):
+    # python-docx Run.text: breaks/tabs/hyphens mapped to their plain-text equivalents
+    parts = []
+    for e in r:
+        tag = e.tag
+        if tag == T:
+            parts.append(e.text or "")
+        elif tag == TAB or tag == PTAB:
+            parts.append("\t")
+        elif tag == CR:
+            parts.append("\n")
+        elif tag == BR:
+            parts.append("\n" if e.get(TYPE, "textWrapping") == "textWrapping" else "")
+        elif tag == NO_BREAK_HYPHEN:
+            parts.append("-")
+    return "".join(parts)
+
+
+def paragraph_text(p):
+    # python-docx Paragraph.text: runs plus the runs of hyperlinks
+    parts = []
+    for child in p:
+        if child.tag == R:
+            parts.append(run_text(child))
+        elif child.tag == HYPERLINK:
+            parts.extend(run_text(r) for r in child if r.tag == R)
+    return "".join(parts)
+
+
+def _int_val(parent, path, default):
+    el = parent.find(path)
+    if el is None:
+        return default
+    try:
+        return int(el.get(VAL))
+    except (TypeError, ValueError):
+        return default
+
+
+def table_rows(tbl):
+    """Cell texts per row, laid out like python-docx _Row.cells (spans repeated, vMerge from above)."""
+    rows, above = [], {}
+    for tr in tbl.iterchildren(TR):
+        offset = _int_val(tr, f"{TR_PR}/{GRID_BEFORE}", 0)
+        cells, here = [], {}
+        for tc in tr.iterchildren(TC):
+            span = max(1, _int_val(tc, f"{TC_PR}/{GRID_SPAN}", 1))
+            vmerge = tc.find(f"{TC_PR}/{V_MERGE}")
+            if vmerge is not None and vmerge.get(VAL, "continue") == "continue" and offset in above:
+                text = above[offset]
+            else:
+                text = "\n".join(paragraph_text(p) for p in tc.iterchildren(P))
+            here[offset] = text
+            cells.extend([text] * span)
+            offset += span
+        rows.append([c.strip().replace("\n", " ") for c in cells])
+        above = here
+    return rows
+
+
+def rows_to_markdown(rows):
+    if not rows:
+        return ""
+    header = "| " + " | ".join(rows[0]) + " |"
+    sep    = "| " + " | ".join(["---"] * len(rows[0])) + " |"
+    body   = "\n".join("| " + " | ".join(row) + " |" for row in rows[1:])
+    return "\n".join([header, sep, body])
+
+
+class _CaptionIndex:
+    """First figure caption containing a given number, without rescanning paragraphs per image."""
+
+    def __init__(self):
+        self._first = {}
+
+    def add(self, text):
+        if not text.lower().startswith(CAPTION_PREFIXES):
+            return
+        for m in _DIGITS.finditer(text):
+            run = m.group(0)
+            for i in range(len(run)):
+                for j in range(i + 1, len(run) + 1):
+                    self._first.setdefault(run[i:j], text)
+
+    def lookup(self, image_id):
+        return self._first.get(str(image_id), "")
+
+
+def _empty():
+    return {"paragraphs": [], "tables": [], "images": [], "meta": {}}
+
+
+def parse_docx(path):
+    """
+    Paragraphs, tables and the media members of a docx with their captions
+    and perceptual hashes (near-duplicates dropped), or None if it cannot be
+    read. Nothing here depends on where images go, so the result can be
+    cached and reused for any image_dir.
+    """
+    try:
+        docx_zip = zipfile.ZipFile(path, "r")
+    except Exception:
+        return None
+    paragraphs, tables = [], []
+    captions = _CaptionIndex()
+    with docx_zip:
+        try:
+            para_idx = table_idx = 0
+            with docx_zip.open("word/document.xml") as xml:
+                for _event, elem in etree.iterparse(xml, events=("end",), tag=(P, TBL), huge_tree=True):
+                    parent = elem.getparent()
+                    if parent is None or parent.tag != BODY:
+                        continue  # inside a table or content control; handled with its container
+                    if elem.tag == P:
+                        txt = paragraph_text(elem).strip()
+                        if txt:
+                            paragraphs.append({"para_id": para_idx, "text": txt})
+                            captions.add(txt)
+                        para_idx += 1
+                    else:
+                        table_idx += 1
+                        table_txt = rows_to_markdown(table_rows(elem))
+                        if table_txt.strip():
+                            tables.append({"table_id": table_idx, "markdown": table_txt})
+                    # Drop what has been read so the tree never grows past one block.
+                    elem.clear(keep_tail=True)
+                    while elem.getprevious() is not None:
+                        del parent[0]
+        except Exception:
+            return None
+        media_files = [f for f in docx_zip.namelist() if f.startswith("word/media/")]
+        media = [
+            {"image_id": i, "member": name, "caption": captions.lookup(i),
+             "phash": perceptual_hash(docx_zip.read(name))}
+            for i, name in enumerate(media_files, start=1)
+        ]
+    # The same picture pasted twice (or re-saved) is sent once; image_ids keep their numbering.
+    return {"paragraphs": paragraphs, "tables": tables, "media": dedupe_images(media),
+            "para_count": para_idx}
+
+
+def image_refs(path, media):
+    """Image refs pointing into the archive; bytes are read when a prompt needs them (ImagePayload)."""
+    archive = os.path.abspath(path)
+    return [
+        {
+            "image_id": item["image_id"],
+            "caption": item["caption"],
+            "source": "archive_extract",
+            "archive": archive,
+            "member": item["member"],
+            "phash": item["phash"],
+        }
+        for item in media
+    ]
+
+
+def extract_images(path, media, image_dir):
+    """Also write the media members to image_dir/<stem>/img_<n><ext> (debugging); files already there are kept."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    out_dir = os.path.join(image_dir, stem)
+    os.makedirs(out_dir, exist_ok=True)
+    images = image_refs(path, media)
+    with zipfile.ZipFile(path, "r") as docx_zip:
+        for img in images:
+            ext = os.path.splitext(img["member"])[1]
+            img_path = os.path.join(out_dir, f"img_{img['image_id']}{ext}")
+            info = docx_zip.getinfo(img["member"])
+            if not (os.path.isfile(img_path) and os.path.getsize(img_path) == info.file_size):
+                with docx_zip.open(info) as src, open(img_path, "wb") as dst:
+                    shutil.copyfileobj(src, dst)
+            img["path"] = img_path
+    return images
+
+
+def docx_meta(path):
+    name_parts = os.path.basename(path).split('.')
+    return {"zid": name_parts[0], "ext": name_parts[1] if len(name_parts) > 1 else "", "filename": os.path.basename(path)}
+
+
+def assemble_docx(path, parsed, image_dir=None, write_images=None):
+    """
+    load_docx-shaped result from a parse_docx record. Images are listed only
+    when an image_dir is given, and written there only with write_images
+    (default: IMAGE_DEBUG).
+    """
+    if not image_dir:
+        images = []
+    elif IMAGE_DEBUG if write_images is None else write_images:
+        images = extract_images(path, parsed["media"], image_dir)
+    else:
+        images = image_refs(path, parsed["media"])
+    print(f"[INFO] Extracted {len(images)} images from {path}")
+    return {"paragraphs": parsed["paragraphs"], "tables": parsed["tables"], "images": images, "meta": docx_meta(path)}
+
+
+def load_docx_stream(path, image_dir=None):
+    parsed = parse_docx(path)
+    if parsed is None:
+        return _empty()
+    return assemble_docx(path, parsed, image_dir)
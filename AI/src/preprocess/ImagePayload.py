@@ -0,0 +1,227 @@
+'''images for multimodal prompts
+Loaded documents carry image refs (the docx archive + zip member); the bytes
+are read from the archive only when a prompt is built, downscaled to
+IMAGE_MAX_EDGE and re-encoded as JPEG at IMAGE_JPEG_QUALITY, and never written
+to disk. IMAGE_DEBUG=1 also writes the originals under image_dir for inspection.
+Each image also gets a perceptual hash: near-identical copies inside one
+document are kept once, and BoilerplateImageIndex spots the ones shared by
+many submissions of an assignment (logos, cover sheets, template figures).
+'''
+import base64
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import zipfile
+
+try:
+    import fcntl
+except ImportError:  # Windows: runs of one assignment are not serialised
+    fcntl = None
+
+from PIL import Image
+
+IMAGE_MAX_EDGE = int(os.environ.get("IMAGE_MAX_EDGE") or 1024)
+IMAGE_JPEG_QUALITY = int(os.environ.get("IMAGE_JPEG_QUALITY") or 80)
+IMAGE_DEBUG = os.environ.get("IMAGE_DEBUG", "").lower() in ("1", "true", "yes")
+
+# What the vision endpoint accepts as-is; anything else is re-encoded.
+PASSTHROUGH_MIMES = ("image/jpeg", "image/png", "image/gif", "image/webp")
+
+# Hashes at most this many bits apart (of 128) are treated as the same picture.
+PHASH_MAX_DISTANCE = int(os.environ.get("IMAGE_PHASH_MAX_DISTANCE") or 8)
+# An image is boilerplate once it is in this many submissions and this share of them.
+BOILERPLATE_MIN_SUBMISSIONS = int(os.environ.get("IMAGE_BOILERPLATE_MIN_SUBMISSIONS") or 3)
+BOILERPLATE_MIN_SHARE = float(os.environ.get("IMAGE_BOILERPLATE_MIN_SHARE") or 0.5)
+
+
+def read_image_bytes(img):
+    """Raw bytes of an image ref: the zip member when known, else the file at path."""
+    archive, member = img.get("archive"), img.get("member")
+    if archive and member:
+        with zipfile.ZipFile(archive, "r") as zf:
+            return zf.read(member)
+    path = img.get("path", "")
+    if path and os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+    return None
+
+
+def shrink_image(data, max_edge=IMAGE_MAX_EDGE, quality=IMAGE_JPEG_QUALITY):
+    """
+    (bytes, mime) no larger than max_edge on the long side, re-encoded as
+    JPEG unless that would not make a small image any smaller. Formats
+    Pillow cannot decode (EMF/WMF drawings) are returned as they are.
+    """
+    try:
+        im = Image.open(io.BytesIO(data))
+        im.load()
+    except Exception:
+        return data, "image/jpeg"
+    mime = Image.MIME.get(im.format, "image/jpeg")
+    fits = max(im.size) <= max_edge
+    if fits and im.format == "JPEG":
+        return data, mime
+    if not fits:
+        im.thumbnail((max_edge, max_edge), Image.LANCZOS)
+    if im.mode in ("RGBA", "LA") or (im.mode == "P" and "transparency" in im.info):
+        # Transparent screenshots and logos: flatten onto white, as they are displayed.
+        im = im.convert("RGBA")
+        flat = Image.new("RGB", im.size, (255, 255, 255))
+        flat.paste(im, mask=im.getchannel("A"))
+        im = flat
+    elif im.mode != "RGB":
+        im = im.convert("RGB")
+    out = io.BytesIO()
+    im.save(out, format="JPEG", quality=quality, optimize=True)
+    if fits and mime in PASSTHROUGH_MIMES and out.tell() >= len(data):
+        return data, mime
+    return out.getvalue(), "image/jpeg"
+
+
+def image_input(img, max_edge=IMAGE_MAX_EDGE, quality=IMAGE_JPEG_QUALITY):
+    """Chat-completions image_url part for an image ref, or None if its bytes are gone."""
+    data = read_image_bytes(img)
+    if data is None:
+        return None
+    data, mime = shrink_image(data, max_edge, quality)
+    b64 = base64.b64encode(data).decode("utf-8")
+    return {"type": "image_url", "image_url": {"url": f"data:{mime};base64,{b64}"}}
+
+
+def _dhash_bits(grey, size):
+    w, h = size
+    px = list(grey.resize(size, Image.LANCZOS).getdata())
+    bits = 0
+    if w > h:  # horizontal gradients
+        for y in range(h):
+            for x in range(w - 1):
+                bits = (bits << 1) | (px[y * w + x] > px[y * w + x + 1])
+    else:  # vertical gradients
+        for y in range(h - 1):
+            for x in range(w):
+                bits = (bits << 1) | (px[y * w + x] > px[(y + 1) * w + x])
+    return bits
+
+
+def perceptual_hash(data):
+    """
+    128-bit difference hash (row and column gradients) as 32 hex digits, so
+    re-saved, rescaled or recompressed copies land a few bits apart. Bytes
+    Pillow cannot decode get "x" + their sha256 prefix: exact matches only.
+    """
+    try:
+        im = Image.open(io.BytesIO(data))
+        im.draft("L", (64, 64))  # JPEG: decode at reduced size
+        grey = im.convert("L")
+    except Exception:
+        return "x" + hashlib.sha256(data).hexdigest()[:31]
+    return f"{_dhash_bits(grey, (9, 8)):016x}{_dhash_bits(grey, (8, 9)):016x}"
+
+
+def hash_distance(a, b):
+    if a.startswith("x") or b.startswith("x"):
+        return 0 if a == b else 128
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def dedupe_images(items, max_distance=PHASH_MAX_DISTANCE):
+    """
+    Keep the first of each group of near-identical images (by "phash");
+    a kept image without a caption takes the caption of a dropped copy.
+    """
+    kept = []
+    for item in items:
+        twin = next((k for k in kept if hash_distance(k["phash"], item["phash"]) <= max_distance), None)
+        if twin is None:
+            kept.append(item)
+        elif not twin["caption"] and item["caption"]:
+            twin["caption"] = item["caption"]
+    return kept
+
+
+class BoilerplateImageIndex:
+    """
+    Perceptual hashes of the images in each submission of one assignment,
+    persisted as JSON next to its score cache. An image found in at least
+    min_submissions submissions, and in min_share of all of them, is
+    boilerplate (the same logo or template figure for everyone): it says
+    nothing about one student and can be left out of their prompt.
+    """
+
+    def __init__(self, path=None, min_submissions=BOILERPLATE_MIN_SUBMISSIONS,
+                 min_share=BOILERPLATE_MIN_SHARE, max_distance=PHASH_MAX_DISTANCE):
+        self.path = path
+        self.min_submissions = min_submissions
+        self.min_share = min_share
+        self.max_distance = max_distance
+        self.submissions = self._read()
+        self._updated = {}
+        self._lock = threading.Lock()
+
+    def _read(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return {k: list(v) for k, v in data.get("submissions", {}).items()}
+        except Exception as e:
+            print(f"[WARN] Ignoring unreadable image index {self.path}: {e}")
+            return {}
+
+    def add(self, submission_id, images):
+        """Record (or replace) the image hashes of one submission."""
+        hashes = sorted({img["phash"] for img in images if img.get("phash")})
+        with self._lock:
+            self.submissions[submission_id] = hashes
+            self._updated[submission_id] = hashes
+
+    def count(self, phash):
+        """Number of submissions holding an image within max_distance of phash."""
+        with self._lock:
+            return sum(
+                any(hash_distance(phash, h) <= self.max_distance for h in hashes)
+                for hashes in self.submissions.values()
+            )
+
+    def is_boilerplate(self, phash):
+        if not phash:
+            return False
+        n = self.count(phash)
+        return n >= self.min_submissions and n >= self.min_share * len(self.submissions)
+
+    def split(self, images):
+        """(kept, dropped) images of one submission."""
+        kept, dropped = [], []
+        for img in images:
+            (dropped if self.is_boilerplate(img.get("phash")) else kept).append(img)
+        return kept, dropped
+
+    def save(self):
+        """
+        Merge this run's submissions into the index file. Re-reads it first,
+        under a lock file next to it, so concurrent runs for the same
+        assignment do not drop each other's submissions.
+        """
+        if not self.path:
+            return
+        directory = os.path.dirname(self.path) or "."
+        os.makedirs(directory, exist_ok=True)
+        with self._lock, open(self.path + ".lock", "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            latest = self._read()
+            latest.update(self._updated)
+            self.submissions = latest
+            fd, tmp = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump({"submissions": latest}, f, ensure_ascii=False, indent=2)
+                os.replace(tmp, self.path)
+            except BaseException:
+                os.unlink(tmp)
+                raise
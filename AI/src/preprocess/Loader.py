@@ -3,8 +3,17 @@
 2. transfer to UTF-8(PDF/OCR/WORD)
 2. extract metadata
 '''
+import atexit
+import contextlib
+import gc
+import hashlib
+import math
+import multiprocessing
 import os
+import threading
+import time
 import zipfile
+from concurrent.futures import ProcessPoolExecutor
 from typing import Optional
 import fitz
 from docx import Document
@@ -13,6 +22,16 @@ from tqdm import tqdm
 import numpy as np
 import cv2
 
+from src.preprocess.DocCache import (
+    DiskCache,
+    ParsedDocCache,
+    get_doc_cache,
+    load_docx_cached,
+    sha256_file,
+    utf8_normalize,
+)
+from src.preprocess.DocxStream import rows_to_markdown
+
 try:
     from paddleocr import PaddleOCR
     import paddle
@@ -35,6 +54,341 @@ except Exception:
     _OCR_AVAILABLE = False
 
 
+# Processes used to OCR the pages of one scanned PDF; 1 keeps OCR in-process.
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS") or min(4, os.cpu_count() or 1))
+# Page rasters sent to PaddleOCR per predict call; 1 recognises page by page.
+OCR_BATCH_SIZE = int(os.environ.get("OCR_BATCH_SIZE") or 4)
+
+_ocr_pool: Optional[ProcessPoolExecutor] = None
+_ocr_pool_key = None  # (workers, engine, lang) the pool was started for
+_ocr_pool_lock = threading.Lock()
+
+
+def _paddle_engine(lang="en"):
+    ocr = PaddleOCR(use_textline_orientation=True, lang=lang)
+    try:
+        if paddle:
+            paddle.set_device("cpu")
+    except Exception:
+        pass
+    return ocr
+
+
+# A loaded OCR model is dropped after this long unused; 0 keeps it for good.
+OCR_ENGINE_IDLE_SECONDS = float(os.environ.get("OCR_ENGINE_IDLE_SECONDS") or 600)
+
+
+class _EngineSlot:
+    def __init__(self):
+        self.lock = threading.Lock()  # one predict at a time per model
+        self.model = None
+        self.last_used = 0.0
+
+
+class OCREngineRegistry:
+    """
+    Process-wide OCR models shared by every DataLoader (and every OCR pool
+    worker within its own process), created on first use. A reaper thread
+    releases models that have been idle for ``idle_timeout`` seconds.
+    """
+
+    def __init__(self, idle_timeout=OCR_ENGINE_IDLE_SECONDS):
+        self.idle_timeout = idle_timeout
+        self.loads = 0
+        self.releases = 0
+        self._lock = threading.Lock()
+        self._slots = {}
+        self._reaper = None
+
+    def _slot(self, engine, lang):
+        with self._lock:
+            slot = self._slots.get((engine, lang))
+            if slot is None:
+                slot = self._slots[(engine, lang)] = _EngineSlot()
+            return slot
+
+    @contextlib.contextmanager
+    def use(self, engine="paddle", lang="en"):
+        """Borrow the model for ``engine``, loading it if needed."""
+        if engine != "paddle":  # tesseract is a subprocess, nothing to keep warm
+            yield None
+            return
+        slot = self._slot(engine, lang)
+        with slot.lock:
+            if slot.model is None:
+                slot.model = _paddle_engine(lang)
+                with self._lock:
+                    self.loads += 1
+            try:
+                yield slot.model
+            finally:
+                slot.last_used = time.monotonic()
+        self._start_reaper()
+
+    def warm_up(self, engine="paddle", lang="en"):
+        with self.use(engine, lang):
+            pass
+
+    def release_idle(self, now=None):
+        """Drop models unused for idle_timeout; returns how many were released."""
+        if not self.idle_timeout:
+            return 0
+        now = now or time.monotonic()
+        with self._lock:
+            slots = list(self._slots.values())
+        released = 0
+        for slot in slots:
+            if not slot.lock.acquire(blocking=False):
+                continue  # in use
+            try:
+                if slot.model is not None and now - slot.last_used >= self.idle_timeout:
+                    slot.model = None
+                    released += 1
+            finally:
+                slot.lock.release()
+        if released:
+            with self._lock:
+                self.releases += released
+            gc.collect()
+        return released
+
+    def loaded(self):
+        with self._lock:
+            return sorted(key for key, slot in self._slots.items() if slot.model is not None)
+
+    def _start_reaper(self):
+        if not self.idle_timeout or self._reaper is not None:
+            return
+        with self._lock:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=self._reap, daemon=True, name="ocr-engine-reaper")
+            self._reaper.start()
+
+    def _reap(self):
+        interval = min(60.0, max(1.0, self.idle_timeout / 2))
+        while True:
+            time.sleep(interval)
+            self.release_idle()
+
+
+ocr_engines = OCREngineRegistry()
+
+
+def warm_up_ocr():
+    """Load the PaddleOCR model now (e.g. at worker start) instead of on the first scan."""
+    if PaddleOCR is not None:
+        ocr_engines.warm_up()
+
+
+def _render_page(page, dpi, engine):
+    """Rasterise one page: a BGR array for PaddleOCR, a PIL image for tesseract."""
+    pix = page.get_pixmap(matrix=fitz.Matrix(dpi / 72, dpi / 72), alpha=False)
+    if engine == "tesseract":
+        mode = "RGB"
+        if pix.n == 4:
+            mode = "RGBA"
+        elif pix.n == 1:
+            mode = "L"
+        img = Image.frombytes(mode, [pix.width, pix.height], pix.samples)
+        if mode in ("RGBA", "LA"):
+            img = img.convert("RGB")
+        return img
+    img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
+    if pix.n == 4:
+        img = cv2.cvtColor(img, cv2.COLOR_RGBA2BGR)
+    elif pix.n == 3:
+        img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
+    elif pix.n == 1:
+        img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    return img
+
+
+def _paddle_lines(result, min_conf):
+    """Recognised lines of one page from any of PaddleOCR's result shapes."""
+    page_lines = []
+    if isinstance(result, dict):
+        rec_texts  = result.get("rec_texts", []) or []
+        rec_scores = result.get("rec_scores", []) or []
+        if min_conf > 0:
+            for t, sc in zip(rec_texts, rec_scores or [1.0] * len(rec_texts)):
+                if sc is None or sc >= min_conf:
+                    page_lines.append(t)
+        else:
+            page_lines = rec_texts
+
+    elif isinstance(result, list) and result:
+        if isinstance(result[0], dict):
+            payload = result[0]
+            rec_texts  = payload.get("rec_texts", []) or []
+            rec_scores = payload.get("rec_scores", []) or []
+            if min_conf > 0:
+                for t, sc in zip(rec_texts, rec_scores or [1.0] * len(rec_texts)):
+                    if sc is None or sc >= min_conf:
+                        page_lines.append(t)
+            else:
+                page_lines = rec_texts
+        else:
+            lines = result[0] if isinstance(result[0], list) else result
+            for seg in lines:
+                try:
+                    _, (txt, conf) = seg
+                except Exception:
+                    continue
+                if not txt:
+                    continue
+                if min_conf and conf is not None and conf < min_conf:
+                    continue
+                page_lines.append(txt)
+    return page_lines
+
+
+def _ocr_page(doc, page_idx, engine, ocr, dpi, min_conf, lang):
+    img = _render_page(doc[page_idx], dpi, engine)
+    if engine == "tesseract":
+        return pytesseract.image_to_string(img, lang=lang or "eng").strip()
+    return "\n".join(_paddle_lines(ocr.predict(img), min_conf)).strip()
+
+
+def _batch_texts(results, min_conf):
+    """
+    Page texts from one batched PaddleOCR predict call (one result per
+    image). Confidence filtering is one numpy mask per page with the same
+    rules as _paddle_lines: missing scores keep every line, None keeps a line.
+    """
+    texts = []
+    for res in results:
+        if not isinstance(res, dict):  # PaddleOCR 2.x line lists
+            texts.append("\n".join(_paddle_lines([res], min_conf)).strip())
+            continue
+        rec_texts = list(res.get("rec_texts", []) or [])
+        rec_scores = res.get("rec_scores", [])
+        if min_conf > 0 and rec_scores is not None and len(rec_scores):
+            scores = np.array([np.nan if sc is None else sc for sc in rec_scores], dtype=float)
+            n = min(len(rec_texts), len(scores))
+            keep = ~(scores[:n] < min_conf)  # NaN (None) compares False -> kept
+            rec_texts = [t for t, k in zip(rec_texts[:n], keep) if k]
+        texts.append("\n".join(rec_texts).strip())
+    return texts
+
+
+def _ocr_run(doc, pages, engine, ocr, dpi, min_conf, lang, batch_size=1):
+    """Yield (page_idx, text, seconds) for pages, batching PaddleOCR predict calls."""
+    if engine == "tesseract" or batch_size <= 1:
+        for page_idx in pages:
+            started = time.perf_counter()
+            text = _ocr_page(doc, page_idx, engine, ocr, dpi, min_conf, lang)
+            yield page_idx, text, time.perf_counter() - started
+        return
+    for start in range(0, len(pages), batch_size):
+        batch = pages[start:start + batch_size]
+        started = time.perf_counter()
+        images = [_render_page(doc[i], dpi, engine) for i in batch]
+        results = ocr.predict(images)
+        if isinstance(results, list) and len(results) == len(batch):
+            texts = _batch_texts(results, min_conf)
+        else:  # engine ignored the batch; recognise page by page
+            texts = ["\n".join(_paddle_lines(ocr.predict(img), min_conf)).strip() for img in images]
+        seconds = (time.perf_counter() - started) / len(batch)
+        for page_idx, text in zip(batch, texts):
+            yield page_idx, text, seconds
+
+
+def _ocr_page_range(args):
+    """Pool task: OCR a run of pages, opening the PDF in this process."""
+    path, pages, engine, dpi, min_conf, lang, batch_size = args
+    with ocr_engines.use(engine, lang) as ocr, fitz.open(path) as doc:
+        return [(text, seconds) for _, text, seconds in
+                _ocr_run(doc, pages, engine, ocr, dpi, min_conf, lang, batch_size)]
+
+
+def _split_pages(pages, workers):
+    # A few runs per worker so one slow page does not hold up the tail.
+    size = max(1, math.ceil(len(pages) / (workers * 2)))
+    return [pages[i:i + size] for i in range(0, len(pages), size)]
+
+
+def _warm_up_worker(engine, lang):
+    """Pool initializer: load the model as the worker starts, not inside the first task."""
+    if engine == "paddle" and PaddleOCR is not None:
+        ocr_engines.warm_up(engine, lang)
+
+
+def _get_ocr_pool(workers, engine="paddle", lang="en"):
+    global _ocr_pool, _ocr_pool_key
+    with _ocr_pool_lock:
+        if _ocr_pool is None or _ocr_pool_key != (workers, engine, lang):
+            if _ocr_pool is not None:
+                _ocr_pool.shutdown(wait=False, cancel_futures=True)
+            # spawn: Paddle is not fork-safe once loaded in the parent.
+            _ocr_pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm_up_worker, initargs=(engine, lang),
+            )
+            _ocr_pool_key = (workers, engine, lang)
+        return _ocr_pool
+
+
+@atexit.register
+def shutdown_ocr_pool():
+    global _ocr_pool, _ocr_pool_key
+    with _ocr_pool_lock:
+        pool, _ocr_pool, _ocr_pool_key = _ocr_pool, None, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+# Recognised page text survives across runs; 0 MB disables the cache.
+OCR_CACHE_DIR = os.environ.get("OCR_CACHE_DIR") or os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "artifacts", "ocr_cache")
+)
+OCR_CACHE_MAX_BYTES = int(float(os.environ.get("OCR_CACHE_MAX_MB") or 512) * 1024 * 1024)
+
+
+class OCRPageCache(DiskCache):
+    """
+    On-disk OCR results, one small text file per page keyed by the sha256 of
+    the rendered raster plus dpi, engine, language and min_conf, so a rename
+    or re-upload of the same scan still hits. Hits refresh the file's mtime;
+    once the cache outgrows max_bytes the least recently used pages go.
+    """
+
+    suffix = ".txt"
+
+    def __init__(self, root, max_bytes=OCR_CACHE_MAX_BYTES):
+        super().__init__(root, max_bytes)
+
+    @staticmethod
+    def key(pix, dpi, engine, min_conf, lang):
+        h = hashlib.sha256(f"{engine}|{lang}|{dpi}|{min_conf}|{pix.width}x{pix.height}x{pix.n}|".encode())
+        h.update(pix.samples)
+        return h.hexdigest()
+
+    def get(self, key):
+        data = self.get_bytes(key)
+        return None if data is None else data.decode("utf-8")
+
+    def put(self, key, text):
+        self.put_bytes(key, text.encode("utf-8"))
+
+
+_ocr_cache = None
+
+
+def get_ocr_cache():
+    """Process-wide page cache, or None when OCR_CACHE_MAX_MB=0."""
+    global _ocr_cache
+    if _ocr_cache is None and OCR_CACHE_MAX_BYTES > 0:
+        _ocr_cache = OCRPageCache(OCR_CACHE_DIR, OCR_CACHE_MAX_BYTES)
+    return _ocr_cache
+
+
+def ocr_cache_stats():
+    """Hit/miss/eviction counters of the page cache, for monitoring."""
+    cache = get_ocr_cache()
+    return cache.snapshot() if cache is not None else {}
+
+
+
 class DataLoader:
     def __init__(
         self,
@@ -44,6 +398,10 @@ class DataLoader:
         dpi: int = 72,  # OCR render resolution (higher values showed no benefit)
         min_conf = 0.7,
         max_pages: Optional[int] = None,
+        ocr_workers: Optional[int] = None,
+        ocr_batch_size: Optional[int] = None,
+        ocr_cache: Optional["OCRPageCache"] = None,
+        doc_cache: Optional[ParsedDocCache] = None,
     ):
 
         self.ocr_lang = ocr_language
@@ -52,29 +410,20 @@ class DataLoader:
         self.dpi = dpi
         self.max_pages = max_pages
         self.min_conf = min_conf
+        self.ocr_workers = max(1, ocr_workers or OCR_WORKERS)
+        self.ocr_batch_size = max(1, ocr_batch_size or OCR_BATCH_SIZE)
+        self.ocr_cache = ocr_cache if ocr_cache is not None else get_ocr_cache()
+        self.doc_cache = doc_cache if doc_cache is not None else get_doc_cache()
+        self.last_pdf_stats = []  # per-page extraction stats of the last PDF loaded
 
     def utf8_normalize(self, text):
-        if isinstance(text, str):
-            data = text.strip()
-            return data.encode("utf-8", errors="ignore").decode("utf-8")
-        elif isinstance(text, list):
-            return [self.utf8_normalize(item) for item in text]
-        elif isinstance(text, dict):
-            return {k: self.utf8_normalize(v) for k, v in text.items()}
-        else:
-            return text
+        return utf8_normalize(text)
     def table2text(self, table):
         rows = []
         for r in table.rows:
             cells = [c.text.strip().replace("\n", " ") for c in r.cells]
             rows.append(cells)
-        if not rows:
-            return ""
-    
-        header = "| " + " | ".join(rows[0]) + " |"
-        sep    = "| " + " | ".join(["---"] * len(rows[0])) + " |"
-        body   = "\n".join("| " + " | ".join(row) + " |" for row in rows[1:])
-        return "\n".join([header, sep, body])
+        return rows_to_markdown(rows)
     def image2bytes(self, b, out_dir, stem, idx, ext) :
         os.makedirs(out_dir, exist_ok=True)
         fname = f"{stem}_{idx}{ext}"
@@ -82,7 +431,11 @@ class DataLoader:
         with open(fpath, "wb") as f:
             f.write(b)
         return fpath
-    def load_docx(self, path,image_dir ):
+    def load_docx(self, path, image_dir, sha256=None):
+        # Streaming parse (DocxStream), cached by content; load_docx_dom is the python-docx reference.
+        return load_docx_cached(path, image_dir, sha256=sha256, cache=self.doc_cache)
+
+    def load_docx_dom(self, path,image_dir ):
         try:
             file = Document(path)
             # import pdb
@@ -130,7 +483,9 @@ class DataLoader:
 
         print(f"[INFO] Extracted {len(images)} images from {path}")
 
-        meta = {"zid":os.path.basename(path).split('.')[0],"ext": os.path.basename(path).split('.')[1], "filename": os.path.basename(path)}
+        name_parts = os.path.basename(path).split('.')
+        # Blob-store paths have no extension.
+        meta = {"zid": name_parts[0], "ext": name_parts[1] if len(name_parts) > 1 else "", "filename": os.path.basename(path)}
         return {"paragraphs": paragraphs, "tables": tables, "images": images, "meta": meta}
 
         
@@ -149,126 +504,153 @@ class DataLoader:
         readable = sum(ch.isalnum() or ("\u4e00" <= ch <= "\u9fff") for ch in text)
         return (readable / max(len(text), 1)) < self.alpha_ratio
 
-    def ocr_pdf(self, path):
+    def _ocr_engine(self):
         if PaddleOCR is None:
             if _OCR_AVAILABLE:
                 print("[WARN] PaddleOCR unavailable. Falling back to pytesseract OCR.")
-                return self._ocr_pdf_with_tesseract(path)
+                return "tesseract"
             raise ImportError(
                 "PaddleOCR could not be imported and no fallback OCR engine is available. "
                 "Install paddleocr with numpy<2 or rebuild with numpy>=2, or install pytesseract."
             ) from _PADDLE_IMPORT_ERROR
+        return "paddle"
 
-        ocr = getattr(self, "ocr", None)
-        if ocr is None:
-            ocr = PaddleOCR(use_textline_orientation=True, lang="en")
-            try:
-                if paddle:
-                    paddle.set_device("cpu")
-            except Exception:
-                pass
-            self.ocr = ocr
-        doc = fitz.open(path)
-        texts = []
-        n = len(doc)
-        mat = fitz.Matrix(self.dpi / 72, self.dpi / 72)
-
-        total_pages = n if getattr(self, "max_pages", None) is None else min(n, self.max_pages)
-
-        for page_idx in tqdm(range(total_pages), desc="OCR Pages", unit="page"):
-            page = doc[page_idx]
-            pix = page.get_pixmap(matrix=mat, alpha=False)
-            img = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, pix.n)
-            if pix.n == 4:
-                img = cv2.cvtColor(img, cv2.COLOR_RGBA2BGR)
-            elif pix.n == 3:
-                img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
-            elif pix.n == 1:
-                img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
-            # cv2.imwrite(f"debug_page_{page_idx+1}.png", img)
-            # print('1',img.shape, img.dtype)
-            
-            result = ocr.predict(img)
-            page_lines = []
-
-            if isinstance(result, dict):
-                rec_texts  = result.get("rec_texts", []) or []
-                rec_scores = result.get("rec_scores", []) or []
-                if self.min_conf > 0:
-                    for t, sc in zip(rec_texts, rec_scores or [1.0] * len(rec_texts)):
-                        if sc is None or sc >= self.min_conf:
-                            page_lines.append(t)
-                else:
-                    page_lines = rec_texts
-
-            elif isinstance(result, list) and result:
-                if isinstance(result[0], dict):
-                    payload = result[0]
-                    rec_texts  = payload.get("rec_texts", []) or []
-                    rec_scores = payload.get("rec_scores", []) or []
-                    # print(rec_scores)
-                    if self.min_conf > 0:
-                        for t, sc in zip(rec_texts, rec_scores or [1.0] * len(rec_texts)):
-                            if sc is None or sc >= self.min_conf:
-                                page_lines.append(t)
-                    else:
-                        page_lines = rec_texts
-                else:
-                    lines = result[0] if isinstance(result[0], list) else result
-                    for seg in lines:
-                        try:
-                            _, (txt, conf) = seg
-                        except Exception:
-                            continue
-                        if not txt:
-                            continue
-                        if self.min_conf and conf is not None and conf < self.min_conf:
-                            continue
-                        page_lines.append(txt)
-            texts.append("\n".join(page_lines).strip())
-
-        doc.close()
-        return "\n".join(texts).strip()
+    def ocr_pdf(self, path):
+        return self._ocr_pages(path, self._ocr_engine())
 
     def _ocr_pdf_with_tesseract(self, path):
         if not _OCR_AVAILABLE:
             raise RuntimeError("pytesseract/PIL dependencies missing for OCR fallback.")
-
-        doc = fitz.open(path)
-        texts = []
-        total_pages = len(doc) if self.max_pages is None else min(len(doc), self.max_pages)
-
-        for page_idx in tqdm(range(total_pages), desc="OCR Pages (tesseract)", unit="page"):
-            page = doc[page_idx]
-            pix = page.get_pixmap(matrix=fitz.Matrix(self.dpi / 72, self.dpi / 72), alpha=False)
-
-            mode = "RGB"
-            if pix.n == 4:
-                mode = "RGBA"
-            elif pix.n == 1:
-                mode = "L"
-            img = Image.frombytes(mode, [pix.width, pix.height], pix.samples)
-            if mode in ("RGBA", "LA"):
-                img = img.convert("RGB")
-
-            text = pytesseract.image_to_string(img, lang=self.ocr_lang or "eng")
-            texts.append(text.strip())
-
-        doc.close()
-        return "\n".join(texts).strip()
-
-    def load_file(self, path, image_dir):
-        file_form = os.path.splitext(path)[1].lower()
+        return self._ocr_pages(path, "tesseract")
+
+    def _ocr_pages(self, path, engine):
+        """OCR every page (up to max_pages) with ``engine`` ("paddle" or "tesseract")."""
+        with fitz.open(path) as doc:
+            n = len(doc)
+        total_pages = n if self.max_pages is None else min(n, self.max_pages)
+        results = self._ocr_page_results(path, engine, list(range(total_pages)))
+        return "\n".join(results[i]["text"] for i in range(total_pages)).strip()
+
+    def _ocr_page_results(self, path, engine, pages):
+        """
+        OCR the given page indices; returns {page_idx: {text, source, seconds}}
+        with source "ocr_cache" for pages already in the OCR cache, which are
+        not recognised again. With more than one ocr_worker the remaining
+        pages are split into runs recognised in a process pool; results are
+        placed back by page index, so the text is identical to a sequential run.
+        PaddleOCR gets ocr_batch_size page rasters per predict call.
+        """
+        cache = self.ocr_cache
+        keys, results = {}, {}
+        if cache is not None:
+            with fitz.open(path) as doc:
+                for page_idx in pages:
+                    started = time.perf_counter()
+                    pix = doc[page_idx].get_pixmap(matrix=fitz.Matrix(self.dpi / 72, self.dpi / 72), alpha=False)
+                    key = cache.key(pix, self.dpi, engine, self.min_conf, self.ocr_lang)
+                    text = cache.get(key)
+                    if text is None:
+                        keys[page_idx] = key
+                    else:
+                        results[page_idx] = {"text": text, "source": "ocr_cache",
+                                             "seconds": time.perf_counter() - started}
+        todo = [i for i in pages if i not in results]
+        desc = "OCR Pages" if engine == "paddle" else "OCR Pages (tesseract)"
+        workers = min(self.ocr_workers, len(todo))
+        if todo and workers <= 1:
+            with ocr_engines.use(engine, self.ocr_lang) as ocr, fitz.open(path) as doc, \
+                    tqdm(total=len(todo), desc=desc, unit="page") as bar:
+                for page_idx, text, seconds in _ocr_run(doc, todo, engine, ocr, self.dpi, self.min_conf,
+                                                        self.ocr_lang, self.ocr_batch_size):
+                    results[page_idx] = {"text": text, "source": "ocr", "seconds": seconds}
+                    bar.update(1)
+        elif todo:
+            runs = _split_pages(todo, workers)
+            tasks = [(path, run, engine, self.dpi, self.min_conf, self.ocr_lang, self.ocr_batch_size)
+                     for run in runs]
+            with tqdm(total=len(todo), desc=desc, unit="page") as bar:
+                pool = _get_ocr_pool(workers, engine, self.ocr_lang)
+                for run, chunk in zip(runs, pool.map(_ocr_page_range, tasks)):
+                    for page_idx, (text, seconds) in zip(run, chunk):
+                        results[page_idx] = {"text": text, "source": "ocr", "seconds": seconds}
+                    bar.update(len(chunk))
+        if cache is not None and todo:
+            for page_idx in todo:
+                cache.put(keys[page_idx], results[page_idx]["text"])
+            cache.evict()
+        return results
+
+    def page_needs_ocr(self, page, text):
+        """A page is OCR'd only if its text layer is unusable and it carries an image."""
+        return self.file_scanned(text) and bool(page.get_images(full=False))
+
+    def load_pdf_pages(self, path):
+        """
+        Extract a PDF page by page: the PyMuPDF text layer where a page has
+        one, OCR only for image-only pages among the first max_pages pages
+        of the document (the same page limit as _ocr_pages); scanned pages
+        past it keep whatever text layer they have.
+        Returns (text, stats) with one {page, source, chars, seconds} entry
+        per page; source is "text", "ocr", "ocr_cache" or "empty".
+        """
+        try:
+            doc = fitz.open(path)
+        except Exception:
+            return "", []
+        texts, stats, scanned = [], [], []
+        with doc:
+            for page_idx, page in enumerate(doc):
+                started = time.perf_counter()
+                text = page.get_text("text")
+                if self.page_needs_ocr(page, text) and (
+                    self.max_pages is None or page_idx < self.max_pages
+                ):
+                    scanned.append(page_idx)
+                    source = "ocr"
+                else:
+                    source = "text" if text.strip() else "empty"
+                texts.append(text)
+                stats.append({"page": page_idx + 1, "source": source, "chars": len(text),
+                              "seconds": time.perf_counter() - started})
+        if scanned:
+            for page_idx, result in self._ocr_page_results(path, self._ocr_engine(), scanned).items():
+                texts[page_idx] = result["text"]
+                stats[page_idx].update(source=result["source"], chars=len(result["text"]),
+                                       seconds=stats[page_idx]["seconds"] + result["seconds"])
+        return "\n".join(texts).strip(), stats
+
+    def _pdf_cache_options(self):
+        # Everything that changes which pages are OCR'd and what OCR returns.
+        engine = "paddle" if PaddleOCR is not None else "tesseract"
+        return f"{engine}|{self.ocr_lang}|{self.dpi}|{self.min_conf}|{self.max_pages}|{self.min_chars}|{self.alpha_ratio}"
+
+    def load_pdf_cached(self, path, sha256=None):
+        """load_pdf_pages through the parsed-document cache; stats are those of the first parse."""
+        if self.doc_cache is None:
+            return self.load_pdf_pages(path)
+        key = self.doc_cache.key(sha256 or sha256_file(path), ".pdf", self._pdf_cache_options())
+        record = self.doc_cache.get(key)
+        if record is not None:
+            print(f"[INFO] Parsed-document cache hit for {os.path.basename(path)}")
+            return record["text"], record["pages"]
+        text, stats = self.load_pdf_pages(path)
+        self.doc_cache.put(key, {"text": text, "pages": stats})
+        self.doc_cache.evict()
+        return text, stats
+
+    def load_file(self, path, image_dir, file_form=None, sha256=None):
+        # file_form overrides the extension, e.g. for extension-less blob-store paths;
+        # sha256 of the file, when the caller has it, saves hashing it for the cache key.
+        file_form = (file_form or os.path.splitext(path)[1]).lower()
         if file_form == ".docx" or file_form == ".doc":
-            file_txt = self.load_docx(path,image_dir)
-            return self.utf8_normalize(file_txt)
+            return self.load_docx(path, image_dir, sha256=sha256)
         elif file_form == ".pdf":
-            file_txt = self.load_pdf(path)
-            use_ocr = self.file_scanned(file_txt)
-            # print('\t[USE_OCR]',use_ocr)
-            if use_ocr:
-                file_txt = self.ocr_pdf(path)
-            # print(file_txt)
+            # OCR is decided per page; the stats stay on the loader for callers that want them.
+            file_txt, self.last_pdf_stats = self.load_pdf_cached(path, sha256=sha256)
+            by_source = {}
+            for page in self.last_pdf_stats:
+                by_source[page["source"]] = by_source.get(page["source"], 0) + 1
+            print(f"[INFO] {os.path.basename(path)}: {len(self.last_pdf_stats)} page(s) {by_source}")
             return self.utf8_normalize(file_txt)
         else:
             print(f"[WARN] WRONG FILE FORM:{path})")
@@ -4,11 +4,12 @@
     3. Call the LLM to learn scoring logic (2.5 point intervals)
     4. Append “comment supplements” to the source JSON if it already exists
 '''
-import sys, os, json,math, base64
+import sys, os, json,math
 import numpy as np
 import time
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
 from src.LLM.LLM_Client import LLMClient
+from src.preprocess.ImagePayload import BoilerplateImageIndex, image_input
 import scripts.config as cfg
 
 class TeacherScoringAnalyzer:
@@ -94,6 +95,10 @@ class TeacherScoringAnalyzer:
             marked_summary = json.load(f)
         all_results = []
         level_keys = sorted(llm_study_list.keys(), key=lambda x: float(x.split('-')[0]))
+        # Images most samples share (logo, cover sheet) are not worth sending.
+        image_index = BoilerplateImageIndex()
+        for s in marked_summary:
+            image_index.add(s["student_id"], s["assignment_text"].get("images", []))
 
         def build_student_content(zid):
             """Extract text/tables/image captions and return text + image_inputs"""
@@ -106,21 +111,17 @@ class TeacherScoringAnalyzer:
                 text += f"\n\nTable {t.get('table_id', '')}:\n{t.get('markdown', '')}"
 
             captions, image_inputs = [], []
-            for img in sample["assignment_text"].get("images", []):
+            images, _boilerplate = image_index.split(sample["assignment_text"].get("images", []))
+            for img in images:
                 cap = img.get("caption", "")
-                path = img.get("path", "")
-                if os.path.exists(path):
-                    try:
-                        with open(path, "rb") as f:
-                            b64 = base64.b64encode(f.read()).decode("utf-8")
-                        image_inputs.append({
-                            "type": "image_url",
-                            "image_url": {"url": f"data:image/jpeg;base64,{b64}"}
-                        })
+                try:
+                    part = image_input(img)
+                    if part is not None:
+                        image_inputs.append(part)
                         if cap:
                             captions.append(cap)
-                    except Exception as e:
-                        print(f"[WARN] Failed to load image {path}: {e}")
+                except Exception as e:
+                    print(f"[WARN] Failed to load image {img.get('image_id')}: {e}")
 
             if captions:
                 text += "\n\n[Image Captions]\n" + "\n".join(captions)
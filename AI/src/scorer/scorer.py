@@ -1,20 +1,32 @@
-import sys, os, json,math, base64, time
+import sys, os, json,math, time, hashlib, tempfile
 import numpy as np
+try:
+    import fcntl
+except ImportError:  # Windows: runs of one assignment are not serialised
+    fcntl = None
 from collections import defaultdict
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../")))
 from src.LLM.LLM_Client import LLMClient
 from src.preprocess.Loader import DataLoader
+from src.preprocess.DocCache import sha256_file
+from src.preprocess.ImagePayload import BoilerplateImageIndex, image_input
 from src.preprocess.Clean import TextCleaner
 import scripts.config as cfg
 from tqdm import tqdm
 
 
+def sha256_json(obj):
+    payload = json.dumps(obj, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
 class TeacherGuidedScorer:
-    def __init__(self, rubric_path, teacher_style_path, output_dir, prompt_template):
+    def __init__(self, rubric_path, teacher_style_path, output_dir, prompt_template, images_dir=None):
         self.rubric_path = rubric_path
         self.teacher_style_path = teacher_style_path
         self.output_dir = output_dir
         self.prompt_template = prompt_template
+        self.images_dir = images_dir or cfg.TEST_IMAGES
         os.makedirs(output_dir, exist_ok=True)
         os.makedirs(cfg.RUBRIC_DIR, exist_ok=True)
 
@@ -31,8 +43,59 @@ class TeacherGuidedScorer:
         with open(teacher_style_path, "r", encoding="utf-8") as f:
             self.teacher_style = json.load(f)
         self.llm = LLMClient(model=cfg.LLM_MODEL)
+        # Inputs shared by every student; a change here invalidates all cached scores.
+        self.input_hashes = {
+            "rubric_sha256": sha256_json(self.rubric_schema),
+            "teacher_style_sha256": sha256_json(self.teacher_style),
+            "prompt_sha256": sha256_file(self.prompt_template),
+        }
+
+    def load_score_cache(self, cache_path):
+        if not cache_path or not os.path.exists(cache_path):
+            return {}
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except Exception as e:
+            print(f"[WARN] Ignoring unreadable score cache {cache_path}: {e}")
+            return {}
+
+    def save_score_cache(self, cache, cache_path):
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(cache_path) or ".", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(cache, f, ensure_ascii=False, indent=2)
+            os.replace(tmp, cache_path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
 
-    def predict_score_specific(self, assign_text, output_path):
+    def update_score_cache(self, entries, cache_path):
+        """
+        Merge entries into the cache file. Re-reads it first, under a lock
+        file next to it, so concurrent runs for other students of the same
+        assignment do not drop each other's entries.
+        """
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        with open(cache_path + ".lock", "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            latest = self.load_score_cache(cache_path)
+            latest.update(entries)
+            self.save_score_cache(latest, cache_path)
+
+    def cached_result(self, cache, zid, input_hashes):
+        """Return the last successful result if none of the scoring inputs changed."""
+        entry = cache.get(zid)
+        if not isinstance(entry, dict) or "result" not in entry:
+            return None
+        if any(entry.get(k) != v for k, v in input_hashes.items()):
+            return None
+        return entry["result"]
+
+    def predict_score_specific(self, assign_text, output_path, cancel_token=None):
         # print(assign_text)
         paragraphs = assign_text["paragraphs"]
         if isinstance(paragraphs, list) and isinstance(paragraphs[0], dict):
@@ -60,19 +123,15 @@ class TeacherGuidedScorer:
         image_inputs = []
         for img in assign_text["images"]:
             # print(img)
-            path = img.get("path", "")
-            if os.path.exists(path):
-                try:
-                    with open(path, "rb") as f:
-                        b64 = base64.b64encode(f.read()).decode("utf-8")
-                    image_inputs.append({
-                        "type": "image_url",
-                        "image_url": {"url": f"data:image/jpeg;base64,{b64}"}
-                    })
-                except Exception as e:
-                    print(f"[WARN] Failed to load {path}: {e}")
+            try:
+                part = image_input(img)
+                if part is not None:
+                    image_inputs.append(part)
+            except Exception as e:
+                print(f"[WARN] Failed to load image {img.get('image_id')}: {e}")
         # print(image_inputs)
-        result = self.llm.call_llm_with_images(prompt, image_inputs, as_json=True, temperature=0.25, max_retries=36)
+        result = self.llm.call_llm_with_images(prompt, image_inputs, as_json=True, temperature=0.25, max_retries=36,
+                                               cancel_token=cancel_token)
  
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         with open(output_path, "w", encoding="utf-8") as f:
@@ -81,39 +140,141 @@ class TeacherGuidedScorer:
         return result
     
 
-    def process_folder(self, input_dir, output_path):
-        marked_list, all_results, failed_students = [], [], []
-        for file_name in tqdm(os.listdir(input_dir)):
-            if not file_name.endswith(".docx"):
+    def process_folder(self, input_dir, output_path, cache_path=None, cancel_token=None, progress=None):
+        """Score every .docx in input_dir; the student id is the file name."""
+        manifest = [
+            {"zid": os.path.splitext(f)[0], "path": os.path.join(input_dir, f), "filename": f}
+            for f in os.listdir(input_dir) if f.endswith(".docx")
+        ]
+        return self.process_manifest(manifest, output_path, cache_path=cache_path,
+                                     cancel_token=cancel_token, progress=progress)
+
+    def load_submissions(self, manifest, image_index, cancel_token=None, cache=None):
+        """
+        Parse every submission up front (the parsed-document cache makes this
+        cheap on re-runs) and record its images in image_index, so images
+        shared across the whole assignment are known before anyone is scored.
+        Submissions with a reusable result in the score cache are not parsed:
+        their images are already in the index from the run that scored them.
+        Returns zid -> {"sha256", "doc"}, {"sha256", "error"} or, for those
+        reused, {"sha256"} alone.
+        """
+        loader = DataLoader()
+        loaded = {}
+        for entry in manifest:
+            if cancel_token is not None:
+                cancel_token.check()
+            zid, file_path = entry["zid"], entry["path"]
+            if zid in loaded:
+                continue
+            file_name = entry.get("filename") or os.path.basename(file_path)
+            try:
+                sha256 = entry.get("sha256") or sha256_file(file_path)
+            except Exception as e:
+                loaded[zid] = {"sha256": None, "error": e}
                 continue
-            zid = os.path.splitext(file_name)[0]
-            file_path = os.path.join(input_dir, file_name)
+            input_hashes = dict(self.input_hashes, submission_sha256=sha256)
+            if cache is not None and self.cached_result(cache, zid, input_hashes) is not None:
+                loaded[zid] = {"sha256": sha256}
+                continue
+            try:
+                doc = loader.load_file(file_path, os.path.join(self.images_dir, zid),
+                                       file_form=os.path.splitext(file_name)[1], sha256=sha256)
+            except Exception as e:
+                loaded[zid] = {"sha256": sha256, "error": e}
+                continue
+            loaded[zid] = {"sha256": sha256, "doc": doc}
+            if isinstance(doc, dict):
+                image_index.add(zid, doc.get("images", []))
+        image_index.save()
+        return loaded
+
+    def process_manifest(self, manifest, output_path, cache_path=None, cancel_token=None, progress=None,
+                         image_index_path=None):
+        """
+        Score the submissions listed in manifest: dicts with zid, path and
+        optionally sha256 (skips re-hashing), mime and filename (its
+        extension picks the loader when path has none).
+        Students whose submission, rubric, teacher-style rubric and prompt
+        are unchanged since their last successful prediction reuse the
+        cached result instead of calling the LLM.
+        Images common to many submissions (see BoilerplateImageIndex, kept in
+        image_index_path, by default next to the score cache) are not sent.
+        cancel_token.check() is called before each student and raises to stop.
+        progress(done, total, message) is called after each student.
+        """
+        marked_list, all_results, failed_students = [], [], []
+        total = len(manifest)
+        cache_path = cache_path or os.path.join(self.output_dir, "score_cache.json")
+        cache = self.load_score_cache(cache_path)
+        image_index = BoilerplateImageIndex(
+            image_index_path or os.path.splitext(cache_path)[0] + "_images.json"
+        )
+        loaded = self.load_submissions(manifest, image_index, cancel_token=cancel_token, cache=cache)
+        reused = 0
+        for done, entry in enumerate(tqdm(manifest)):
+            if progress is not None and done:
+                progress(done, total, f"scored {done}/{total} student(s)")
+            if cancel_token is not None:
+                cancel_token.check()
+            zid = entry["zid"]
+            file_path = entry["path"]
+            file_name = entry.get("filename") or os.path.basename(file_path)
             if zid in marked_list:
                 print(f"[SKIP] {zid} already scored.")
                 continue
 
             try:
-                print(f"[INFO] Processing {file_name}...")
                 marked_list.append(zid)
-                loader = DataLoader()
-                img_path = os.path.join(cfg.TEST_IMAGES,zid)
-                txt_raw = loader.load_file(file_path,img_path)
+                submission = loaded[zid]
+                if submission["sha256"] is None:
+                    raise submission["error"]
+                input_hashes = dict(self.input_hashes, submission_sha256=submission["sha256"])
+                cached = self.cached_result(cache, zid, input_hashes)
+                if cached is not None:
+                    all_results.append({"student_id": zid, "result": cached})
+                    reused += 1
+                    print(f"[SKIP] {zid} unchanged since last prediction, reusing result.")
+                    continue
+                print(f"[INFO] Processing {file_name}...")
+                if "error" in submission:
+                    raise submission["error"]
+                txt_raw = submission["doc"]
+                kept, dropped = image_index.split(txt_raw["images"])
+                if dropped:
+                    print(f"[INFO] {zid}: leaving out {len(dropped)} image(s) shared across submissions.")
+                    txt_raw = dict(txt_raw, images=kept)
                 try:
-                    results = self.predict_score_specific(txt_raw, output_path)
+                    results = self.predict_score_specific(txt_raw, output_path, cancel_token=cancel_token)
                 except RuntimeError as e:
                     failed_students.append(zid)
                     print(f"[WARN] Retrying exhausted for {file_name}: {e}")
                     continue
-                record = {
-                    "student_id": zid,
-                    "result": results
-                }
-                all_results.append(record)
-                print(f"[DONE] {file_name} scored successfully.")
-                time.sleep(5)  # Avoid hitting API rate limits
             except Exception as e:
+                if cancel_token is not None and cancel_token.cancelled:
+                    raise
                 print(f"[ERROR] Failed {file_name}: {e}")
                 failed_students.append(zid)
+                continue
+            record = {
+                "student_id": zid,
+                "result": results
+            }
+            all_results.append(record)
+            cache[zid] = dict(input_hashes, result=results, scored_at=time.time())
+            try:
+                self.update_score_cache({zid: cache[zid]}, cache_path)
+            except Exception as e:
+                # The student is scored; only the next run's reuse is lost.
+                print(f"[WARN] Could not update score cache for {zid}: {e}")
+            print(f"[DONE] {file_name} scored successfully.")
+            # Avoid hitting API rate limits
+            if cancel_token is not None:
+                cancel_token.wait(5)
+            else:
+                time.sleep(5)
+        if progress is not None:
+            progress(total, total, f"scored {total}/{total} student(s)")
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
         if all_results:
             with open(output_path, "w", encoding="utf-8") as f:
@@ -125,7 +286,9 @@ class TeacherGuidedScorer:
                 json.dump([], f, ensure_ascii=False, indent=2)
         if failed_students:
             print(f"[WARN] Failed to mark {len(failed_students)} student(s): {', '.join(failed_students)}")
-        return {"results": all_results, "failed_students": failed_students}
+        if reused:
+            print(f"[INFO] Reused cached scores for {reused} unchanged student(s).")
+        return {"results": all_results, "failed_students": failed_students, "reused": reused}
 
 
 
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Shared fixtures for the preprocessing/scorer tests: a small docx (text,
+blank lines, a table, a repeated logo and a chart) and a two-page PDF with
+a text layer, both built on the fly. Run from AI/:  python -m pytest src/tests
+"""
+import io
+import os
+import sys
+
+import pytest
+
+# Make project importable (src.*, scripts.*) wherever pytest is started.
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..")))
+
+# Standalone script (trains the DNN prior on import); run it with python directly.
+collect_ignore = ["dnn_test.py"]
+
+
+def png_bytes(seed, size=(96, 64), fmt="PNG"):
+    """A small picture whose content (and so perceptual hash) depends on seed."""
+    from PIL import Image, ImageDraw
+
+    im = Image.new("RGB", size, (255, 255, 255))
+    draw = ImageDraw.Draw(im)
+    for i in range(6):
+        x = (seed * 17 + i * 23) % size[0]
+        draw.rectangle([x, i * 10, min(size[0] - 1, x + 20 + seed * 3), i * 10 + 8],
+                       fill=((seed * 70) % 256, 40 * i, 200 - seed * 30))
+    out = io.BytesIO()
+    im.save(out, format=fmt)
+    return out.getvalue()
+
+
+def make_docx(path, body="Introduction", logo_seed=1, chart_seed=2):
+    """
+    Write a docx: text with blank paragraphs, a table and three pictures,
+    the last a JPEG re-save of the first (a near-duplicate, not a byte copy).
+    """
+    from docx import Document
+    from docx.shared import Inches
+
+    doc = Document()
+    doc.add_paragraph(body)
+    doc.add_paragraph("")
+    doc.add_paragraph("Line one\twith a tab")
+    table = doc.add_table(rows=2, cols=2)
+    table.cell(0, 0).text = "Load"
+    table.cell(0, 1).text = "kN"
+    table.cell(1, 0).text = "Dead"
+    table.cell(1, 1).text = "12.5"
+    doc.add_picture(io.BytesIO(png_bytes(logo_seed)), width=Inches(1))
+    doc.add_paragraph("Figure 1: university logo")
+    doc.add_picture(io.BytesIO(png_bytes(chart_seed)), width=Inches(2))
+    doc.add_paragraph("Figure 2: deflection chart")
+    doc.add_picture(io.BytesIO(png_bytes(logo_seed, fmt="JPEG")), width=Inches(1))
+    doc.add_paragraph("")
+    doc.add_paragraph("Conclusion")
+    doc.save(path)
+    return str(path)
+
+
+class FakePaddle:
+    """Stands in for PaddleOCR 3.x: one result dict per image, text derived from the pixels."""
+
+    def __init__(self, lang="en"):
+        self.lang = lang
+        self.calls = []
+
+    def _one(self, img):
+        return {"rec_texts": [f"{img.shape[1]}x{img.shape[0]}", f"ink {int(img.mean())}", "faint"],
+                "rec_scores": [0.95, None, 0.2]}
+
+    def predict(self, x):
+        batch = x if isinstance(x, list) else [x]
+        self.calls.append(len(batch))
+        return [self._one(img) for img in batch]
+
+
+@pytest.fixture
+def fake_paddle(monkeypatch):
+    """PaddleOCR replaced by FakePaddle behind a fresh engine registry, which is returned."""
+    from src.preprocess import Loader
+
+    registry = Loader.OCREngineRegistry(idle_timeout=0)
+    monkeypatch.setattr(Loader, "PaddleOCR", FakePaddle)
+    monkeypatch.setattr(Loader, "_paddle_engine", FakePaddle)
+    monkeypatch.setattr(Loader, "ocr_engines", registry)
+    return registry
+
+
+@pytest.fixture
+def sample_docx(tmp_path):
+    return make_docx(tmp_path / "z1234567.docx")
+
+
+@pytest.fixture
+def sample_pdf(tmp_path):
+    import fitz
+
+    path = tmp_path / "report.pdf"
+    pdf = fitz.open()
+    for n in range(2):
+        page = pdf.new_page()
+        page.insert_text((72, 72), f"Page {n + 1} heading")
+        page.insert_text((72, 100), "Beam deflection is within limits.")
+    pdf.save(str(path))
+    pdf.close()
+    return str(path)
+
+
+@pytest.fixture
+def doc_cache(tmp_path, monkeypatch):
+    """A fresh parsed-document cache in tmp_path, used as the process-wide one."""
+    from src.preprocess import DocCache
+
+    cache = DocCache.ParsedDocCache(str(tmp_path / "doc_cache"), 64 * 1024 * 1024)
+    monkeypatch.setattr(DocCache, "_doc_cache", cache)
+    return cache
+
+
+class FakeLLM:
+    def __init__(self, model=None):
+        pass
+
+
+@pytest.fixture
+def scorer(tmp_path, monkeypatch, doc_cache):
+    """TeacherGuidedScorer without an LLM: each scored document is recorded in scorer.calls."""
+    from src.scorer import scorer as scorer_mod
+
+    monkeypatch.setattr(scorer_mod, "LLMClient", FakeLLM)
+    monkeypatch.setattr(scorer_mod.time, "sleep", lambda s: None)
+    prompt = tmp_path / "prompt.md"
+    prompt.write_text("{{rubric_schema}}\n{{student_text}}", encoding="utf-8")
+    s = scorer_mod.TeacherGuidedScorer(
+        str(tmp_path / "rubric.json"), str(tmp_path / "style.json"), str(tmp_path / "out"),
+        str(prompt), images_dir=str(tmp_path / "images"),
+    )
+    s.calls = []
+
+    def predict(doc, output_path, cancel_token=None):
+        s.calls.append(doc)
+        return {"total": len(s.calls)}
+
+    s.predict_score_specific = predict
+    return s
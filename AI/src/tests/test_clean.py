@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""TextCleaner.process (fused) must give exactly what the step-by-step process_multipass gives."""
+import random
+
+import fitz
+import pytest
+
+from src.preprocess.Clean import TextCleaner
+from src.preprocess.DocxStream import load_docx_stream
+
+CASES = [
+    "",
+    "Introduction\n\nThe beam de-\nflection is 1,250 mm.\nThe beam de-\nflection is 1,250 mm.",
+    "1. SCOPE OF WORK:\nthe contractor shall provide\n\n\n(2) Results\nSee table 3.",
+    "Visit https://example.com/a?b=1 or www.Example.org, mail jo.doe@unsw.edu.au <b>now</b>",
+    "## Heading **bold** _it_ > quote `code`\ttabbed\r\nnext\x00ctrl\x1fend",
+    "“Smart” quotes – en — em ‘single’ ﬁ ligature Ｆｕｌｌ width 1,000,000",
+    "Summary:\n  padded line  \n  padded line  \nlower start follows\nA\nB\nC",
+]
+
+
+@pytest.fixture(scope="module")
+def cleaner():
+    return TextCleaner()
+
+
+@pytest.mark.parametrize("text", CASES)
+def test_fused_matches_multipass(cleaner, text):
+    assert cleaner.process(text) == cleaner.process_multipass(text)
+
+
+def test_fused_matches_multipass_on_fixture_documents(cleaner, sample_docx, sample_pdf):
+    doc = load_docx_stream(sample_docx)
+    with fitz.open(sample_pdf) as pdf:
+        pdf_text = "\n".join(page.get_text("text") for page in pdf)
+    for text in ("\n".join(p["text"] for p in doc["paragraphs"]), pdf_text):
+        assert text
+        assert cleaner.process(text) == cleaner.process_multipass(text)
+
+
+def test_fused_matches_multipass_on_random_text(cleaner):
+    rng = random.Random(25)
+    alphabet = list("abcXYZ019 ,.:-#*_>`<@/\n\n\t\r\x00\x7f") + ["://", "www.", "’", "–", "ﬁ", "1,000", "-\n"]
+    for _ in range(2000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+        assert cleaner.process(text) == cleaner.process_multipass(text), repr(text)
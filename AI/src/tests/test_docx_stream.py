@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""The streaming docx parser (DocxStream) against the python-docx reference, load_docx_dom."""
+from src.preprocess.DocxStream import load_docx_stream, parse_docx
+from src.preprocess.Loader import DataLoader
+
+
+def test_stream_matches_dom_text_tables_and_meta(sample_docx, tmp_path):
+    dom = DataLoader(doc_cache=None).load_docx_dom(sample_docx, str(tmp_path / "dom_images"))
+    stream = load_docx_stream(sample_docx)
+
+    assert stream["paragraphs"] == dom["paragraphs"]
+    assert stream["tables"] == dom["tables"]
+    assert stream["meta"] == dom["meta"] == {
+        "zid": "z1234567", "ext": "docx", "filename": "z1234567.docx",
+    }
+    assert [p["text"] for p in stream["paragraphs"]][:3] == [
+        "Introduction", "Line one\twith a tab", "Figure 1: university logo",
+    ]
+    assert "| Dead | 12.5 |" in stream["tables"][0]["markdown"]
+
+
+def test_stream_images_carry_dom_captions(sample_docx, tmp_path):
+    dom = DataLoader(doc_cache=None).load_docx_dom(sample_docx, str(tmp_path / "dom_images"))
+    stream = load_docx_stream(sample_docx, str(tmp_path / "stream_images"))
+
+    dom_captions = {img["image_id"]: img["caption"] for img in dom["images"]}
+    assert stream["images"]
+    for img in stream["images"]:
+        assert img["caption"] == dom_captions[img["image_id"]]
+
+
+def test_unreadable_docx_gives_empty_result(tmp_path):
+    bad = tmp_path / "broken.docx"
+    bad.write_bytes(b"not a zip")
+
+    assert parse_docx(str(bad)) is None
+    assert load_docx_stream(str(bad)) == {"paragraphs": [], "tables": [], "images": [], "meta": {}}
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""Near-duplicate images within a submission, and boilerplate images shared across submissions."""
+import multiprocessing
+
+from conftest import make_docx, png_bytes
+
+from src.preprocess import DocCache
+from src.preprocess.DocxStream import parse_docx
+from src.preprocess.ImagePayload import (
+    PHASH_MAX_DISTANCE,
+    BoilerplateImageIndex,
+    dedupe_images,
+    hash_distance,
+    perceptual_hash,
+)
+
+
+def test_resaved_copy_is_near_and_other_picture_is_far():
+    logo = perceptual_hash(png_bytes(1))
+    assert hash_distance(logo, perceptual_hash(png_bytes(1, fmt="JPEG"))) <= PHASH_MAX_DISTANCE
+    assert hash_distance(logo, perceptual_hash(png_bytes(2))) > PHASH_MAX_DISTANCE
+    # Bytes Pillow cannot decode only match themselves.
+    emf = perceptual_hash(b"\x01\x00\x00\x00EMF")
+    assert emf.startswith("x") and hash_distance(emf, emf) == 0
+    assert hash_distance(emf, perceptual_hash(b"\x01\x00\x00\x00EMF+")) == 128
+
+
+def test_docx_keeps_one_of_each_near_duplicate(sample_docx):
+    media = parse_docx(sample_docx)["media"]
+
+    assert [(m["image_id"], m["caption"]) for m in media] == [
+        (1, "Figure 1: university logo"),
+        (2, "Figure 2: deflection chart"),
+    ]
+
+
+def test_dropped_copy_hands_over_its_caption():
+    items = [
+        {"image_id": 1, "phash": "0" * 32, "caption": ""},
+        {"image_id": 2, "phash": "0" * 31 + "1", "caption": "Figure 2: logo"},
+    ]
+    assert dedupe_images(items) == [{"image_id": 1, "phash": "0" * 32, "caption": "Figure 2: logo"}]
+
+
+def test_cache_key_follows_the_dedupe_threshold(sample_docx, doc_cache, monkeypatch):
+    DocCache.load_docx_cached(sample_docx, cache=doc_cache)
+    DocCache.load_docx_cached(sample_docx, cache=doc_cache)
+    assert (doc_cache.stats["hits"], doc_cache.stats["misses"]) == (1, 1)
+
+    monkeypatch.setattr(DocCache, "PHASH_MAX_DISTANCE", 0)
+    DocCache.load_docx_cached(sample_docx, cache=doc_cache)
+    assert doc_cache.stats["misses"] == 2
+
+
+def test_index_flags_images_most_submissions_share(tmp_path):
+    path = str(tmp_path / "score_cache_images.json")
+    index = BoilerplateImageIndex(path, min_submissions=3, min_share=0.5)
+    logo = perceptual_hash(png_bytes(1))
+    for n in range(4):
+        index.add(f"z{n}", [{"phash": logo}, {"phash": perceptual_hash(png_bytes(10 + n))}])
+
+    own = {"phash": perceptual_hash(png_bytes(10))}
+    resaved_logo = {"phash": perceptual_hash(png_bytes(1, fmt="JPEG"))}
+    assert index.split([resaved_logo, own]) == ([own], [resaved_logo])
+    assert not index.is_boilerplate(None)
+
+    index.save()
+    reloaded = BoilerplateImageIndex(path, min_submissions=3, min_share=0.5)
+    assert reloaded.submissions == index.submissions
+    # Too few submissions share it once the assignment grows.
+    for n in range(4, 10):
+        reloaded.add(f"z{n}", [])
+    assert not reloaded.is_boilerplate(logo)
+
+
+def _save_one(path, n):
+    index = BoilerplateImageIndex(path)
+    index.add(f"z{n}", [{"phash": perceptual_hash(png_bytes(n))}])
+    index.save()
+
+
+def test_concurrent_saves_keep_every_submission(tmp_path):
+    path = str(tmp_path / "score_cache_images.json")
+    ctx = multiprocessing.get_context("fork")
+    procs = [ctx.Process(target=_save_one, args=(path, n)) for n in range(6)]
+    for p in procs:
+        p.start()
+    for p in procs:
+        p.join()
+
+    assert [p.exitcode for p in procs] == [0] * 6
+    assert sorted(BoilerplateImageIndex(path).submissions) == [f"z{n}" for n in range(6)]
+    assert not [f for f in tmp_path.iterdir() if f.suffix == ".tmp"]
+
+
+def test_scorer_leaves_out_images_shared_by_the_assignment(tmp_path, scorer):
+    manifest = [
+        {"zid": f"z{n}", "path": make_docx(tmp_path / f"z{n}.docx", chart_seed=2 + n),
+         "filename": f"z{n}.docx"}
+        for n in range(3)
+    ]
+    scorer.process_manifest(manifest, str(tmp_path / "out" / "pred.json"),
+                            cache_path=str(tmp_path / "out" / "score_cache.json"))
+
+    assert len(scorer.calls) == 3
+    for doc in scorer.calls:
+        # The logo is in every submission; only each student's own chart is sent.
+        assert [img["caption"] for img in doc["images"]] == ["Figure 2: deflection chart"]
+    assert (tmp_path / "out" / "score_cache_images.json").exists()
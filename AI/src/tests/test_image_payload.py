@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Image prompt parts built from the docx archive in memory, downscaled, without disk writes."""
+import base64
+import io
+import os
+
+from PIL import Image
+
+from src.preprocess.DocxStream import assemble_docx, parse_docx
+from src.preprocess.ImagePayload import image_input, read_image_bytes, shrink_image
+
+
+def decode_part(part):
+    header, b64 = part["image_url"]["url"].split(",", 1)
+    return header, base64.b64decode(b64)
+
+
+def test_image_parts_come_from_the_archive_without_files(sample_docx, tmp_path):
+    image_dir = tmp_path / "images"
+    doc = assemble_docx(sample_docx, parse_docx(sample_docx), str(image_dir), write_images=False)
+
+    assert doc["images"] and not image_dir.exists()
+    for img in doc["images"]:
+        assert img["archive"] == os.path.abspath(sample_docx) and "path" not in img
+        part = image_input(img)
+        assert part["type"] == "image_url"
+        header, data = decode_part(part)
+        assert header.startswith("data:image/") and header.endswith(";base64")
+        Image.open(io.BytesIO(data)).verify()
+    assert not image_dir.exists()
+
+
+def test_debug_mode_writes_the_originals(sample_docx, tmp_path):
+    doc = assemble_docx(sample_docx, parse_docx(sample_docx), str(tmp_path / "images"), write_images=True)
+
+    for img in doc["images"]:
+        with open(img["path"], "rb") as f:
+            assert f.read() == read_image_bytes(dict(img, path=None))
+
+
+def test_large_images_are_downscaled_to_jpeg():
+    big = Image.new("RGBA", (3000, 1500), (0, 120, 200, 128))
+    out = io.BytesIO()
+    big.save(out, format="PNG")
+
+    data, mime = shrink_image(out.getvalue(), max_edge=1024, quality=80)
+    im = Image.open(io.BytesIO(data))
+    assert mime == "image/jpeg" and im.format == "JPEG"
+    assert im.size == (1024, 512)
+
+
+def test_undecodable_bytes_pass_through_and_missing_images_are_skipped():
+    assert shrink_image(b"\x01\x00\x00\x00EMF") == (b"\x01\x00\x00\x00EMF", "image/jpeg")
+    assert image_input({"path": "/nonexistent/img_1.png"}) is None
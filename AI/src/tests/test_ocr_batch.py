@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""Batched PaddleOCR predict calls: results split back per page, same text as page by page."""
+import fitz
+import numpy as np
+
+from conftest import FakePaddle
+from src.preprocess.Loader import _batch_texts, _ocr_run
+
+
+def test_batch_texts_splits_results_and_filters_confidence():
+    results = [
+        {"rec_texts": ["a", "b", "c"], "rec_scores": np.array([0.9, 0.1, np.nan])},
+        {"rec_texts": ["x"], "rec_scores": []},
+        {"rec_texts": ["kept", "none"], "rec_scores": [0.8, None]},
+    ]
+    assert _batch_texts(results, 0.7) == ["a\nc", "x", "kept\nnone"]
+    assert _batch_texts(results, 0) == ["a\nb\nc", "x", "kept\nnone"]
+    assert _batch_texts([], 0.5) == []
+
+
+def test_batched_run_matches_page_by_page(sample_pdf):
+    per_page, batched = FakePaddle(), FakePaddle()
+    with fitz.open(sample_pdf) as doc:
+        pages = [0, 1, 0]  # more pages than one batch, last batch short
+        one = list(_ocr_run(doc, pages, "paddle", per_page, 72, 0.5, "en", batch_size=1))
+        two = list(_ocr_run(doc, pages, "paddle", batched, 72, 0.5, "en", batch_size=2))
+
+    assert [(i, text) for i, text, _ in two] == [(i, text) for i, text, _ in one]
+    assert "faint" not in one[0][1] and "ink" in one[0][1]
+    assert per_page.calls == [1, 1, 1]
+    assert batched.calls == [2, 1]
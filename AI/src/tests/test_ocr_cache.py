@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""OCR page cache: counters, LRU eviction by byte budget, and what the key covers."""
+import os
+
+import fitz
+
+from src.preprocess.DocCache import stats_since
+from src.preprocess.Loader import OCRPageCache
+
+
+def _pixmaps(pdf_path, dpi=72):
+    with fitz.open(pdf_path) as doc:
+        return [page.get_pixmap(matrix=fitz.Matrix(dpi / 72, dpi / 72), alpha=False) for page in doc]
+
+
+def test_hits_misses_and_writes_are_counted(tmp_path, sample_pdf):
+    cache = OCRPageCache(str(tmp_path / "ocr"), max_bytes=1024 * 1024)
+    key = cache.key(_pixmaps(sample_pdf)[0], 72, "paddle", 0.7, "en")
+    before = cache.snapshot()
+
+    assert cache.get(key) is None
+    cache.put(key, "Page 1 heading")
+    assert cache.get(key) == "Page 1 heading"
+
+    stats = cache.snapshot()
+    assert (stats["hits"], stats["misses"], stats["writes"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5 and stats["bytes"] == len("Page 1 heading")
+    assert stats_since(before, stats)["hits"] == 1
+    assert stats_since(stats, cache.snapshot()) == {
+        "hits": 0, "misses": 0, "writes": 0, "evictions": 0, "bytes_evicted": 0, "hit_rate": 0.0,
+    }
+
+
+def test_least_recently_used_pages_go_first(tmp_path):
+    cache = OCRPageCache(str(tmp_path / "ocr"), max_bytes=35)
+    for n, key in enumerate(("aa", "bb", "cc")):
+        cache.put(key, "x" * 10)
+        os.utime(cache._path(key), (1000 + n, 1000 + n))
+    assert cache.get("aa") == "x" * 10  # a hit makes it the most recent
+
+    cache.put("dd", "y" * 10)
+    cache.evict()
+
+    assert [k for k in ("aa", "bb", "cc", "dd") if os.path.exists(cache._path(k))] == ["aa", "cc", "dd"]
+    stats = cache.snapshot()
+    assert (stats["evictions"], stats["bytes_evicted"], stats["bytes"]) == (1, 10, 30)
+
+
+def test_key_follows_raster_and_recognition_settings(sample_pdf):
+    first, second = _pixmaps(sample_pdf)
+    base = OCRPageCache.key(first, 72, "paddle", 0.7, "en")
+
+    assert OCRPageCache.key(_pixmaps(sample_pdf)[0], 72, "paddle", 0.7, "en") == base
+    assert len({
+        base,
+        OCRPageCache.key(first, 72, "tesseract", 0.7, "en"),
+        OCRPageCache.key(first, 72, "paddle", 0.7, "ch"),
+        OCRPageCache.key(first, 72, "paddle", 0.5, "en"),
+        OCRPageCache.key(_pixmaps(sample_pdf, dpi=144)[0], 144, "paddle", 0.7, "en"),
+        OCRPageCache.key(second, 72, "paddle", 0.7, "en"),
+    }) == 6
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""OCR models: created on first use, shared per (engine, lang), released once idle."""
+import threading
+import time
+
+import pytest
+
+from src.preprocess import Loader
+from src.preprocess.Loader import OCREngineRegistry
+
+
+class FakeModel:
+    def __init__(self, lang):
+        self.lang = lang
+
+
+@pytest.fixture
+def built(monkeypatch):
+    """Languages of the models the registry has constructed, in order."""
+    langs = []
+
+    def factory(lang="en"):
+        langs.append(lang)
+        return FakeModel(lang)
+
+    monkeypatch.setattr(Loader, "_paddle_engine", factory)
+    return langs
+
+
+def test_model_is_built_on_first_use_and_shared_per_key(built):
+    registry = OCREngineRegistry(idle_timeout=0)
+    assert built == [] and registry.loaded() == []
+
+    with registry.use("paddle", "en") as first:
+        pass
+    with registry.use("paddle", "en") as again:
+        pass
+    with registry.use("paddle", "ch") as chinese:
+        pass
+
+    assert again is first and chinese is not first and chinese.lang == "ch"
+    assert built == ["en", "ch"] and registry.loads == 2
+    assert registry.loaded() == [("paddle", "ch"), ("paddle", "en")]
+
+
+def test_tesseract_needs_no_model(built):
+    registry = OCREngineRegistry(idle_timeout=0)
+    with registry.use("tesseract", "eng") as ocr:
+        assert ocr is None
+    assert built == [] and registry.loaded() == []
+
+
+def test_idle_models_are_released_and_rebuilt_on_demand(built):
+    registry = OCREngineRegistry(idle_timeout=30)
+    registry.warm_up("paddle", "en")
+    registry.warm_up("paddle", "ch")
+    with registry.use("paddle", "ch"):
+        pass
+    now = time.monotonic()
+
+    assert registry.release_idle(now=now + 10) == 0
+    assert registry.release_idle(now=now + 31) == 2
+    assert registry.loaded() == [] and registry.releases == 2
+
+    registry.warm_up("paddle", "en")
+    assert built == ["en", "ch", "en"] and registry.loads == 3
+
+
+def test_model_in_use_is_not_released(built):
+    registry = OCREngineRegistry(idle_timeout=30)
+    registry.warm_up()
+    borrowed, done = threading.Event(), threading.Event()
+
+    def hold():
+        with registry.use():
+            borrowed.set()
+            done.wait(2)
+
+    worker = threading.Thread(target=hold)
+    worker.start()
+    borrowed.wait(2)
+    try:
+        assert registry.release_idle(now=time.monotonic() + 60) == 0
+    finally:
+        done.set()
+        worker.join()
+    assert registry.release_idle(now=time.monotonic() + 60) == 1
+
+
+def test_zero_timeout_keeps_models(built):
+    registry = OCREngineRegistry(idle_timeout=0)
+    registry.warm_up()
+    assert registry.release_idle(now=time.monotonic() + 10 ** 6) == 0
+    assert registry.loaded() == [("paddle", "en")] and registry._reaper is None
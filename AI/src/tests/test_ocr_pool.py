@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""Scanned pages recognised in the OCR process pool come back in page order."""
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import fitz
+import pytest
+
+from src.preprocess import Loader
+from src.preprocess.Loader import DataLoader, OCRPageCache
+
+
+def slow_first_runs(args):
+    """Stub pool task: earlier pages take longer, so runs finish in reverse order."""
+    path, pages, *_ = args
+    time.sleep(0.05 * (8 - pages[0]))
+    with open(path + ".finished", "a") as f:
+        f.write(f"{pages[0]}\n")
+    return [(f"text of page {i}", 0.0) for i in pages]
+
+
+@pytest.fixture
+def eight_page_pdf(tmp_path):
+    path = tmp_path / "scan.pdf"
+    pdf = fitz.open()
+    for n in range(8):
+        pdf.new_page().insert_text((72, 72), f"page {n}")
+    pdf.save(str(path))
+    pdf.close()
+    return str(path)
+
+
+def test_pool_results_are_placed_by_page(tmp_path, eight_page_pdf, monkeypatch):
+    pool = ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("fork"))
+    monkeypatch.setattr(Loader, "_ocr_page_range", slow_first_runs)
+    monkeypatch.setattr(Loader, "_get_ocr_pool", lambda workers, engine, lang: pool)
+    loader = DataLoader(ocr_workers=2, ocr_cache=OCRPageCache(str(tmp_path / "ocr")))
+    try:
+        results = loader._ocr_page_results(eight_page_pdf, "paddle", list(range(8)))
+    finally:
+        pool.shutdown()
+
+    with open(eight_page_pdf + ".finished") as f:
+        finished = [int(line) for line in f]
+    assert finished != sorted(finished)  # the workers really did finish out of order
+    assert list(results) == sorted(results) == list(range(8))
+    assert [r["text"] for r in results.values()] == [f"text of page {i}" for i in range(8)]
+    assert {r["source"] for r in results.values()} == {"ocr"}
+
+
+def test_single_page_is_recognised_in_process(tmp_path, sample_pdf, fake_paddle, monkeypatch):
+    def no_pool(*args):
+        raise AssertionError("one page should not start the OCR pool")
+
+    monkeypatch.setattr(Loader, "_get_ocr_pool", no_pool)
+    loader = DataLoader(ocr_workers=4, ocr_cache=OCRPageCache(str(tmp_path / "ocr")))
+
+    results = loader._ocr_page_results(sample_pdf, "paddle", [1])
+
+    assert list(results) == [1] and "ink " in results[1]["text"]
+    assert fake_paddle.loads == 1
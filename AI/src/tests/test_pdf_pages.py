@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""PDFs extracted page by page: the text layer where it is usable, OCR (then the OCR cache) elsewhere."""
+import fitz
+import pytest
+
+from conftest import png_bytes
+from src.preprocess.Loader import DataLoader, OCRPageCache
+
+
+@pytest.fixture
+def mixed_pdf(tmp_path):
+    """A text page, a scanned page, a scan with a stray page number, and a blank page."""
+    path = tmp_path / "mixed.pdf"
+    pdf = fitz.open()
+    page = pdf.new_page()
+    page.insert_text((72, 72), "Beam deflection is within the limits of AS 3600.")
+    pdf.new_page().insert_image(fitz.Rect(72, 72, 360, 264), stream=png_bytes(3))
+    page = pdf.new_page()
+    page.insert_image(fitz.Rect(72, 72, 360, 264), stream=png_bytes(4))
+    page.insert_text((300, 800), "3")
+    pdf.new_page()
+    pdf.save(str(path))
+    pdf.close()
+    return str(path)
+
+
+@pytest.fixture
+def loader(tmp_path, fake_paddle, doc_cache):
+    return DataLoader(ocr_workers=1, ocr_cache=OCRPageCache(str(tmp_path / "ocr")), doc_cache=doc_cache)
+
+
+def test_page_needs_ocr_only_without_a_usable_text_layer(mixed_pdf, loader):
+    with fitz.open(mixed_pdf) as doc:
+        assert [loader.page_needs_ocr(page, page.get_text("text")) for page in doc] == [
+            False, True, True, False,
+        ]
+
+
+def test_pages_are_read_or_recognised_then_cached(mixed_pdf, loader, fake_paddle):
+    text, stats = loader.load_pdf_pages(mixed_pdf)
+
+    assert [s["page"] for s in stats] == [1, 2, 3, 4]
+    assert [s["source"] for s in stats] == ["text", "ocr", "ocr", "empty"]
+    assert "AS 3600" in text and text.count("ink ") == 2 and "faint" not in text
+    assert stats[0]["chars"] == len("Beam deflection is within the limits of AS 3600.\n")
+    assert all(s["chars"] > 0 for s in stats[1:3]) and stats[3]["chars"] == 0
+    assert all(s["seconds"] >= 0 for s in stats)
+
+    again, stats = loader.load_pdf_pages(mixed_pdf)
+    assert again == text
+    assert [s["source"] for s in stats] == ["text", "ocr_cache", "ocr_cache", "empty"]
+    with fake_paddle.use() as ocr:
+        assert sum(ocr.calls) == 2  # the rerun recognised nothing
+    assert fake_paddle.loads == 1
+
+
+def test_scans_past_max_pages_keep_their_text_layer(mixed_pdf, loader):
+    loader.max_pages = 2
+    text, stats = loader.load_pdf_pages(mixed_pdf)
+
+    assert [s["source"] for s in stats] == ["text", "ocr", "text", "empty"]
+    assert text.count("ink ") == 1
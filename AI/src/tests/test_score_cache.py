@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""Score cache of TeacherGuidedScorer: unchanged submissions skip the LLM, and saves merge."""
+import json
+import os
+
+from conftest import make_docx
+
+
+def first_texts(docs):
+    return [doc["paragraphs"][0]["text"] for doc in docs]
+
+
+def test_unchanged_submission_reuses_cached_score(tmp_path, scorer):
+    path = make_docx(tmp_path / "a.docx", body="First draft")
+    manifest = [{"zid": "z1", "path": path, "filename": "a.docx"}]
+    out = str(tmp_path / "out" / "pred.json")
+    cache_path = str(tmp_path / "out" / "score_cache.json")
+
+    first = scorer.process_manifest(manifest, out, cache_path=cache_path)
+    assert first["reused"] == 0 and first_texts(scorer.calls) == ["First draft"]
+
+    second = scorer.process_manifest(manifest, out, cache_path=cache_path)
+    assert second["reused"] == 1 and len(scorer.calls) == 1
+    assert second["results"] == first["results"]
+
+    # A new submission (new sha256) is scored again.
+    make_docx(path, body="Second draft")
+    third = scorer.process_manifest(manifest, out, cache_path=cache_path)
+    assert third["reused"] == 0 and first_texts(scorer.calls)[-1] == "Second draft"
+
+
+def test_reused_submission_is_not_parsed(tmp_path, scorer, monkeypatch):
+    from src.scorer import scorer as scorer_mod
+
+    parsed = []
+    load_file = scorer_mod.DataLoader.load_file
+
+    def counting(self, path, *args, **kwargs):
+        parsed.append(os.path.basename(path))
+        return load_file(self, path, *args, **kwargs)
+
+    monkeypatch.setattr(scorer_mod.DataLoader, "load_file", counting)
+    manifest = [
+        {"zid": f"z{n}", "path": make_docx(tmp_path / f"{n}.docx", body=f"Draft {n}"),
+         "filename": f"{n}.docx"}
+        for n in range(2)
+    ]
+    out = str(tmp_path / "out" / "pred.json")
+    cache_path = str(tmp_path / "out" / "score_cache.json")
+    scorer.process_manifest(manifest, out, cache_path=cache_path)
+    assert parsed == ["0.docx", "1.docx"]
+
+    make_docx(manifest[1]["path"], body="Draft 1, revised")
+    second = scorer.process_manifest(manifest, out, cache_path=cache_path)
+
+    assert parsed[2:] == ["1.docx"]
+    assert second["reused"] == 1 and first_texts(scorer.calls)[-1] == "Draft 1, revised"
+
+
+def test_cache_save_merges_entries_of_other_runs(tmp_path, scorer):
+    cache_path = str(tmp_path / "out" / "score_cache.json")
+    scorer.save_score_cache({"z9": {"result": {"total": 9}}}, cache_path)
+
+    path = make_docx(tmp_path / "a.docx")
+    result = scorer.process_manifest(
+        [{"zid": "z1", "path": path, "filename": "a.docx"}],
+        str(tmp_path / "out" / "pred.json"), cache_path=cache_path,
+    )
+
+    with open(cache_path, encoding="utf-8") as f:
+        cache = json.load(f)
+    assert sorted(cache) == ["z1", "z9"]
+    assert cache["z1"]["result"] == {"total": 1}
+    assert [n for n in os.listdir(os.path.dirname(cache_path)) if n.endswith(".tmp")] == []
+    assert result["failed_students"] == []
+
+
+def test_failed_cache_write_keeps_the_score(tmp_path, scorer, monkeypatch):
+    def broken(cache, cache_path):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(scorer, "save_score_cache", broken)
+    path = make_docx(tmp_path / "a.docx")
+    result = scorer.process_manifest(
+        [{"zid": "z1", "path": path, "filename": "a.docx"}],
+        str(tmp_path / "out" / "pred.json"), cache_path=str(tmp_path / "out" / "score_cache.json"),
+    )
+    assert [r["student_id"] for r in result["results"]] == ["z1"]
+    assert result["failed_students"] == []
@@ -23,6 +23,56 @@ class Settings(BaseSettings):
 
     # ---------- AI / OpenAI setting ----------
     openai_api_key: str | None = Field(default=None, alias="OPENAI_API_KEY")
+    # Jobs run at once; each one stages its own inputs, so they do not collide.
+    ai_worker_count: int = Field(default=2, ge=1, alias="AI_WORKER_COUNT")
+    # Interactive (single-student) jobs served per bulk job when both wait.
+    ai_interactive_weight: int = Field(default=4, ge=1, alias="AI_INTERACTIVE_WEIGHT")
+    # Wall-clock limit for one AI job; 0 disables the deadline.
+    ai_job_timeout_seconds: int = Field(
+        default=3600, ge=0, alias="AI_JOB_TIMEOUT_SECONDS"
+    )
+    # Finished jobs leave the live status map after this long; 0 keeps them.
+    ai_job_retention_seconds: int = Field(
+        default=900, ge=0, alias="AI_JOB_RETENTION_SECONDS"
+    )
+    # Queued (not yet running) AI jobs accepted before enqueue returns 503/429;
+    # 0 disables the limit.
+    ai_queue_max_pending: int = Field(default=500, ge=0, alias="AI_QUEUE_MAX_PENDING")
+    ai_queue_max_pending_per_course: int = Field(
+        default=200, ge=0, alias="AI_QUEUE_MAX_PENDING_PER_COURSE"
+    )
+    # Processes that run the predict pipeline; 0 runs it inside the API process.
+    # Unset means one per AI worker, so a running job never waits for a process.
+    ai_pipeline_processes: int | None = Field(
+        default=None, ge=0, alias="AI_PIPELINE_PROCESSES"
+    )
+    # Recycle a pipeline process after this many jobs; 0 keeps it forever.
+    ai_pipeline_max_tasks_per_child: int = Field(
+        default=20, ge=0, alias="AI_PIPELINE_MAX_TASKS_PER_CHILD"
+    )
+    # Load the OCR model when a pipeline process starts rather than on its
+    # first scanned PDF (idle release: OCR_ENGINE_IDLE_SECONDS in the AI module).
+    ai_ocr_warm_up: bool = Field(default=False, alias="AI_OCR_WARM_UP")
+
+    # ---------- janitor setting ----------
+    # How often stale files are swept off the request path; 0 disables it.
+    janitor_interval_seconds: int = Field(
+        default=3600, ge=0, alias="JANITOR_INTERVAL_SECONDS"
+    )
+    # Age after which each kind of leftover is removed; 0 keeps it forever.
+    janitor_workspace_retention_seconds: int = Field(
+        default=86400, ge=0, alias="JANITOR_WORKSPACE_RETENTION_SECONDS"
+    )
+    janitor_upload_retention_seconds: int = Field(
+        default=7 * 86400, ge=0, alias="JANITOR_UPLOAD_RETENTION_SECONDS"
+    )
+    janitor_log_retention_seconds: int = Field(
+        default=30 * 86400, ge=0, alias="JANITOR_LOG_RETENTION_SECONDS"
+    )
+    # Unreferenced blobs younger than this survive (an upload may be mid-commit).
+    blob_gc_grace_seconds: int = Field(
+        default=3600, ge=0, alias="BLOB_GC_GRACE_SECONDS"
+    )
 
     # ---------- upload setting ----------
     upload_root: Path = Field(default=Path("uploads"), alias="UPLOAD_ROOT")
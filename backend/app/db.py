@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 from .config import settings
@@ -19,3 +19,19 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def ensure_columns(bind, table: str, columns: dict[str, str]) -> list[str]:
+    """
+    Add nullable columns that create_all() cannot add to an existing table.
+    ``columns`` maps column name to its SQL type; returns the names added.
+    """
+    insp = inspect(bind)
+    if table not in insp.get_table_names():
+        return []
+    existing = {c["name"] for c in insp.get_columns(table)}
+    added = [name for name in columns if name not in existing]
+    with bind.begin() as conn:
+        for name in added:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {columns[name]}"))
+    return added
@@ -19,10 +19,16 @@ class UserClaims:
 def get_current_user(
     creds: HTTPAuthorizationCredentials = Depends(auth_scheme),
 ) -> UserClaims:
-    token = creds.credentials
+    return user_from_token(creds.credentials)
+
+
+def user_from_token(token: str, scope: Optional[str] = None) -> UserClaims:
+    """
+    Decode a token. Access tokens carry no scope; a stream token (see
+    create_stream_token) is only accepted where its exact scope is asked for.
+    """
     try:
         payload = decode_token(token)
-        return UserClaims(sub=str(payload.get("sub")), role=payload.get("role"))
     except ExpiredSignatureError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -32,6 +38,11 @@ def get_current_user(
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
         )
+    if payload.get("scope") != scope:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token"
+        )
+    return UserClaims(sub=str(payload.get("sub")), role=payload.get("role"))
 
 
 def require_role(*roles: str):
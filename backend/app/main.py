@@ -2,7 +2,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app import models  # noqa: F401  (ensures models are registered)
-from app.db import Base, engine
+from app.db import Base, engine, ensure_columns
 from app.logging import configure_logging
 from app.middleware import RequestLoggingMiddleware
 from app.routers import (
@@ -15,6 +15,10 @@ from app.routers import (
     submissions,
     system_logs,
 )
+from app.services import blob_store  # noqa: F401  (registers blob refcount hooks)
+from app.services.ai_process_pool import shutdown_pipeline_pool
+from app.services.janitor import start_janitor, stop_janitor
+from app.utils.jobq import get_jobq
 
 app = FastAPI(title="Grader Backend (Poetry + AI)", version="1.0.0")
 configure_logging()
@@ -32,6 +36,22 @@ app.add_middleware(RequestLoggingMiddleware)
 @app.on_event("startup")
 def on_startup():
     Base.metadata.create_all(bind=engine)
+    # Columns added after the first release; no-ops on fresh databases.
+    ensure_columns(engine, "submission_files", {"sha256": "VARCHAR(64)"})
+    ensure_columns(
+        engine,
+        "assignments",
+        {"spec_sha256": "VARCHAR(64)", "rubric_sha256": "VARCHAR(64)"},
+    )
+    # Pick up jobs that were queued or running before a restart/reload.
+    get_jobq().recover()
+    start_janitor()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    stop_janitor()
+    shutdown_pipeline_pool()
 
 
 app.include_router(auth.router)
@@ -3,7 +3,16 @@ from enum import Enum
 
 from sqlalchemy import Column, DateTime
 from sqlalchemy import Enum as SQLEnum
-from sqlalchemy import ForeignKey, Integer, String, Text, UniqueConstraint, func
+from sqlalchemy import (
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+    func,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from .db import Base
@@ -59,6 +68,9 @@ class Assignment(Base):
     rubric_json = Column(Text, nullable=True)
     spec_url = Column(Text, nullable=True)
     meta_json = Column(Text, nullable=True)
+    # Blob-store keys of the current spec/rubric files (see services/blob_store.py)
+    spec_sha256 = Column(String(64), nullable=True)
+    rubric_sha256 = Column(String(64), nullable=True)
 
     course = relationship("Course", back_populates="assignments")
 
@@ -133,7 +145,9 @@ class SubmissionFile(Base):
     part_kind: Mapped[PartKind] = mapped_column(SQLEnum(PartKind), index=True)
 
     filename: Mapped[str]
+    # Points into the blob store (uploads/blobs/ab/cd/<sha256>) for new uploads.
     path: Mapped[str]
+    sha256: Mapped[str | None] = mapped_column(String(64), nullable=True)
     mime: Mapped[str | None]
     size: Mapped[int | None]
     uploaded_by: Mapped[int] = mapped_column(ForeignKey("users.id"))
@@ -162,3 +176,78 @@ class SystemLog(Base):
     user = relationship("User", lazy="joined")
     course = relationship("Course", lazy="joined")
     assignment = relationship("Assignment", lazy="joined")
+
+
+class AIJob(Base):
+    """Durable record of an AI marking job so queued work survives restarts."""
+
+    __tablename__ = "ai_jobs"
+    __table_args__ = (
+        UniqueConstraint("assignment_id", "zid", name="uq_ai_job_assignment_zid"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    assignment_id = Column(
+        Integer,
+        ForeignKey("assignments.id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    # Empty string means the job covers every student of the assignment.
+    zid = Column(String(32), default="", nullable=False)
+    state = Column(String(16), default="queued", nullable=False, index=True)
+    lane = Column(String(16), default="bulk", nullable=False)
+    progress = Column(Float, default=0.0, nullable=False)
+    message = Column(Text, default="", nullable=False)
+    error = Column(Text, nullable=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    assignment = relationship("Assignment", lazy="joined")
+
+
+class AIJobHistory(Base):
+    """One finished run of an AI job, kept after the live ai_jobs row is pruned."""
+
+    __tablename__ = "ai_job_history"
+    __table_args__ = (
+        Index("ix_ai_job_history_assignment_finished", "assignment_id", "finished_at"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    assignment_id = Column(
+        Integer,
+        ForeignKey("assignments.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+    zid = Column(String(32), default="", nullable=False)
+    state = Column(String(16), nullable=False)  # done | error | cancelled
+    lane = Column(String(16), default="bulk", nullable=False)
+    attempt = Column(Integer, default=1, nullable=False)
+    message = Column(String(255), default="", nullable=False)
+    # Last line of the traceback only; the full text stays out of history.
+    error = Column(String(255), nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=False)
+    duration_seconds = Column(Float, nullable=True)
+
+
+class Blob(Base):
+    """
+    One stored file content, keyed by sha256. ``refcount`` counts the rows
+    that point at it (submission files, assignment spec/rubric); blobs at
+    zero are removed by blob_store.collect_garbage.
+    """
+
+    __tablename__ = "blobs"
+
+    sha256 = Column(String(64), primary_key=True)
+    size = Column(Integer, nullable=False)
+    refcount = Column(Integer, default=0, nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
@@ -12,9 +12,10 @@ from sqlalchemy.orm import Session
 
 from ..db import get_db
 from ..models import Assignment
-from ..services.ai_job_queue import status_to_dict
+from ..services.ai_job_queue import QueueFull, format_key, status_to_dict
+from ..services.ai_job_store import list_job_history
 from ..services.marking_sync import sync_ai_predictions_from_file
-from ..utils.jobq import get_jobq
+from ..utils.jobq import get_jobq, queue_full_error
 
 router = APIRouter(prefix="/v1/ai", tags=["ai"])
 logger = logging.getLogger(__name__)
@@ -143,15 +144,24 @@ def ai_run_predict(
 ):
     """
     Batch scoring — Calls AI.scripts.predict_scores:run_predict_pipeline.
+    Refused with 429/503 while the AI job queue is at its pending limits;
+    the run counts as pending work of the course until it finishes.
     """
+    try:
+        release = get_jobq().reserve(course_id=course_id)
+    except QueueFull as exc:
+        raise queue_full_error(exc)
 
     def _task():
         print(
             f"[AI][RUN] run_predict_pipeline(course_id={course_id}, backend_url='{backend_url}')"
         )
-        from AI.scripts.predict_scores import run_predict_pipeline
+        try:
+            from AI.scripts.predict_scores import run_predict_pipeline
 
-        run_predict_pipeline(course_id=course_id, backend_url=backend_url)
+            run_predict_pipeline(course_id=course_id, backend_url=backend_url)
+        finally:
+            release()
         print("[AI][RUN] done")
 
     background.add_task(_task)
@@ -206,3 +216,64 @@ def ai_sync_predictions(
         raise HTTPException(status_code=500, detail=f"Sync failed: {exc}")
 
     return {"status": "ok", "assignment_id": assignment_id, **result}
+
+
+@router.delete("/jobs/{assignment_id}")
+def ai_cancel_jobs(
+    assignment_id: int,
+    zid: Optional[str] = Query(None, description="Cancel only this student's job"),
+):
+    """
+    Cancel queued or running AI jobs of an assignment. Running jobs stop at
+    their next checkpoint (between students or LLM retries).
+    """
+    jobq = get_jobq()
+    cancelled = jobq.cancel(assignment_id, zid)
+    if not cancelled:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No queued or running AI job for assignment {assignment_id}.",
+        )
+    return {
+        "status": "cancelling",
+        "assignment_id": assignment_id,
+        "jobs": [
+            {
+                "job": format_key(key),
+                "zid": key[1],
+                **status_to_dict(jobq.get_status(*key)),
+            }
+            for key in cancelled
+        ],
+    }
+
+
+@router.get("/jobs/{assignment_id}/history")
+def ai_job_history(
+    assignment_id: int,
+    zid: Optional[str] = Query(None, description="Only this student's runs"),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    """
+    Finished runs of an assignment's AI jobs, newest first. Jobs leave the
+    live queue status after AI_JOB_RETENTION_SECONDS but stay listed here.
+    """
+    runs = list_job_history(db, assignment_id, zid, limit)
+    return {
+        "assignment_id": assignment_id,
+        "runs": [
+            {
+                "zid": run.zid or None,
+                "state": run.state,
+                "lane": run.lane,
+                "attempt": run.attempt,
+                "message": run.message,
+                "error": run.error,
+                "started_at": run.started_at,
+                "finished_at": run.finished_at,
+                "duration_seconds": run.duration_seconds,
+            }
+            for run in runs
+        ],
+    }
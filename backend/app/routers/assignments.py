@@ -12,6 +12,7 @@ from .. import models, schemas
 from ..config import settings
 from ..db import get_db
 from ..deps import get_current_user
+from ..services.blob_store import store_upload
 from ..services.system_log_service import record_system_log
 from ..utils.file_utils import save_meta_json
 
@@ -95,15 +96,13 @@ def create_assignment_with_files(
     _ensure_valid_file(step1)
     spec_ext = Path(step1.filename).suffix.lower()
     spec_path = spec_dir / f"assignment_specification{spec_ext}"
-    with open(spec_path, "wb") as f:
-        shutil.copyfileobj(step1.file, f)
+    a.spec_sha256 = store_upload(db, step1.file, link_at=spec_path).sha256
 
     # ---------- Validate & save rubric ----------
     _ensure_valid_file(step2)
     rubric_ext = Path(step2.filename).suffix.lower()
     rubric_path = rubric_dir / f"rubric{rubric_ext}"
-    with open(rubric_path, "wb") as f:
-        shutil.copyfileobj(step2.file, f)
+    a.rubric_sha256 = store_upload(db, step2.file, link_at=rubric_path).sha256
 
     # ---------- Save metadata ----------
     meta = {
@@ -264,16 +263,14 @@ def update_assignment_files(
         for p in spec_dir.glob("*"):
             p.unlink(missing_ok=True)
         dest = spec_dir / f"assignment_specification{Path(spec.filename).suffix.lower()}"
-        with open(dest, "wb") as f:
-            shutil.copyfileobj(spec.file, f)
+        a.spec_sha256 = store_upload(db, spec.file, link_at=dest).sha256
 
     if rubric:
         _ensure_valid_file(rubric)
         for p in rubric_dir.glob("*"):
             p.unlink(missing_ok=True)
         dest = rubric_dir / f"rubric{Path(rubric.filename).suffix.lower()}"
-        with open(dest, "wb") as f:
-            shutil.copyfileobj(rubric.file, f)
+        a.rubric_sha256 = store_upload(db, rubric.file, link_at=dest).sha256
 
     meta = {
         "assignment_id": a.id,
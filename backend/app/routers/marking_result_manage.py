@@ -1,17 +1,30 @@
+import asyncio
 import datetime
 import json
 import logging
 import re
+import threading
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
-
-from fastapi import APIRouter, Depends, File, HTTPException, Query, UploadFile
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar
+
+from fastapi import (
+    APIRouter,
+    Depends,
+    File,
+    HTTPException,
+    Query,
+    Request,
+    UploadFile,
+)
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, ConfigDict, Field
 from sqlalchemy.orm import Session
 
 from app import models
 from app.db import get_db
-from app.deps import UserClaims, get_current_user
+from app.deps import UserClaims, get_current_user, user_from_token
+from app.security import create_stream_token
+from app.services.ai_job_events import job_event_hub
 from app.services.system_log_service import record_system_log
 
 router = APIRouter(prefix="/v1/marking_result", tags=["marking_result"])
@@ -93,6 +106,36 @@ def save_json_atomic(path: Path, data: Dict[str, Any]) -> None:
     tmp.replace(path)
 
 
+# Every writer loads, changes and saves the whole course JSON (AI workers, tutor
+# mark sync, review edits, status flags), so they share one lock per file.
+_course_json_locks: Dict[str, threading.Lock] = {}
+_course_json_locks_guard = threading.Lock()
+
+T = TypeVar("T")
+
+
+def course_json_lock(path: Path) -> threading.Lock:
+    key = str(Path(path).resolve())
+    with _course_json_locks_guard:
+        lock = _course_json_locks.get(key)
+        if lock is None:
+            lock = _course_json_locks[key] = threading.Lock()
+        return lock
+
+
+def update_course_json(course: models.Course, fn: Callable[[Dict[str, Any]], T]) -> T:
+    """
+    Load the course marking JSON, let ``fn`` change it in place and save it,
+    all under the course's lock. Returns whatever ``fn`` returns.
+    """
+    json_path = course_json_path_by_course(course)
+    with course_json_lock(json_path):
+        data = load_json(json_path)
+        result = fn(data)
+        save_json_atomic(json_path, data)
+    return result
+
+
 # ---------- Schemas ----------
 class MarkingIn(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
@@ -213,22 +256,25 @@ def get_marking_status(
     # Dynamic override: if any assignment job of this course is queued/running, treat as not completed
     try:
         # Local import to avoid circular import at module load time
+        from app.services.ai_job_store import job_to_status, list_course_jobs
         from app.utils.jobq import get_jobq
 
-        st_map = get_jobq().list_status()
+        positions = get_jobq().queue_positions()
         pending = False
         now_ts = datetime.datetime.utcnow().timestamp()
-        for aid, st in st_map.items():
-            a = db.get(models.Assignment, int(aid))
-            if not a or not getattr(a, "course_id", None):
-                continue
-            if a.course_id != course.id:
-                continue
+        for job in list_course_jobs(db, course.id):
+            a = job.assignment
+            st = job_to_status(job)
             state = str(getattr(st, "state", "")).lower()
+            if state not in {"queued", "running", "error"}:
+                continue
             info = {
                 "assignment_id": a.id,
                 "assignment_title": a.title,
+                "zid": job.zid or None,
                 "state": state,
+                "lane": st.lane,
+                "queue_position": positions.get((a.id, job.zid or None)),
                 "progress": getattr(st, "progress", 0.0),
                 "message": getattr(st, "message", ""),
                 "updated_at": getattr(st, "updated_at", None),
@@ -249,16 +295,12 @@ def get_marking_status(
                 .count()
             )
             info["total_students"] = total_students
-            info["pending_students"] = max(
-                0, total_students - info["marked_count"]
-            )
+            info["pending_students"] = max(0, total_students - info["marked_count"])
             if info["updated_at"] is not None:
                 info["updated_ago"] = max(0, now_ts - float(info["updated_at"]))
             else:
                 info["updated_ago"] = None
 
-            if state not in {"queued", "running", "error"}:
-                continue
             pending_assignments.append(info)
             if state in {"queued", "running"}:
                 pending = True
@@ -339,16 +381,95 @@ def update_marking_status(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    data = load_json(json_path)
-    data["course"] = course.code
-    data["name"] = course.name or ""
-    data["term"] = course.term or ""
-    data["ai_completed"] = bool(payload.ai_completed)
+    with course_json_lock(json_path):
+        data = load_json(json_path)
+        data["course"] = course.code
+        data["name"] = course.name or ""
+        data["term"] = course.term or ""
+        data["ai_completed"] = bool(payload.ai_completed)
 
-    save_json_atomic(json_path, data)
+        save_json_atomic(json_path, data)
     return {"ai_completed": data["ai_completed"]}
 
 
+_SSE_KEEPALIVE_SECONDS = 15.0
+_SSE_TOKEN_SECONDS = 60
+
+
+def _events_scope(course_id: int) -> str:
+    return f"events:{course_id}"
+
+
+@router.post("/{course_id}/events/token")
+def issue_events_token(
+    course_id: int,
+    db: Session = Depends(get_db),
+    me: UserClaims = Depends(get_current_user),
+):
+    """
+    Short-lived token for opening the event stream of one course.
+
+    EventSource cannot send headers, so the stream takes its token in the
+    URL; this keeps the login token itself out of URLs and access logs.
+    """
+    course = db.get(models.Course, course_id)
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
+    if course.owner_id != int(me.sub):
+        raise HTTPException(status_code=403, detail="Forbidden")
+    token = create_stream_token(
+        me.sub, _events_scope(course_id), expires_seconds=_SSE_TOKEN_SECONDS
+    )
+    return {"token": token, "expires_in": _SSE_TOKEN_SECONDS}
+
+
+@router.get("/{course_id}/events")
+async def stream_marking_events(
+    course_id: int,
+    request: Request,
+    token: str = Query(..., description="Stream token from POST /events/token"),
+    db: Session = Depends(get_db),
+):
+    """
+    Server-sent events for AI jobs of a course.
+
+    Each ``job`` event carries one job status (assignment_id, zid, state,
+    progress, message, lane, position, ...) as soon as the queue updates it.
+    Clients fetch ``/status`` once on connect and again when a job finishes.
+    """
+    me = user_from_token(token, scope=_events_scope(course_id))
+    course = db.get(models.Course, course_id)
+    if not course:
+        raise HTTPException(status_code=404, detail="Course not found")
+    if course.owner_id != int(me.sub):
+        raise HTTPException(status_code=403, detail="Forbidden")
+    # The stream can stay open for hours; do not hold a DB connection for it.
+    db.close()
+
+    queue = job_event_hub.subscribe(course_id)
+
+    async def events():
+        try:
+            yield "retry: 3000\nevent: ready\ndata: {}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(
+                        queue.get(), timeout=_SSE_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: job\ndata: {json.dumps(event, default=str)}\n\n"
+        finally:
+            job_event_hub.unsubscribe(course_id, queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # ---------- POST: through course_id append/rewrite marks (use zid upsert) ----------
 @router.post("/{course_id}/append", response_model=MarkingOut)
 def append_marking_result(
@@ -365,119 +486,120 @@ def append_marking_result(
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    data = load_json(json_path)
-    data["course"] = c.code
-    data["name"] = c.name or ""
-    data["term"] = c.term or ""
-
-    def to_float(value: Any) -> Optional[float]:
-        try:
-            return float(value) if value is not None else None
-        except (TypeError, ValueError):
-            return None
-
-    incoming = payload.dict(exclude_unset=True)
-    # Avoid clobbering existing keys with explicit nulls from clients
-    if "assignment_id" in incoming and incoming["assignment_id"] is None:
-        incoming.pop("assignment_id")
-
-    zid_raw = str(incoming.get("zid", "")).strip()
-    zid_norm = zid_raw.lower()
-    aid = incoming.get("assignment_id")
-    ass = str(incoming.get("assignment", "")).strip()
-
-    existing = None
-    existing_idx = None
-    for i, r in enumerate(data["marking_results"]):
-        if not isinstance(r, dict):
-            continue
-        same_zid = str(r.get("zid", "")).strip().lower() == zid_norm
-        same_aid = r.get("assignment_id") == aid
-        if same_zid and same_aid:
-            existing = r
-            existing_idx = i
-            break
-
-    if existing is None and aid is not None:
-        for i, r in enumerate(data["marking_results"]):
-            if not isinstance(r, dict):
-                continue
-            same_zid = str(r.get("zid", "")).strip().lower() == zid_norm
-            if same_zid and r.get("assignment_id") is None:
-                existing = r
-                existing_idx = i
-                break
+    with course_json_lock(json_path):
+        data = load_json(json_path)
+        data["course"] = c.code
+        data["name"] = c.name or ""
+        data["term"] = c.term or ""
 
-    # Fallback: if no assignment_id provided, try match by (zid, assignment)
-    if existing is None and aid is None and ass:
+        def to_float(value: Any) -> Optional[float]:
+            try:
+                return float(value) if value is not None else None
+            except (TypeError, ValueError):
+                return None
+
+        incoming = payload.dict(exclude_unset=True)
+        # Avoid clobbering existing keys with explicit nulls from clients
+        if "assignment_id" in incoming and incoming["assignment_id"] is None:
+            incoming.pop("assignment_id")
+
+        zid_raw = str(incoming.get("zid", "")).strip()
+        zid_norm = zid_raw.lower()
+        aid = incoming.get("assignment_id")
+        ass = str(incoming.get("assignment", "")).strip()
+
+        existing = None
+        existing_idx = None
         for i, r in enumerate(data["marking_results"]):
             if not isinstance(r, dict):
                 continue
             same_zid = str(r.get("zid", "")).strip().lower() == zid_norm
-            same_ass = str(r.get("assignment", "")).strip() == ass
-            if same_zid and same_ass:
+            same_aid = r.get("assignment_id") == aid
+            if same_zid and same_aid:
                 existing = r
                 existing_idx = i
                 break
 
-    previous_review_mark = (existing or {}).get("review_mark")
-    previous_review_comments = (existing or {}).get("review_comments")
-
-    record: Dict[str, Any] = dict(existing or {})
-    record.update(incoming)
-
-    record["zid"] = zid_raw or record.get("zid", "")
-    if aid is not None:
-        record["assignment_id"] = aid
-    elif (existing or {}).get("assignment_id") is not None:
-        record["assignment_id"] = (existing or {}).get("assignment_id")
-    record.setdefault("assignment", "")
-    record.setdefault("student_name", "")
-    record.setdefault("marked_by", "")
-
-    ai_value = to_float(record.get("ai_total"))
-    tutor_value = to_float(record.get("tutor_total"))
-    if ai_value is not None:
-        record["ai_total"] = ai_value
-    if tutor_value is not None:
-        record["tutor_total"] = tutor_value
-
-    if ai_value is not None and tutor_value is not None:
-        difference = round(ai_value - tutor_value, 2)
-        record["difference"] = difference
-    else:
-        difference = to_float(record.get("difference"))
-    new_status = (
-        record.get("review_status") or (existing or {}).get("review_status") or ""
-    )
-    record["review_status"] = new_status
-    is_reviewed = str(new_status).lower() in {
-        "reviewed",
-        "completed",
-        "resolved",
-        "checked",
-    }
-
-    if is_reviewed:
-        record["needs_review"] = False
-    else:
-        if difference is not None and tutor_value not in (None, 0):
-            record["needs_review"] = (
-                abs(difference) / abs(tutor_value) >= _REVIEW_DIFF_THRESHOLD
-            )
+        if existing is None and aid is not None:
+            for i, r in enumerate(data["marking_results"]):
+                if not isinstance(r, dict):
+                    continue
+                same_zid = str(r.get("zid", "")).strip().lower() == zid_norm
+                if same_zid and r.get("assignment_id") is None:
+                    existing = r
+                    existing_idx = i
+                    break
+
+        # Fallback: if no assignment_id provided, try match by (zid, assignment)
+        if existing is None and aid is None and ass:
+            for i, r in enumerate(data["marking_results"]):
+                if not isinstance(r, dict):
+                    continue
+                same_zid = str(r.get("zid", "")).strip().lower() == zid_norm
+                same_ass = str(r.get("assignment", "")).strip() == ass
+                if same_zid and same_ass:
+                    existing = r
+                    existing_idx = i
+                    break
+
+        previous_review_mark = (existing or {}).get("review_mark")
+        previous_review_comments = (existing or {}).get("review_comments")
+
+        record: Dict[str, Any] = dict(existing or {})
+        record.update(incoming)
+
+        record["zid"] = zid_raw or record.get("zid", "")
+        if aid is not None:
+            record["assignment_id"] = aid
+        elif (existing or {}).get("assignment_id") is not None:
+            record["assignment_id"] = (existing or {}).get("assignment_id")
+        record.setdefault("assignment", "")
+        record.setdefault("student_name", "")
+        record.setdefault("marked_by", "")
+
+        ai_value = to_float(record.get("ai_total"))
+        tutor_value = to_float(record.get("tutor_total"))
+        if ai_value is not None:
+            record["ai_total"] = ai_value
+        if tutor_value is not None:
+            record["tutor_total"] = tutor_value
+
+        if ai_value is not None and tutor_value is not None:
+            difference = round(ai_value - tutor_value, 2)
+            record["difference"] = difference
         else:
-            record["needs_review"] = bool(record.get("needs_review"))
+            difference = to_float(record.get("difference"))
+        new_status = (
+            record.get("review_status") or (existing or {}).get("review_status") or ""
+        )
+        record["review_status"] = new_status
+        is_reviewed = str(new_status).lower() in {
+            "reviewed",
+            "completed",
+            "resolved",
+            "checked",
+        }
+
+        if is_reviewed:
+            record["needs_review"] = False
+        else:
+            if difference is not None and tutor_value not in (None, 0):
+                record["needs_review"] = (
+                    abs(difference) / abs(tutor_value) >= _REVIEW_DIFF_THRESHOLD
+                )
+            else:
+                record["needs_review"] = bool(record.get("needs_review"))
 
-    now = _now_utc_iso()
-    record.setdefault("created_at", now)
-    record["updated_at"] = now
+        now = _now_utc_iso()
+        record.setdefault("created_at", now)
+        record["updated_at"] = now
 
-    if existing_idx is not None:
-        data["marking_results"][existing_idx] = record
-    else:
-        data["marking_results"].append(record)
+        if existing_idx is not None:
+            data["marking_results"][existing_idx] = record
+        else:
+            data["marking_results"].append(record)
 
-    save_json_atomic(json_path, data)
+        save_json_atomic(json_path, data)
 
     def _format_mark(value: Any) -> str:
         if value in (None, ""):
@@ -12,6 +12,7 @@ from fastapi import (
     File,
     Form,
     HTTPException,
+    Response,
     UploadFile,
 )
 from sqlalchemy.orm import Session
@@ -22,7 +23,9 @@ from ..models import ActorRole, PartKind, Submission, SubmissionFile
 from ..schemas import SubmissionDetailOut
 from ..services.marking_sync import sync_tutor_mark_from_file
 from ..utils.file_utils import save_meta_json
-from ..utils.jobq import get_jobq
+from ..services.ai_job_queue import QueueFull
+from ..services.blob_store import store_upload
+from ..utils.jobq import enqueue_headers, get_jobq, queue_full_error
 from ..utils.path_utils import assignment_dir, student_dir
 from ..utils.submission_status import compute_status
 
@@ -155,8 +158,7 @@ def _save_step_files(
             except OSError as exc:
                 logger.warning("Failed to remove stale file %s: %s", old, exc)
 
-        with open(dest, "wb") as f:
-            shutil.copyfileobj(uf.file, f)
+        blob = store_upload(db, uf.file, link_at=dest)
 
         db.add(
             SubmissionFile(
@@ -165,9 +167,10 @@ def _save_step_files(
                 actor_role=role,
                 part_kind=kind,
                 filename=fname,
-                path=str(dest),
+                path=str(blob.path),
+                sha256=blob.sha256,
                 mime=uf.content_type,
-                size=None,
+                size=blob.size,
                 uploaded_by=user_id,
                 uploaded_at=datetime.utcnow(),
             )
@@ -208,6 +211,7 @@ def _save_step_files(
 @router.post("", response_model=SubmissionDetailOut)
 async def create_submission(
     background: BackgroundTasks,
+    response: Response,
     assignmentName: str = Form(...),
     course: str = Form(...),
     term: str = Form(""),
@@ -222,6 +226,13 @@ async def create_submission(
     db: Session = Depends(get_db),
     user=Depends(get_current_user),
 ):
+    if assignmentId and step5:
+        # Refuse before saving anything, so the client can retry the upload.
+        try:
+            get_jobq().admit(assignmentId, zid=studentId)
+        except QueueFull as exc:
+            raise queue_full_error(exc)
+
     sub = Submission(
         assignment_id=assignmentId,
         assignment_name=assignmentName,
@@ -305,18 +316,15 @@ async def create_submission(
     db.commit()
     db.refresh(sub)
     if assignmentId and ai_assignment_paths:
-        enq = get_jobq().enqueue(assignmentId)
+        enq = get_jobq().enqueue(assignmentId, zid=sub.student_id, enforce_limits=False)
+        response.headers.update(enqueue_headers(enq))
         print(
-            f"[AI][API] enqueue from create_submission: assignment_id={assignmentId}, files={len(ai_assignment_paths)}, enqueued={enq}"
+            f"[AI][API] enqueue from create_submission: assignment_id={assignmentId}, zid={sub.student_id}, files={len(ai_assignment_paths)}, enqueued={enq}"
         )
         # Mark course AI status as not completed while jobs are queued
         try:
             from .. import models as _models
-            from .marking_result_manage import (
-                course_json_path_by_course,
-                load_json,
-                save_json_atomic,
-            )
+            from .marking_result_manage import update_course_json
 
             course_obj = (
                 db.query(_models.Course)
@@ -327,10 +335,9 @@ async def create_submission(
                 .first()
             )
             if course_obj is not None:
-                json_path = course_json_path_by_course(course_obj)
-                data = load_json(json_path)
-                data["ai_completed"] = False
-                save_json_atomic(json_path, data)
+                update_course_json(
+                    course_obj, lambda data: data.update(ai_completed=False)
+                )
         except Exception as exc:
             logger.warning(
                 "Failed to flag AI status pending for course %s during submission create: %s",
@@ -344,6 +351,7 @@ async def create_submission(
 @router.put("/{submission_id}/files", response_model=SubmissionDetailOut)
 async def append_files(
     background: BackgroundTasks,
+    response: Response,
     submission_id: int,
     stepIndex: int = Form(..., ge=1, le=6),
     files: List[UploadFile] = File(...),
@@ -354,6 +362,11 @@ async def append_files(
     sub = db.get(Submission, submission_id)
     if not sub:
         raise HTTPException(404, "Submission not found")
+    if stepIndex == 5 and sub.assignment_id:
+        try:
+            get_jobq().admit(sub.assignment_id, zid=studentId or sub.student_id)
+        except QueueFull as exc:
+            raise queue_full_error(exc)
 
     saved_paths = _save_step_files(
         db=db,
@@ -368,18 +381,16 @@ async def append_files(
         student_id=(studentId or sub.student_id),
     )
     if stepIndex == 5 and sub.assignment_id:
-        enq = get_jobq().enqueue(sub.assignment_id)
+        zid = (studentId or sub.student_id or "").lower() or None
+        enq = get_jobq().enqueue(sub.assignment_id, zid=zid, enforce_limits=False)
+        response.headers.update(enqueue_headers(enq))
         print(
-            f"[AI][API] enqueue from append_files: assignment_id={sub.assignment_id}, enqueued={enq}",
+            f"[AI][API] enqueue from append_files: assignment_id={sub.assignment_id}, zid={zid}, enqueued={enq}",
             flush=True,
         )
         # Mark course AI status as not completed while jobs are queued
         try:
-            from .marking_result_manage import (
-                course_json_path_by_course,
-                load_json,
-                save_json_atomic,
-            )
+            from .marking_result_manage import update_course_json
 
             course_obj = (
                 db.get(models.Course, getattr(sub, "course_id", None))
@@ -398,10 +409,9 @@ async def append_files(
                     .first()
                 )
             if course_obj is not None:
-                json_path = course_json_path_by_course(course_obj)
-                data = load_json(json_path)
-                data["ai_completed"] = False
-                save_json_atomic(json_path, data)
+                update_course_json(
+                    course_obj, lambda data: data.update(ai_completed=False)
+                )
         except Exception as exc:
             logger.warning(
                 "Failed to flag AI status pending for submission %s course %s: %s",
@@ -506,8 +516,7 @@ async def bulk_upload_student_assignments(
                 old.unlink()
             except OSError as exc:
                 logger.warning("Failed to remove coordinator upload %s: %s", old, exc)
-        with open(dest, "wb") as out:
-            shutil.copyfileobj(f.file, out)
+        blob = store_upload(db, f.file, link_at=dest)
 
         db.add(
             SubmissionFile(
@@ -516,9 +525,10 @@ async def bulk_upload_student_assignments(
                 actor_role=role,
                 part_kind=kind,
                 filename=dest.name,
-                path=str(dest),
+                path=str(blob.path),
+                sha256=blob.sha256,
                 mime=f.content_type,
-                size=None,
+                size=blob.size,
                 uploaded_by=int(user.sub),
                 uploaded_at=datetime.utcnow(),
             )
@@ -25,3 +25,10 @@ def create_access_token(sub: str, expires_minutes: int = 120) -> str:
 
 def decode_token(token: str) -> dict:
     return jwt.decode(token, settings.secret_key, algorithms=["HS256"])
+
+
+def create_stream_token(sub: str, scope: str, expires_seconds: int = 60) -> str:
+    """Short-lived token valid only for opening one event stream (``scope``)."""
+    exp = datetime.utcnow() + timedelta(seconds=expires_seconds)
+    payload = {"sub": sub, "scope": scope, "exp": exp}
+    return jwt.encode(payload, settings.secret_key, algorithm="HS256")
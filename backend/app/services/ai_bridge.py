@@ -2,17 +2,19 @@ import logging
 import os
 import shutil
 import stat
-import time
-from pathlib import Path
 import sys
+from pathlib import Path
+
+from sqlalchemy.orm import Session
+
+from .. import models
+
 PROJECT_ROOT = Path(__file__).resolve().parents[2]  # backend/
 AI_DIR = PROJECT_ROOT.parent / "AI"
 if str(AI_DIR) not in sys.path:
     sys.path.insert(0, str(AI_DIR))
 
 
-
-
 logger = logging.getLogger(__name__)
 
 BACKEND_DIR = Path(__file__).resolve().parents[2]
@@ -21,7 +23,6 @@ RUBRIC_DIR = AI_DIR / "artifacts" / "rubric"
 MARKED_DIR = AI_DIR / "data" / "marked"
 MARKED_DIR_MARK_Folder = AI_DIR / "data" / "marked" / "mark"
 MARKED_DIR_ASS_Folder = AI_DIR / "data" / "marked" / "assignments"
-AI_TEST_DIR = AI_DIR / "data" / "test"
 
 
 def _handle_remove_readonly(func, path, _exc):
@@ -49,26 +50,10 @@ def _single_file_from(folder: Path) -> Path:
     return candidates[0]
 
 
-
 def _clean_dir(d: Path):
+    if d.exists():
+        shutil.rmtree(d, onerror=_handle_remove_readonly)
     d.mkdir(parents=True, exist_ok=True)
-    for attempt in range(5):
-        try:
-            for p in d.iterdir():
-                if p.is_file() or p.is_symlink():
-                    try:
-                        p.unlink()
-                    except PermissionError:
-                        _handle_remove_readonly(os.remove, str(p), None)
-                else:
-                    shutil.rmtree(p, onerror=_handle_remove_readonly)
-            return
-        except OSError:
-            time.sleep(0.5)
-    shutil.rmtree(d, ignore_errors=True)
-    d.mkdir(parents=True, exist_ok=True)
-
-
 
 
 def copy_spec_and_rubric_to_ai(course_root: Path):
@@ -83,87 +68,49 @@ def copy_spec_and_rubric_to_ai(course_root: Path):
     process_pipeline(RUBRIC_DIR)
 
 
+PREDICT_SUFFIXES = (".docx",)  # what the scorer reads
 
-def copy_teacher_marked_to_ai(coordinator_marked_root: Path, source = "coordinator"):
-    _clean_dir(MARKED_DIR)
-    base = coordinator_marked_root / "submissions"
-    role_folder = "Student_assignment_with_coordinator_mark" 
-    root = base / role_folder
-    if not root.exists():
-        raise FileNotFoundError(f"not found: {root}")
-    
-
-    MARKED_DIR.mkdir(parents=True, exist_ok=True)
-    MARKED_DIR_MARK_Folder.mkdir(parents=True, exist_ok=True)
-    MARKED_DIR_ASS_Folder.mkdir(parents=True, exist_ok=True)
-
-    for zid_dir in root.iterdir():
-        if not zid_dir.is_dir():
-            continue
-        zid = zid_dir.name.lower()
-        for f in zid_dir.glob(f"{zid}_assignment.*"):
-            suffix = f.suffix.lower() or ".docx"
-            dest = MARKED_DIR_ASS_Folder / f"{zid}{suffix}"
-            shutil.copy2(f, dest)
-        for f in zid_dir.glob(f"{zid}_mark.*"):
-            suffix = f.suffix.lower() or ".docx"
-            dest = MARKED_DIR_MARK_Folder / f"{zid}_mark{suffix}"
-            shutil.copy2(f, dest)
-
-
-
-
-
-
-
-
-
-def copy_students_for_predict_to_ai(student_files_root: Path, source="Tutor"):
-    print(f"[AI][BRIDGE] AI_TEST_DIR={AI_TEST_DIR}", flush=True)
-    print(f"[AI][BRIDGE] assignment_root={student_files_root}", flush=True)
-
-    _clean_dir(AI_TEST_DIR)
 
-    base = student_files_root / "submissions"
-    role_folder = (
-        "Student_assignment_with_Tutor_mark"
-        if source.lower() == "tutor"
-        else "Student_assignment_with_coordinator_mark"
+def build_predict_manifest(db: Session, assignment_id: int, zids=None) -> list[dict]:
+    """
+    List the tutor-marked submissions to score, straight from the
+    SubmissionFile rows: one ``{zid, path, sha256, mime, filename}`` entry
+    per student, newest upload wins. ``path`` is the stored original (the
+    blob for new uploads), so nothing is staged or copied for the pipeline.
+    """
+    wanted = {z.lower() for z in zids} if zids else None
+    rows = (
+        db.query(models.SubmissionFile, models.Submission)
+        .join(
+            models.Submission,
+            models.SubmissionFile.submission_id == models.Submission.id,
+        )
+        .filter(
+            models.Submission.assignment_id == assignment_id,
+            models.SubmissionFile.actor_role == models.ActorRole.TUTOR,
+            models.SubmissionFile.part_kind == models.PartKind.ASSIGNMENT,
+        )
+        .order_by(models.SubmissionFile.uploaded_at, models.SubmissionFile.id)
+        .all()
     )
-    root = base / role_folder
-    print(f"[AI][BRIDGE] staging root={root} exists={root.exists()}", flush=True)
-    if not root.exists():
-        raise FileNotFoundError(f"not found: {root}")
-
-    allowed_suffixes = [".docx", ".doc", ".pdf"]
-
-    copied = []
-    try:
-        for zid_dir in root.iterdir():
-            if not zid_dir.is_dir():
-                continue
-            zid = zid_dir.name.lower()
-            for f in zid_dir.iterdir():
-                name_lower = f.name.lower()
-                if not name_lower.startswith(f"{zid}_assignment."):
-                    continue
-                suffix = f.suffix.lower()
-                if suffix not in allowed_suffixes:
-                    continue
-
-                dest = AI_TEST_DIR / f"{zid}{suffix}"
-                if dest.exists():
-                    try:
-                        dest.unlink()
-                    except PermissionError:
-                        _handle_remove_readonly(os.remove, str(dest), None)
-                shutil.copy2(f, dest)
-                copied.append(str(dest))
-    except Exception as e:
-        print(f"[AI][BRIDGE] staging loop failed: {e}", flush=True)
-        import traceback
-
-        traceback.print_exc()
-        raise
-    print(f"[AI][BRIDGE] copied={len(copied)}", flush=True)
-    return copied
+    latest: dict[str, dict] = {}
+    for f, sub in rows:
+        zid = (sub.student_id or f"unknown-{sub.id}").lower()
+        if wanted is not None and zid not in wanted:
+            continue
+        if Path(f.filename).suffix.lower() not in PREDICT_SUFFIXES:
+            continue
+        latest[zid] = {
+            "zid": zid,
+            "path": f.path,
+            "sha256": f.sha256,
+            "mime": f.mime,
+            "filename": f.filename,
+        }
+    manifest = []
+    for zid, entry in sorted(latest.items()):
+        if not os.path.isfile(entry["path"]):
+            logger.warning("Submission file for %s is missing: %s", zid, entry["path"])
+            continue
+        manifest.append(entry)
+    return manifest
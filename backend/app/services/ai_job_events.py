@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+from typing import Any, Dict, Optional, Set, Tuple
+
+from .ai_job_queue import JobKey, JobStatus, status_to_dict
+
+# Events buffered per connection before the slowest ones are dropped.
+_MAX_PENDING = 256
+
+_Subscriber = Tuple[asyncio.AbstractEventLoop, "asyncio.Queue[Dict[str, Any]]"]
+
+
+def job_event(key: JobKey, st: JobStatus) -> Dict[str, Any]:
+    aid, zid = key
+    return {"assignment_id": aid, "zid": zid, **status_to_dict(st)}
+
+
+class JobEventHub:
+    """
+    Fans AIJobQueue status changes out to the SSE connections of a course.
+
+    publish() is called from worker threads; each subscriber owns an asyncio
+    queue on its event loop. Courses nobody is watching cost a dict lookup.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs: Dict[Any, Set[_Subscriber]] = {}
+
+    def subscribe(self, course_id: Any) -> "asyncio.Queue[Dict[str, Any]]":
+        """Register the calling event loop; must be called from a coroutine."""
+        sub = (asyncio.get_running_loop(), asyncio.Queue(maxsize=_MAX_PENDING))
+        with self._lock:
+            self._subs.setdefault(course_id, set()).add(sub)
+        return sub[1]
+
+    def unsubscribe(self, course_id: Any, q: "asyncio.Queue[Dict[str, Any]]") -> None:
+        with self._lock:
+            subs = self._subs.get(course_id)
+            if not subs:
+                return
+            subs.difference_update({s for s in subs if s[1] is q})
+            if not subs:
+                del self._subs[course_id]
+
+    def subscriber_count(self, course_id: Optional[Any] = None) -> int:
+        with self._lock:
+            if course_id is not None:
+                return len(self._subs.get(course_id, ()))
+            return sum(len(s) for s in self._subs.values())
+
+    def publish(self, course_id: Any, event: Dict[str, Any]) -> None:
+        with self._lock:
+            subs = list(self._subs.get(course_id, ()))
+        for loop, q in subs:
+            try:
+                loop.call_soon_threadsafe(_offer, q, dict(event))
+            except RuntimeError:
+                # The connection's loop has already shut down.
+                self.unsubscribe(course_id, q)
+
+    def on_job_status(self, key: JobKey, course_id: Any, st: JobStatus) -> None:
+        """AIJobQueue listener."""
+        if course_id is None:
+            return
+        self.publish(course_id, job_event(key, st))
+
+
+def _offer(q: "asyncio.Queue[Dict[str, Any]]", event: Dict[str, Any]) -> None:
+    if q.full():
+        # A stalled client only loses its oldest progress ticks.
+        q.get_nowait()
+    q.put_nowait(event)
+
+
+job_event_hub = JobEventHub()
@@ -1,119 +1,738 @@
 from __future__ import annotations
 
-import queue
+import math
 import threading
 import time
 import traceback
-from dataclasses import asdict, dataclass
-from typing import Any, Callable, Dict, Optional
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass, field, replace
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    from .ai_job_store import AIJobStore
+
+# A unit of work: (assignment_id, zid). zid=None scores the whole assignment.
+JobKey = Tuple[int, Optional[str]]
+JobListener = Callable[[JobKey, Any, "JobStatus"], None]
+
+ACTIVE_STATES = ("queued", "running")
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+LANES = (INTERACTIVE, BULK)
 
 
 @dataclass
 class JobStatus:
-    state: str = "queued"  # queued | running | done | error
+    state: str = "queued"  # queued | running | done | error | cancelled
     progress: float = 0.0  # 0.0 ~ 1.0
     message: str = ""
     error: Optional[str] = None
-    updated_at: float = time.time()
+    updated_at: float = field(default_factory=time.time)
+    lane: str = "bulk"  # interactive | bulk
+    position: Optional[int] = None  # 1-based place in the queue while queued
+    # Numbers reported by the worker, e.g. {"manifest": {...}}; not persisted.
+    stats: Dict[str, Any] = field(default_factory=dict)
 
 
 def status_to_dict(s: JobStatus) -> Dict[str, Any]:
     return asdict(s)
 
 
+class JobCancelled(Exception):
+    """Raised inside a job once its CancelToken is cancelled or past its deadline."""
+
+
+class QueueFull(Exception):
+    """
+    Raised by enqueue()/admit() when a pending-job limit is reached.
+
+    ``scope`` is "course" when the course's own backlog is full and
+    "global" when the whole queue is; ``retry_after`` is a rough number of
+    seconds until a slot frees up.
+    """
+
+    def __init__(self, scope: str, limit: int, retry_after: int):
+        super().__init__(f"AI queue is full ({scope} limit {limit} pending jobs)")
+        self.scope = scope
+        self.limit = limit
+        self.retry_after = retry_after
+
+
+@dataclass
+class EnqueueResult:
+    """Outcome of enqueue(); truthy only when a new unit was queued."""
+
+    accepted: bool
+    key: JobKey
+    outcome: str  # queued | rerun | covered
+    position: Optional[int] = None
+    estimated_start: Optional[float] = None  # epoch seconds
+
+    def __bool__(self) -> bool:
+        return self.accepted
+
+
+class CancelToken:
+    """
+    Cooperative cancellation flag handed to a running job.
+
+    Long-running code calls ``check()`` between units of work (students, LLM
+    retries); it raises JobCancelled once ``cancel()`` was called or the
+    wall-clock deadline has passed.
+    """
+
+    def __init__(self, timeout: Optional[float] = None):
+        self._event = threading.Event()
+        self.reason: Optional[str] = None
+        self.deadline = time.time() + timeout if timeout else None
+        self._timeout = timeout
+
+    def cancel(self, reason: str = "cancelled") -> None:
+        if self.reason is None:
+            self.reason = reason
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        if self._event.is_set():
+            return True
+        if self.deadline is not None and time.time() >= self.deadline:
+            self.cancel(f"timed out after {int(self._timeout)}s")
+            return True
+        return False
+
+    def check(self) -> None:
+        if self.cancelled:
+            raise JobCancelled(self.reason or "cancelled")
+
+    def wait(self, seconds: float) -> bool:
+        """Sleep up to ``seconds``; wake early and return True if cancelled."""
+        if self.deadline is not None:
+            seconds = min(seconds, max(0.0, self.deadline - time.time()))
+        self._event.wait(seconds)
+        return self.cancelled
+
+
 class StatusProxy:
-    def __init__(self, st: JobStatus, touch):
+    def __init__(
+        self, st: JobStatus, touch, cancel_token: Optional[CancelToken] = None
+    ):
         self._st = st
         self._touch = touch
+        self.cancel_token = cancel_token or CancelToken()
 
     def update(
-        self, *, progress: Optional[float] = None, message: Optional[str] = None
+        self,
+        *,
+        progress: Optional[float] = None,
+        message: Optional[str] = None,
+        stats: Optional[Dict[str, Any]] = None,
     ):
         if progress is not None:
             self._st.progress = max(0.0, min(1.0, float(progress)))
         if message is not None:
             self._st.message = message
+        if stats:
+            self._st.stats.update(stats)
         self._touch()
 
 
+def make_key(assignment_id: int, zid: Optional[str] = None) -> JobKey:
+    return int(assignment_id), (zid.lower() if zid else None)
+
+
+def format_key(key: JobKey) -> str:
+    aid, zid = key
+    return f"{aid}:{zid}" if zid else str(aid)
+
+
+class FairScheduler:
+    """
+    Pending jobs split into two lanes. Single-student (interactive) jobs are
+    served ahead of whole-assignment (bulk) jobs, but after
+    ``interactive_weight`` interactive jobs in a row one bulk job gets a turn.
+    Within a lane each course has its own FIFO and courses are served
+    round-robin, so one course's large backlog cannot starve the others.
+    """
+
+    def __init__(self, interactive_weight: int = 4):
+        self._cond = threading.Condition()
+        self._lanes: Dict[str, "OrderedDict[Any, deque[JobKey]]"] = {
+            lane: OrderedDict() for lane in LANES
+        }
+        self._where: Dict[JobKey, Tuple[str, Any]] = {}
+        self._weight = max(1, int(interactive_weight))
+        self._streak = 0
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._where)
+
+    def __contains__(self, key: JobKey) -> bool:
+        with self._cond:
+            return key in self._where
+
+    def depth(self, group: Any = None) -> int:
+        """Pending keys of one course, summed over both lanes."""
+        with self._cond:
+            return sum(len(groups.get(group, ())) for groups in self._lanes.values())
+
+    def put(self, key: JobKey, lane: str = BULK, group: Any = None) -> None:
+        if lane not in self._lanes:
+            raise ValueError(f"unknown lane: {lane}")
+        with self._cond:
+            self._lanes[lane].setdefault(group, deque()).append(key)
+            self._where[key] = (lane, group)
+            self._cond.notify()
+
+    def remove(self, key: JobKey) -> bool:
+        with self._cond:
+            loc = self._where.pop(key, None)
+            if loc is None:
+                return False
+            lane, group = loc
+            pending = self._lanes[lane][group]
+            pending.remove(key)
+            if not pending:
+                del self._lanes[lane][group]
+            return True
+
+    def _next_lane(self, lanes, streak: int) -> Optional[str]:
+        if lanes[INTERACTIVE] and (not lanes[BULK] or streak < self._weight):
+            return INTERACTIVE
+        return BULK if lanes[BULK] else None
+
+    @staticmethod
+    def _pop(groups: "OrderedDict[Any, deque[JobKey]]") -> JobKey:
+        group, pending = next(iter(groups.items()))
+        key = pending.popleft()
+        # Rotate the course to the back of the lane.
+        del groups[group]
+        if pending:
+            groups[group] = pending
+        return key
+
+    @staticmethod
+    def _advance(lanes, lane: str, streak: int) -> int:
+        if lane == INTERACTIVE and lanes[BULK]:
+            return streak + 1
+        return 0
+
+    def get(self) -> JobKey:
+        with self._cond:
+            lane = self._next_lane(self._lanes, self._streak)
+            while lane is None:
+                self._cond.wait()
+                lane = self._next_lane(self._lanes, self._streak)
+            self._streak = self._advance(self._lanes, lane, self._streak)
+            key = self._pop(self._lanes[lane])
+            del self._where[key]
+            return key
+
+    def order(self) -> list[JobKey]:
+        """Pending keys in the order get() would hand them out."""
+        with self._cond:
+            lanes = {
+                lane: OrderedDict((g, deque(p)) for g, p in groups.items())
+                for lane, groups in self._lanes.items()
+            }
+            streak = self._streak
+        ordered: list[JobKey] = []
+        lane = self._next_lane(lanes, streak)
+        while lane is not None:
+            streak = self._advance(lanes, lane, streak)
+            ordered.append(self._pop(lanes[lane]))
+            lane = self._next_lane(lanes, streak)
+        return ordered
+
+
 class AIJobQueue:
     _instance: "AIJobQueue" | None = None
     _guard = threading.Lock()
 
-    def __init__(self, worker: Callable[[int, StatusProxy], None]):
+    def __init__(
+        self,
+        worker: Callable[[int, StatusProxy, Optional[str]], None],
+        workers: int = 1,
+        store: "AIJobStore" | None = None,
+        job_timeout: Optional[float] = None,
+        interactive_weight: int = 4,
+        retention: Optional[float] = None,
+        max_pending: Optional[int] = None,
+        max_pending_per_course: Optional[int] = None,
+        default_runtime: float = 60.0,
+        progress_interval: float = 1.0,
+    ):
         self.worker = worker
-        self._q: "queue.Queue[int]" = queue.Queue()
-        self._in_queue: set[int] = set()
-        self._status: Dict[int, JobStatus] = {}
-        self._rerun: set[int] = set()
-        self._t = threading.Thread(target=self._loop, daemon=True, name="ai-job-worker")
-        self._t.start()
+        self.store = store
+        self.job_timeout = job_timeout
+        # Seconds a finished job stays in the live map; None keeps it forever.
+        self.retention = retention
+        # Limits on queued (not yet running) units; None means unlimited.
+        self.max_pending = max_pending
+        self.max_pending_per_course = max_pending_per_course
+        # Moving average of job run time, used for start-time estimates.
+        self._avg_runtime = float(default_runtime)
+        self._sched = FairScheduler(interactive_weight)
+        # Guards _in_queue/_running/_rerun/_status so several workers can share them.
+        self._lock = threading.RLock()
+        self._in_queue: set[JobKey] = set()
+        self._running: set[JobKey] = set()
+        self._status: Dict[JobKey, JobStatus] = {}
+        self._rerun: set[JobKey] = set()
+        # (lane, course) of each key so reruns go back where they came from.
+        self._placement: Dict[JobKey, Tuple[str, Any]] = {}
+        self._tokens: Dict[JobKey, CancelToken] = {}
+        # Work admitted through reserve() that runs outside the queue, per course.
+        self._reserved: Dict[Any, int] = {}
+        self._listeners: list[JobListener] = []
+        # Status snapshots taken under _lock, saved and announced in order
+        # by _flush() once the lock is released.
+        self._outbox: deque[Tuple[JobKey, JobStatus, Any, bool, bool]] = deque()
+        self._flush_lock = threading.Lock()
+        # Minimum seconds between stored progress-only updates of one job;
+        # state changes are always stored at once.
+        self.progress_interval = progress_interval
+        self._last_saved: Dict[JobKey, float] = {}
+        self._threads: list[threading.Thread] = []
+        for idx in range(max(1, int(workers))):
+            t = threading.Thread(
+                target=self._loop, daemon=True, name=f"ai-job-worker-{idx}"
+            )
+            t.start()
+            self._threads.append(t)
+        if retention:
+            threading.Thread(
+                target=self._compact_loop, daemon=True, name="ai-job-compactor"
+            ).start()
 
     @classmethod
-    def instance(cls, worker: Callable[[int, StatusProxy], None]) -> "AIJobQueue":
+    def instance(
+        cls,
+        worker: Callable[[int, StatusProxy, Optional[str]], None],
+        workers: int = 1,
+        store: "AIJobStore" | None = None,
+        job_timeout: Optional[float] = None,
+        interactive_weight: int = 4,
+        retention: Optional[float] = None,
+        max_pending: Optional[int] = None,
+        max_pending_per_course: Optional[int] = None,
+    ) -> "AIJobQueue":
         with cls._guard:
             if cls._instance is None:
-                cls._instance = cls(worker)
+                cls._instance = cls(
+                    worker,
+                    workers=workers,
+                    store=store,
+                    job_timeout=job_timeout,
+                    interactive_weight=interactive_weight,
+                    retention=retention,
+                    max_pending=max_pending,
+                    max_pending_per_course=max_pending_per_course,
+                )
             else:
                 cls._instance.worker = worker
             return cls._instance
 
-    def enqueue(self, assignment_id: int) -> bool:
-        if assignment_id in self._in_queue:
-            self._rerun.add(assignment_id)
-            print(
-                f"[AI][QUEUE] already queued: {assignment_id} -> mark rerun", flush=True
-            )
-            return False
-        self._in_queue.add(assignment_id)
-        self._status[assignment_id] = JobStatus(
-            state="queued", message="queued", updated_at=time.time()
+    @property
+    def worker_count(self) -> int:
+        return len(self._threads)
+
+    def enqueue(
+        self,
+        assignment_id: int,
+        zid: Optional[str] = None,
+        course_id: Optional[int] = None,
+        lane: Optional[str] = None,
+        enforce_limits: bool = True,
+    ) -> EnqueueResult:
+        """
+        Queue one work unit. Passing a zid scores only that student; without
+        it every tutor-marked submission of the assignment is scored.
+
+        Single-student jobs default to the interactive lane and whole
+        assignments to the bulk lane; course_id (looked up when omitted)
+        is used to take turns between courses.
+
+        Raises QueueFull when the unit would exceed a pending-job limit;
+        callers that already passed admit() can skip that with
+        ``enforce_limits=False``.
+        """
+        key = make_key(assignment_id, zid)
+        label = format_key(key)
+        lane = lane or (INTERACTIVE if key[1] else BULK)
+        if course_id is None and self.store is not None:
+            course_id = self.store.course_id_for(assignment_id)
+        with self._lock:
+            outcome = self._merge_outcome(key)
+            if outcome == "covered":
+                # A pending whole-assignment run will pick this student up anyway.
+                print(f"[AI][QUEUE] covered by queued job: {label}", flush=True)
+                return self._result(False, key, outcome, make_key(assignment_id))
+            if outcome == "rerun":
+                self._rerun.add(key)
+                print(f"[AI][QUEUE] already queued: {label} -> mark rerun", flush=True)
+                return self._result(False, key, outcome, key)
+            if enforce_limits:
+                self._check_limits(course_id)
+            self._put(key, lane, course_id, "queued")
+            result = self._result(True, key, "queued", key)
+        self._flush()
+        print(f"[AI][QUEUE] put job: {label} lane={lane}", flush=True)
+        return result
+
+    def admit(
+        self,
+        assignment_id: Optional[int] = None,
+        zid: Optional[str] = None,
+        course_id: Optional[int] = None,
+    ) -> None:
+        """
+        Raise QueueFull if enqueue() of this unit would be rejected now.
+        Without an assignment only the course/global limits are checked.
+        """
+        key = make_key(assignment_id, zid) if assignment_id is not None else None
+        if course_id is None and key is not None and self.store is not None:
+            course_id = self.store.course_id_for(assignment_id)
+        with self._lock:
+            if key is None or self._merge_outcome(key) is None:
+                self._check_limits(course_id)
+
+    def reserve(self, course_id: Any = None) -> Callable[[], None]:
+        """
+        Admit a run that executes outside the queue (the batch /v1/ai/run)
+        and count it against the pending limits until the returned release
+        function is called. Raises QueueFull like admit().
+        """
+        with self._lock:
+            self._check_limits(course_id)
+            self._reserved[course_id] = self._reserved.get(course_id, 0) + 1
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            with self._lock:
+                if released:
+                    return
+                released = True
+                left = self._reserved.get(course_id, 0) - 1
+                if left > 0:
+                    self._reserved[course_id] = left
+                else:
+                    self._reserved.pop(course_id, None)
+
+        return release
+
+    def _merge_outcome(self, key: JobKey) -> Optional[str]:
+        """How an already queued unit absorbs ``key``; None if it is new work."""
+        whole = make_key(key[0])
+        if key[1] and whole in self._in_queue and whole not in self._running:
+            return "covered"
+        if key in self._in_queue:
+            return "rerun"
+        return None
+
+    def _check_limits(self, course_id: Any) -> None:
+        if self.max_pending_per_course and course_id is not None:
+            depth = self._sched.depth(course_id) + self._reserved.get(course_id, 0)
+            if depth >= self.max_pending_per_course:
+                raise QueueFull(
+                    "course", self.max_pending_per_course, self._retry_after()
+                )
+        pending = len(self._sched) + sum(self._reserved.values())
+        if self.max_pending and pending >= self.max_pending:
+            raise QueueFull("global", self.max_pending, self._retry_after())
+
+    def _retry_after(self) -> int:
+        # Roughly the time for one worker slot to free up.
+        return max(1, math.ceil(self._avg_runtime / len(self._threads)))
+
+    def _result(
+        self, accepted: bool, key: JobKey, outcome: str, queued_key: JobKey
+    ) -> EnqueueResult:
+        position = self.queue_positions().get(queued_key)
+        return EnqueueResult(
+            accepted=accepted,
+            key=key,
+            outcome=outcome,
+            position=position,
+            estimated_start=self.estimate_start(position),
+        )
+
+    def estimate_start(self, position: Optional[int]) -> float:
+        """
+        Epoch time a unit at ``position`` should start, assuming every job
+        ahead of it (and every running one) takes the average run time.
+        """
+        now = time.time()
+        if position is None:
+            return now
+        workers = len(self._threads)
+        # Jobs that must finish before a worker is free for this one.
+        finishes = (position - 1) + len(self._running) - workers + 1
+        if finishes <= 0:
+            return now
+        return now + math.ceil(finishes / workers) * self._avg_runtime
+
+    def _put(self, key: JobKey, lane: str, course_id: Any, message: str) -> None:
+        self._in_queue.add(key)
+        self._placement[key] = (lane, course_id)
+        st = JobStatus(
+            state="queued", message=message, updated_at=time.time(), lane=lane
         )
-        self._q.put(assignment_id)
-        print(f"[AI][QUEUE] put job: {assignment_id}", flush=True)
-        return True
+        self._status[key] = st
+        self._persist(key, st)
+        self._sched.put(key, lane, course_id)
+
+    def recover(self) -> list[JobKey]:
+        """Re-queue jobs left queued or running by a previous process."""
+        if self.store is None:
+            return []
+        recovered: list[JobKey] = []
+        for job in self.store.load_active():
+            key = make_key(job.assignment_id, job.zid)
+            lane = job.lane if job.lane in LANES else (INTERACTIVE if key[1] else BULK)
+            course_id = job.assignment.course_id if job.assignment else None
+            with self._lock:
+                if key in self._in_queue:
+                    continue
+                message = (
+                    "requeued after restart" if job.state == "running" else "queued"
+                )
+                self._put(key, lane, course_id, message)
+            self._flush()
+            recovered.append(key)
+        if recovered:
+            labels = [format_key(k) for k in recovered]
+            print(f"[AI][QUEUE] recovered jobs: {labels}", flush=True)
+        return recovered
+
+    def cancel(self, assignment_id: int, zid: Optional[str] = None) -> list[JobKey]:
+        """
+        Cancel queued or running units of an assignment (one student if zid
+        is given). Running jobs stop at their next cancellation checkpoint.
+        """
+        target = make_key(assignment_id, zid)
+        affected: list[JobKey] = []
+        with self._lock:
+            for key in list(self._in_queue):
+                if key[0] != target[0] or (target[1] and key[1] != target[1]):
+                    continue
+                self._rerun.discard(key)
+                token = self._tokens.get(key)
+                if key in self._running and token is not None:
+                    token.cancel("cancelled by user")
+                elif self._sched.remove(key):
+                    self._in_queue.discard(key)
+                    st = self._status.get(key) or JobStatus()
+                    st.state = "cancelled"
+                    st.message = "cancelled by user"
+                    st.position = None
+                    st.updated_at = time.time()
+                    self._status[key] = st
+                    self._persist(key, st)
+                    self._placement.pop(key, None)
+                else:
+                    continue
+                affected.append(key)
+        self._flush()
+        if affected:
+            labels = [format_key(k) for k in affected]
+            print(f"[AI][QUEUE] cancel requested: {labels}", flush=True)
+        return affected
 
     def _loop(self):
         while True:
-            aid = self._q.get()
-            st = self._status.get(aid) or JobStatus()
-            st.state = "running"
-            st.progress = 0.0
-            st.message = "starting"
-            st.updated_at = time.time()
-            self._status[aid] = st
-            proxy = StatusProxy(st, lambda: self._touch(aid))
+            key = self._sched.get()
+            aid, zid = key
+            label = format_key(key)
+            with self._lock:
+                token = CancelToken(self.job_timeout)
+                self._tokens[key] = token
+                st = self._status.get(key) or JobStatus()
+                st.state = "running"
+                st.progress = 0.0
+                st.message = "starting"
+                st.error = None
+                st.position = None
+                st.stats = {}
+                st.updated_at = time.time()
+                self._status[key] = st
+                self._running.add(key)
+                self._persist(key, st, started=True)
+                started_at = st.updated_at
+            self._flush()
+            proxy = StatusProxy(st, lambda key=key: self._touch(key), token)
             try:
-                self.worker(aid, proxy)
+                self.worker(aid, proxy, zid)
+                if token.reason is not None:
+                    # The worker noticed the cancellation and returned early.
+                    raise JobCancelled(token.reason)
                 st.state = "done"
                 st.progress = 1.0
                 st.message = "done"
                 st.updated_at = time.time()
+            except JobCancelled as exc:
+                st.state = "cancelled"
+                st.message = str(exc) or "cancelled"
+                st.updated_at = time.time()
             except Exception:
                 st.state = "error"
                 st.error = traceback.format_exc()
                 st.message = "failed"
                 st.updated_at = time.time()
             finally:
-                if aid in self._rerun:
-                    self._rerun.discard(aid)
-                    self._q.put(aid)
-                    print(f"[AI][QUEUE] rerun scheduled: {aid}", flush=True)
-                else:
-                    self._in_queue.discard(aid)
-                    print(
-                        f"[AI][QUEUE] finish job: {aid}, state={st.state}", flush=True
-                    )
-                self._status[aid] = st
-                self._q.task_done()
-
-    def _touch(self, aid: int):
-        st = self._status.get(aid)
-        if st:
-            st.updated_at = time.time()
-
-    def get_status(self, aid: int) -> Optional[JobStatus]:
-        return self._status.get(aid)
-
-    def list_status(self) -> Dict[int, JobStatus]:
-        return self._status
+                if self.store is not None:
+                    self.store.archive(key, st, started_at)
+                # A key stays in _in_queue until its last rerun is done,
+                # so no two workers ever run the same unit concurrently.
+                with self._lock:
+                    if st.state == "done":
+                        self._avg_runtime += 0.2 * (
+                            max(0.0, st.updated_at - started_at) - self._avg_runtime
+                        )
+                    self._running.discard(key)
+                    self._tokens.pop(key, None)
+                    if key in self._rerun:
+                        self._rerun.discard(key)
+                        lane, course_id = self._placement.get(key, (BULK, None))
+                        self._put(key, lane, course_id, "queued")
+                        print(f"[AI][QUEUE] rerun scheduled: {label}", flush=True)
+                    else:
+                        self._in_queue.discard(key)
+                        self._status[key] = st
+                        self._persist(key, st)
+                        self._placement.pop(key, None)
+                        print(
+                            f"[AI][QUEUE] finish job: {label}, state={st.state}",
+                            flush=True,
+                        )
+                self._flush()
+
+    def _touch(self, key: JobKey):
+        with self._lock:
+            st = self._status.get(key)
+            if st:
+                st.updated_at = time.time()
+                self._persist(key, st, progress=True)
+        self._flush()
+
+    def _persist(
+        self,
+        key: JobKey,
+        st: JobStatus,
+        *,
+        started: bool = False,
+        progress: bool = False,
+    ):
+        """Queue a snapshot of ``st`` for _flush(); call with the lock held."""
+        course_id = self._placement.get(key, (None, None))[1]
+        snapshot = replace(st, stats=dict(st.stats))
+        self._outbox.append((key, snapshot, course_id, started, progress))
+
+    def _flush(self):
+        """
+        Save and announce queued snapshots in the order they were taken,
+        without holding the queue lock. Progress-only updates reach the
+        store at most every ``progress_interval`` seconds per job; the
+        listeners see every one.
+        """
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    if not self._outbox:
+                        return
+                    key, st, course_id, started, progress = self._outbox.popleft()
+                    listeners = list(self._listeners)
+                now = time.monotonic()
+                if self.store is not None and not (
+                    progress
+                    and now - self._last_saved.get(key, -math.inf)
+                    < self.progress_interval
+                ):
+                    try:
+                        self.store.save(key, st, started=started)
+                        self._last_saved[key] = now
+                    except Exception:
+                        traceback.print_exc()
+                if not progress and st.state not in ACTIVE_STATES:
+                    self._last_saved.pop(key, None)
+                for listener in listeners:
+                    try:
+                        listener(key, course_id, st)
+                    except Exception:
+                        traceback.print_exc()
+
+    def add_listener(self, listener: JobListener) -> Callable[[], None]:
+        """
+        Call ``listener(key, course_id, status)`` on every status change.
+
+        Listeners get a snapshot of the status, in order, on the thread
+        that changed the job (or one that changed another job meanwhile).
+        The queue lock is not held, but events of other jobs wait behind
+        them, so they should hand the event off rather than block. Returns
+        a function that removes the listener again.
+        """
+        with self._lock:
+            self._listeners.append(listener)
+
+        def remove() -> None:
+            with self._lock:
+                if listener in self._listeners:
+                    self._listeners.remove(listener)
+
+        return remove
+
+    def compact(self, now: Optional[float] = None) -> list[JobKey]:
+        """
+        Drop finished jobs older than ``retention`` from the live map and
+        prune their ai_jobs rows; their runs remain in the history table.
+        Failed jobs stay in ai_jobs so the course status keeps flagging them.
+        """
+        if not self.retention:
+            return []
+        cutoff = (now or time.time()) - self.retention
+        with self._lock:
+            expired = [
+                key
+                for key, st in self._status.items()
+                if key not in self._in_queue
+                and st.state not in ACTIVE_STATES
+                and st.updated_at < cutoff
+            ]
+            for key in expired:
+                del self._status[key]
+        if self.store is not None:
+            self.store.prune(cutoff)
+        return expired
+
+    def _compact_loop(self):
+        interval = min(60.0, max(1.0, self.retention / 2))
+        while True:
+            time.sleep(interval)
+            try:
+                self.compact()
+            except Exception:
+                traceback.print_exc()
+
+    def queue_positions(self) -> Dict[JobKey, int]:
+        """1-based position of every queued key in dispatch order."""
+        return {key: idx for idx, key in enumerate(self._sched.order(), start=1)}
+
+    def _refresh_positions(self) -> None:
+        positions = self.queue_positions()
+        for key, st in self._status.items():
+            st.position = positions.get(key) if st.state == "queued" else None
+
+    def get_status(
+        self, assignment_id: int, zid: Optional[str] = None
+    ) -> Optional[JobStatus]:
+        with self._lock:
+            self._refresh_positions()
+            return self._status.get(make_key(assignment_id, zid))
+
+    def list_status(self) -> Dict[JobKey, JobStatus]:
+        with self._lock:
+            self._refresh_positions()
+            return dict(self._status)
@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from typing import Callable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..logging import get_logger
+from .ai_job_queue import ACTIVE_STATES, JobKey, JobStatus
+
+logger = get_logger(__name__)
+
+# Finished live rows that may be pruned once they are past retention.
+PRUNABLE_STATES = ("done", "cancelled")
+
+
+def _from_epoch(ts: Optional[float]) -> datetime:
+    if ts is None:
+        return datetime.now(timezone.utc)
+    return datetime.fromtimestamp(float(ts), tz=timezone.utc)
+
+
+def _to_epoch(value: Optional[datetime]) -> Optional[float]:
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        # SQLite drops the tzinfo; rows are always written in UTC.
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def job_to_status(job: models.AIJob) -> JobStatus:
+    return JobStatus(
+        state=job.state,
+        progress=float(job.progress or 0.0),
+        message=job.message or "",
+        error=job.error,
+        updated_at=_to_epoch(job.updated_at) or 0.0,
+        lane=job.lane or "bulk",
+    )
+
+
+class AIJobStore:
+    """Persists AIJobQueue state into the ``ai_jobs`` table."""
+
+    def __init__(self, session_factory: Callable[[], Session]):
+        self._session_factory = session_factory
+
+    def save(self, key: JobKey, st: JobStatus, *, started: bool = False) -> None:
+        assignment_id, zid = key
+        db = self._session_factory()
+        try:
+            job = (
+                db.query(models.AIJob)
+                .filter(
+                    models.AIJob.assignment_id == assignment_id,
+                    models.AIJob.zid == (zid or ""),
+                )
+                .first()
+            )
+            if job is None:
+                job = models.AIJob(
+                    assignment_id=assignment_id, zid=zid or "", attempts=0
+                )
+                db.add(job)
+            job.state = st.state
+            job.lane = st.lane
+            job.progress = st.progress
+            job.message = st.message or ""
+            job.error = st.error
+            job.updated_at = _from_epoch(st.updated_at)
+            if started:
+                job.attempts = (job.attempts or 0) + 1
+                job.started_at = job.updated_at
+                job.finished_at = None
+            elif st.state in ACTIVE_STATES:
+                job.finished_at = None
+            else:
+                job.finished_at = job.updated_at
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            logger.warning(
+                "Failed to persist AI job %s/%s: %s", assignment_id, zid, exc
+            )
+        finally:
+            db.close()
+
+    def archive(self, key: JobKey, st: JobStatus, started_at: Optional[float]) -> None:
+        """Append a compact record of one finished run to ``ai_job_history``."""
+        assignment_id, zid = key
+        finished_at = _from_epoch(st.updated_at)
+        error = (st.error or "").strip().splitlines()
+        db = self._session_factory()
+        try:
+            job = (
+                db.query(models.AIJob)
+                .filter(
+                    models.AIJob.assignment_id == assignment_id,
+                    models.AIJob.zid == (zid or ""),
+                )
+                .first()
+            )
+            db.add(
+                models.AIJobHistory(
+                    assignment_id=assignment_id,
+                    zid=zid or "",
+                    state=st.state,
+                    lane=st.lane,
+                    attempt=(job.attempts if job else None) or 1,
+                    message=(st.message or "")[:255],
+                    error=error[-1][:255] if error else None,
+                    started_at=_from_epoch(started_at) if started_at else None,
+                    finished_at=finished_at,
+                    duration_seconds=(
+                        max(0.0, st.updated_at - started_at) if started_at else None
+                    ),
+                )
+            )
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            logger.warning(
+                "Failed to archive AI job %s/%s: %s", assignment_id, zid, exc
+            )
+        finally:
+            db.close()
+
+    def prune(self, finished_before: float) -> int:
+        """Delete finished ai_jobs rows older than the cutoff; history keeps them."""
+        db = self._session_factory()
+        try:
+            removed = (
+                db.query(models.AIJob)
+                .filter(
+                    models.AIJob.state.in_(PRUNABLE_STATES),
+                    models.AIJob.finished_at < _from_epoch(finished_before),
+                )
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+            return removed
+        except Exception as exc:
+            db.rollback()
+            logger.warning("Failed to prune finished AI jobs: %s", exc)
+            return 0
+        finally:
+            db.close()
+
+    def course_id_for(self, assignment_id: int) -> Optional[int]:
+        db = self._session_factory()
+        try:
+            assignment = db.get(models.Assignment, assignment_id)
+            return assignment.course_id if assignment else None
+        finally:
+            db.close()
+
+    def load_active(self) -> List[models.AIJob]:
+        """Jobs that were queued or running when the process last stopped."""
+        db = self._session_factory()
+        try:
+            return (
+                db.query(models.AIJob)
+                .filter(models.AIJob.state.in_(ACTIVE_STATES))
+                .order_by(models.AIJob.created_at, models.AIJob.id)
+                .all()
+            )
+        finally:
+            db.close()
+
+
+def list_course_jobs(db: Session, course_id: int) -> List[models.AIJob]:
+    return (
+        db.query(models.AIJob)
+        .join(models.Assignment, models.AIJob.assignment_id == models.Assignment.id)
+        .filter(models.Assignment.course_id == course_id)
+        .all()
+    )
+
+
+def list_job_history(
+    db: Session,
+    assignment_id: int,
+    zid: Optional[str] = None,
+    limit: int = 50,
+) -> List[models.AIJobHistory]:
+    """Most recent finished runs of an assignment, newest first."""
+    query = db.query(models.AIJobHistory).filter(
+        models.AIJobHistory.assignment_id == assignment_id
+    )
+    if zid is not None:
+        query = query.filter(models.AIJobHistory.zid == zid.lower())
+    return (
+        query.order_by(
+            models.AIJobHistory.finished_at.desc(), models.AIJobHistory.id.desc()
+        )
+        .limit(limit)
+        .all()
+    )
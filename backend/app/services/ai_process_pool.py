@@ -0,0 +1,230 @@
+from __future__ import annotations
+
+import importlib
+import multiprocessing
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+
+from ..config import settings
+from ..logging import get_logger
+from .ai_job_queue import JobCancelled
+
+logger = get_logger(__name__)
+
+PREDICT_PIPELINE = "AI.scripts.predict_scores:run_predict_pipeline"
+# Called at process start when AI_OCR_WARM_UP is set. The pipeline imports the
+# loader as src.preprocess.Loader, so that is the module whose engine is warmed.
+OCR_WARM_UP = "src.preprocess.Loader:warm_up_ocr"
+
+# How often the parent relays progress and forwards cancellation.
+_POLL_SECONDS = 0.5
+
+ProgressFn = Callable[[int, int, str], None]
+
+
+def _resolve(target: str) -> Callable[..., Any]:
+    module_name, _, attr = target.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+class _ChildCancelToken:
+    """Cancel token used inside a pool process, driven by the parent's event."""
+
+    def __init__(self, event):
+        self._event = event
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self) -> None:
+        if self.cancelled:
+            raise JobCancelled("cancelled")
+
+    def wait(self, seconds: float) -> bool:
+        self._event.wait(seconds)
+        return self.cancelled
+
+
+def _warm_up(preload: tuple[str, ...], calls: tuple[str, ...] = ()) -> None:
+    # Import the heavy AI modules once per process, not once per job.
+    for target in preload:
+        try:
+            _resolve(target)
+        except Exception as exc:
+            print(f"[AI][POOL] preload of {target} failed: {exc}", flush=True)
+    for target in calls:
+        try:
+            _resolve(target)()
+        except Exception as exc:
+            print(f"[AI][POOL] warm-up {target} failed: {exc}", flush=True)
+
+
+def _run_in_child(target: str, kwargs: Dict[str, Any], progress_q, cancel_event):
+    def progress(done: int, total: int, message: str) -> None:
+        progress_q.put((done, total, message))
+
+    fn = _resolve(target)
+    return fn(**kwargs, progress=progress, cancel_token=_ChildCancelToken(cancel_event))
+
+
+class PipelinePool:
+    """
+    Warm pool of worker processes that runs the AI pipeline off the API process.
+
+    torch, paddle and the embedding models are only ever imported in the pool
+    processes; ``max_tasks_per_child`` recycles a process after that many jobs
+    so memory leaked by those libraries is returned to the OS.
+    """
+
+    def __init__(
+        self,
+        processes: int = 1,
+        max_tasks_per_child: Optional[int] = None,
+        preload: tuple[str, ...] = (PREDICT_PIPELINE,),
+        warm_up: tuple[str, ...] = (),
+    ):
+        self.processes = max(1, int(processes))
+        self.max_tasks_per_child = max_tasks_per_child or None
+        self._preload = preload
+        self._warm_up_calls = warm_up
+        self._ctx = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._manager = None
+
+    def _ensure(self):
+        with self._lock:
+            if self._manager is None:
+                self._manager = self._ctx.Manager()
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=self._ctx,
+                    initializer=_warm_up,
+                    initargs=(self._preload, self._warm_up_calls),
+                    max_tasks_per_child=self.max_tasks_per_child,
+                )
+            return self._executor, self._manager
+
+    def _reset(self, executor: ProcessPoolExecutor) -> None:
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def run(
+        self,
+        target: str,
+        kwargs: Optional[Dict[str, Any]] = None,
+        *,
+        progress: Optional[ProgressFn] = None,
+        cancel_token=None,
+    ) -> Any:
+        """
+        Call ``target`` ("module:function") in a pool process and return its result.
+
+        The target receives ``progress`` and ``cancel_token`` keyword arguments.
+        Progress reported in the child is passed to ``progress`` here, and
+        cancelling ``cancel_token`` (or its deadline passing) is forwarded to
+        the child, whose JobCancelled is re-raised in the caller.
+        """
+        executor, manager = self._ensure()
+        progress_q = manager.Queue()
+        cancel_event = manager.Event()
+        future = executor.submit(
+            _run_in_child, target, dict(kwargs or {}), progress_q, cancel_event
+        )
+
+        def relay(timeout: float) -> None:
+            try:
+                item = progress_q.get(timeout=timeout)
+            except queue.Empty:
+                return
+            while True:
+                if progress is not None:
+                    progress(*item)
+                try:
+                    item = progress_q.get_nowait()
+                except queue.Empty:
+                    return
+
+        while not future.done():
+            if cancel_token is not None and cancel_token.cancelled:
+                cancel_event.set()
+            relay(_POLL_SECONDS)
+        relay(0)
+
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            logger.warning("AI pipeline process died; restarting the pool")
+            self._reset(executor)
+            raise RuntimeError("AI pipeline process exited unexpectedly")
+        except JobCancelled:
+            if cancel_token is not None and getattr(cancel_token, "reason", None):
+                raise JobCancelled(cancel_token.reason)
+            raise
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+            manager, self._manager = self._manager, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+        if manager is not None:
+            manager.shutdown()
+
+
+_pool: Optional[PipelinePool] = None
+_pool_lock = threading.Lock()
+
+
+def pipeline_process_count() -> int:
+    """AI_PIPELINE_PROCESSES, defaulting to one process per AI worker thread."""
+    if settings.ai_pipeline_processes is None:
+        return settings.ai_worker_count
+    return settings.ai_pipeline_processes
+
+
+def get_pipeline_pool() -> Optional[PipelinePool]:
+    """Shared pool, or None when AI_PIPELINE_PROCESSES=0 (run in-process)."""
+    global _pool
+    processes = pipeline_process_count()
+    if processes <= 0:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            _pool = PipelinePool(
+                processes=processes,
+                max_tasks_per_child=settings.ai_pipeline_max_tasks_per_child,
+                warm_up=(OCR_WARM_UP,) if settings.ai_ocr_warm_up else (),
+            )
+        return _pool
+
+
+def shutdown_pipeline_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+def run_pipeline(
+    target: str = PREDICT_PIPELINE,
+    kwargs: Optional[Dict[str, Any]] = None,
+    *,
+    progress: Optional[ProgressFn] = None,
+    cancel_token=None,
+) -> Any:
+    """Run ``target`` in the shared pool, or in this process when it is disabled."""
+    pool = get_pipeline_pool()
+    if pool is not None:
+        return pool.run(target, kwargs, progress=progress, cancel_token=cancel_token)
+    return _resolve(target)(
+        **dict(kwargs or {}), progress=progress, cancel_token=cancel_token
+    )
@@ -1,4 +1,5 @@
 import json
+import shutil
 import sys
 import threading
 import traceback
@@ -9,63 +10,43 @@ from sqlalchemy.orm import Session
 
 from .. import models
 from ..db import SessionLocal
-from ..routers.marking_result_manage import (
-    course_json_path_by_course,
-    load_json,
-    save_json_atomic,
-)
+from ..routers.marking_result_manage import update_course_json
 from ..services.system_log_service import record_system_log
 from ..utils.path_utils import assignment_dir
-from .ai_bridge import copy_students_for_predict_to_ai,copy_teacher_marked_to_ai,copy_spec_and_rubric_to_ai
+from .ai_bridge import build_predict_manifest
+from .ai_job_queue import JobCancelled
+from .ai_process_pool import PREDICT_PIPELINE, run_pipeline
 from .marking_sync import sync_ai_predictions_from_file
 
 
-def _fetch_assignment_ctx(assignment_id: int) -> tuple[models.Assignment, models.Course, Path] | None:
-    session = SessionLocal()
-    try:
-        assignment = session.get(models.Assignment, assignment_id)
-        if not assignment or not assignment.course:
-            print(f"[AI][RUNNER] Assignment {assignment_id} not found or missing course relation")
-            return None
-        course = assignment.course
-        assignment_root = assignment_dir(course.code, course.term or "", assignment.title, assignment.id)
-        return assignment, course, assignment_root
-    finally:
-        session.close()
-
-
+def ai_worker(assignment_id: int, st, zid: str | None = None) -> None:
+    """
+    Score tutor-marked submissions of one assignment.
 
+    The pipeline gets a manifest of the stored submission files and reads
+    them in place. With ``zid`` only that student is scored; the prediction
+    is then merged into the course marking JSON next to the results of
+    earlier runs. Every run writes into its own workspace under
+    AI/workspaces, so jobs for different assignments can run side by side.
+    """
+    import AI.scripts.config as ai_cfg
 
+    workspace = ai_cfg.create_workspace(f"assignment_{assignment_id}_{zid or 'all'}")
+    try:
+        _run_ai_job(assignment_id, st, zid, workspace)
+    finally:
+        shutil.rmtree(workspace["root"], ignore_errors=True)
 
 
+def _run_ai_job(assignment_id: int, st, zid: str | None, workspace: dict) -> None:
+    import AI.scripts.config as ai_cfg
 
-def ai_worker(assignment_id: int, st) -> None:
     print(
-        f"[AI][WORKER] >>> START aid={assignment_id} thread={threading.current_thread().name}",
+        f"[AI][WORKER] >>> START aid={assignment_id} zid={zid or '*'} thread={threading.current_thread().name}",
         flush=True,
     )
     db: Session = SessionLocal()
-
-    ctx = _fetch_assignment_ctx(assignment_id)
-    if ctx is None:
-        return
-
-    assignment, course, assignment_root = ctx
-
-
-    try:
-        # copy_spec_and_rubric_to_ai(assignment_root)
-        # print(f"[AI][RUNNER] Sending assignment specific and rubric to LLM model.")
-        copy_teacher_marked_to_ai(assignment_root, source="coordinator")
-        print(f"[AI][RUNNER] Preparing RAG Data Base.")
-    except FileNotFoundError as exc:
-        print(f"[AI][RUNNER] Missing spec/rubric or coordinator samples: {exc}")
-        return
-
-
-
-
-
+    cancel_token = getattr(st, "cancel_token", None)
 
     try:
         assignment: models.Assignment | None = db.get(models.Assignment, assignment_id)
@@ -76,10 +57,9 @@ def ai_worker(assignment_id: int, st) -> None:
 
         # Mark AI status as started (ai_completed = False)
         try:
-            json_path = course_json_path_by_course(assignment.course)
-            data = load_json(json_path)
-            data["ai_completed"] = False
-            save_json_atomic(json_path, data)
+            update_course_json(
+                assignment.course, lambda data: data.update(ai_completed=False)
+            )
             print(
                 f"[AI][WORKER] set ai_completed=False for course {assignment.course.code}",
                 flush=True,
@@ -103,37 +83,66 @@ def ai_worker(assignment_id: int, st) -> None:
         )
         print(f"[AI][WORKER] assignment_root={assignment_root}", flush=True)
 
-        st.update(progress=0.05, message="staging tutor files")
-        print(
-            f"[AI][WORKER] staging from: {assignment_root / 'submissions' / 'Student_assignment_with_Tutor_mark'}",
-            flush=True,
-        )
+        st.update(progress=0.05, message="listing tutor files")
         try:
-            staged = copy_students_for_predict_to_ai(assignment_root, source="Tutor")
+            manifest = build_predict_manifest(
+                db, assignment_id, zids=[zid] if zid else None
+            )
             print(
-                f"[AI][WORKER] staged_files={len(staged)} sample={staged[:3]}",
+                f"[AI][WORKER] manifest={len(manifest)} sample={[m['zid'] for m in manifest[:3]]}",
                 flush=True,
             )
-        except FileNotFoundError as exc:
-            print(f"[AI][WORKER] no tutor files; skipped. detail={exc}", flush=True)
-            st.update(progress=1.0, message="no tutor files; skipped")
-            return
         except Exception as exc:
-            st.update(progress=1.0, message=f"staging failed: {exc}")
-            print("[AI][WORKER] staging failed:", exc, file=sys.stderr, flush=True)
+            st.update(progress=1.0, message=f"listing tutor files failed: {exc}")
+            print("[AI][WORKER] manifest failed:", exc, file=sys.stderr, flush=True)
             traceback.print_exc()
             return
 
-        st.update(progress=0.15, message=f"staged {len(staged)} file(s)")
+        if not manifest:
+            skipped = (
+                f"no tutor file for {zid}; skipped"
+                if zid
+                else "no tutor files; skipped"
+            )
+            print(f"[AI][WORKER] {skipped}", flush=True)
+            st.update(progress=1.0, message=skipped)
+            return
 
-        from AI.scripts.predict_scores import run_predict_pipeline
+        st.update(
+            progress=0.15,
+            message=f"{len(manifest)} submission(s) to score",
+            stats={"manifest": {"files": len(manifest)}},
+        )
+        if cancel_token is not None:
+            cancel_token.check()
+
+        def report(done: int, total: int, message: str) -> None:
+            frac = done / total if total else 1.0
+            st.update(progress=0.20 + 0.65 * frac, message=message)
 
         st.update(progress=0.20, message="running predict pipeline")
         print("[AI][WORKER] calling run_predict_pipeline()", flush=True)
         pipeline_summary = None
         try:
-            pipeline_summary = run_predict_pipeline()
+            pipeline_summary = run_pipeline(
+                PREDICT_PIPELINE,
+                {
+                    "cache_path": ai_cfg.score_cache_path(assignment_id),
+                    "workspace": workspace["root"],
+                    "manifest": manifest,
+                },
+                progress=report,
+                cancel_token=cancel_token,
+            )
             print("[AI][WORKER] run_predict_pipeline() finished", flush=True)
+            # The pipeline process owns the OCR/document caches; it reports this run's use.
+            cache_stats = (pipeline_summary or {}).get("cache") or {}
+            if cache_stats:
+                print(f"[AI][WORKER] cache_stats={cache_stats}", flush=True)
+                st.update(stats={"cache": cache_stats})
+        except JobCancelled:
+            print("[AI][WORKER] run_predict_pipeline() cancelled", flush=True)
+            raise
         except Exception:
             st.update(progress=1.0, message="predict failed")
             print(
@@ -146,9 +155,9 @@ def ai_worker(assignment_id: int, st) -> None:
 
         st.update(progress=0.85, message="reading predictions")
         try:
-            import AI.scripts.config as ai_cfg
-
-            prediction_path = Path(ai_cfg.LLM_PREDICTION)
+            prediction_path = Path(
+                (pipeline_summary or {}).get("output_path") or workspace["prediction"]
+            )
             print(
                 f"[AI][WORKER] prediction_path={prediction_path} exists={prediction_path.exists()}",
                 flush=True,
@@ -170,10 +179,9 @@ def ai_worker(assignment_id: int, st) -> None:
             print(f"[AI][WORKER] sync_result={sync_result}", flush=True)
             # Mark AI status as completed (ai_completed = True)
             try:
-                json_path = course_json_path_by_course(assignment.course)
-                data = load_json(json_path)
-                data["ai_completed"] = True
-                save_json_atomic(json_path, data)
+                update_course_json(
+                    assignment.course, lambda data: data.update(ai_completed=True)
+                )
                 print(
                     f"[AI][WORKER] set ai_completed=True for course {assignment.course.code}",
                     flush=True,
@@ -185,14 +193,17 @@ def ai_worker(assignment_id: int, st) -> None:
                     flush=True,
                 )
             failed_students = []
+            reused = 0
             if isinstance(pipeline_summary, dict):
                 failed_students = pipeline_summary.get("failed_students") or []
+                reused = int(pipeline_summary.get("reused") or 0)
             success_count = int(sync_result.get("updated", 0))
             retry_count = len(failed_students)
             fail_count = retry_count  # Treat exhausted retries as failures
             msg = (
                 f"synced {success_count} record(s); "
-                f"retry_needed={retry_count}; fail={fail_count}"
+                f"retry_needed={retry_count}; fail={fail_count}; "
+                f"unchanged={reused}"
             )
             st.update(progress=1.0, message=msg)
 
@@ -209,6 +220,8 @@ def ai_worker(assignment_id: int, st) -> None:
                 "retry_count": retry_count,
                 "fail_count": fail_count,
                 "failed_students": failed_students,
+                "zid": zid,
+                "cache": cache_stats,
             }
             existing_log = (
                 db.query(models.SystemLog)
@@ -228,9 +241,7 @@ def ai_worker(assignment_id: int, st) -> None:
                 existing_log.course_id = assignment.course.id
                 # Refresh timestamp so the log ordering reflects this run.
                 existing_log.created_at = datetime.now(timezone.utc)
-                existing_log.metadata_json = json.dumps(
-                    metadata, ensure_ascii=False
-                )
+                existing_log.metadata_json = json.dumps(metadata, ensure_ascii=False)
                 db.commit()
             else:
                 record_system_log(
@@ -249,6 +260,8 @@ def ai_worker(assignment_id: int, st) -> None:
                 flush=True,
             )
 
-        print(f"[AI][RUNNER] marking completed for assignment {assignment_id}", flush=True)
+        print(
+            f"[AI][RUNNER] marking completed for assignment {assignment_id}", flush=True
+        )
         db.close()
         print(f"[AI][WORKER] <<< END aid={assignment_id}", flush=True)
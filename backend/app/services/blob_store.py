@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import BinaryIO, Dict, Optional
+
+from sqlalchemy import event, func, inspect, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..config import settings
+from ..logging import get_logger
+
+logger = get_logger(__name__)
+
+_CHUNK = 1024 * 1024
+
+
+@dataclass
+class StoredBlob:
+    sha256: str
+    size: int
+    path: Path
+
+
+class BlobStore:
+    """
+    Content-addressed file store: ``<root>/ab/cd/abcd…`` keyed by sha256.
+
+    Blobs are written once and made read-only; the per-course slug tree
+    only holds hardlinks to them, so re-uploading the same bytes (another
+    step, a rerun, a second student with an identical file) costs no space.
+    """
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self.tmp_dir = self.root / ".tmp"
+
+    def path_for(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256[2:4] / sha256
+
+    def write(self, fileobj: BinaryIO) -> StoredBlob:
+        """Stream ``fileobj`` into the store, hashing as it goes."""
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_name = tempfile.mkstemp(dir=self.tmp_dir)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                for chunk in iter(lambda: fileobj.read(_CHUNK), b""):
+                    digest.update(chunk)
+                    size += len(chunk)
+                    out.write(chunk)
+            sha256 = digest.hexdigest()
+            dest = self.path_for(sha256)
+            if dest.exists():
+                os.unlink(tmp_name)
+                # Fresh mtime: collect_garbage leaves it alone while the
+                # reference to it is not committed yet.
+                os.utime(dest)
+            else:
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                os.chmod(tmp_name, 0o444)
+                os.replace(tmp_name, dest)
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except FileNotFoundError:
+                pass
+            raise
+        return StoredBlob(sha256=sha256, size=size, path=dest)
+
+    def link(self, sha256: str, dest: Path) -> Path:
+        """Expose a blob at ``dest`` (its slug-tree path) as a hardlink, copying across devices."""
+        src = self.path_for(sha256)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        if dest.exists() or dest.is_symlink():
+            dest.unlink()
+        try:
+            os.link(src, dest)
+        except OSError:
+            shutil.copyfile(src, dest)
+        return dest
+
+    def mtime(self, sha256: str) -> float:
+        try:
+            return self.path_for(sha256).stat().st_mtime
+        except FileNotFoundError:
+            return 0.0
+
+    def delete(self, sha256: str) -> int:
+        """Remove a blob file; returns the bytes freed."""
+        path = self.path_for(sha256)
+        try:
+            size = path.stat().st_size
+            path.unlink()
+        except FileNotFoundError:
+            return 0
+        return size
+
+
+_store: Optional[BlobStore] = None
+
+
+def get_blob_store() -> BlobStore:
+    global _store
+    if _store is None:
+        _store = BlobStore(settings.UPLOAD_ROOT / "blobs")
+    return _store
+
+
+def store_upload(
+    db: Session,
+    fileobj: BinaryIO,
+    link_at: Optional[Path] = None,
+    store: Optional[BlobStore] = None,
+) -> StoredBlob:
+    """
+    Store an upload and make sure its ``blobs`` row exists. The reference
+    itself is counted when the row pointing at it (SubmissionFile.sha256,
+    Assignment.spec_sha256/rubric_sha256) is flushed.
+    """
+    store = store or get_blob_store()
+    blob = store.write(fileobj)
+    row = db.get(models.Blob, blob.sha256)
+    if row is None:
+        try:
+            with db.begin_nested():
+                db.add(models.Blob(sha256=blob.sha256, size=blob.size, refcount=0))
+        except IntegrityError:
+            # A concurrent upload of the same bytes created it first.
+            pass
+    else:
+        # Restart the grace period of an unreferenced blob that is in use again.
+        row.updated_at = datetime.now(timezone.utc)
+    if link_at is not None:
+        store.link(blob.sha256, link_at)
+    return blob
+
+
+# ---------- Reference counting ----------
+
+
+def _adjust(connection, sha256: Optional[str], delta: int) -> None:
+    if not sha256:
+        return
+    connection.execute(
+        update(models.Blob)
+        .where(models.Blob.sha256 == sha256)
+        .values(refcount=models.Blob.refcount + delta, updated_at=func.now())
+    )
+
+
+def _load_old_value(target, value, oldvalue, initiator):
+    return value
+
+
+def _track_refs(model, *columns: str) -> None:
+    for column in columns:
+        # active_history loads the previous value on assignment, so the
+        # reference being replaced is known even on an expired instance.
+        event.listen(
+            getattr(model, column),
+            "set",
+            _load_old_value,
+            active_history=True,
+            retval=True,
+        )
+
+    @event.listens_for(model, "after_insert")
+    def _after_insert(mapper, connection, target):
+        for column in columns:
+            _adjust(connection, getattr(target, column), 1)
+
+    @event.listens_for(model, "after_update")
+    def _after_update(mapper, connection, target):
+        state = inspect(target)
+        for column in columns:
+            history = state.attrs[column].history
+            if not history.has_changes():
+                continue
+            for old in history.deleted:
+                _adjust(connection, old, -1)
+            for new in history.added:
+                _adjust(connection, new, 1)
+
+    @event.listens_for(model, "after_delete")
+    def _after_delete(mapper, connection, target):
+        for column in columns:
+            _adjust(connection, getattr(target, column), -1)
+
+
+_track_refs(models.SubmissionFile, "sha256")
+_track_refs(models.Assignment, "spec_sha256", "rubric_sha256")
+
+
+def live_references(db: Session) -> Counter:
+    """
+    Count references from rows that are still reachable. Rows orphaned by
+    bulk deletes (SQLite does not enforce ON DELETE CASCADE) are ignored.
+    """
+    refs: Counter = Counter()
+    files = (
+        db.query(models.SubmissionFile.sha256)
+        .join(
+            models.Submission,
+            models.SubmissionFile.submission_id == models.Submission.id,
+        )
+        .outerjoin(
+            models.Assignment, models.Submission.assignment_id == models.Assignment.id
+        )
+        .filter(models.SubmissionFile.sha256.isnot(None))
+        .filter(
+            or_(
+                models.Submission.assignment_id.is_(None),
+                models.Assignment.id.isnot(None),
+            )
+        )
+    )
+    refs.update(sha for (sha,) in files)
+    assignments = db.query(
+        models.Assignment.spec_sha256, models.Assignment.rubric_sha256
+    ).join(models.Course, models.Assignment.course_id == models.Course.id)
+    for spec, rubric in assignments:
+        refs.update(sha for sha in (spec, rubric) if sha)
+    return refs
+
+
+def _epoch(value: Optional[datetime]) -> float:
+    if value is None:
+        return 0.0
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def collect_garbage(
+    db: Session,
+    store: Optional[BlobStore] = None,
+    grace_seconds: float = 3600,
+) -> Dict[str, int]:
+    """
+    Recount references, then delete blobs nobody has pointed at for
+    ``grace_seconds`` plus stray files left by interrupted uploads. A blob
+    whose file was re-uploaded within the grace period is kept too: the
+    row pointing at it may not be committed yet.
+    """
+    store = store or get_blob_store()
+    cutoff = time.time() - grace_seconds
+    refs = live_references(db)
+    removed = freed = 0
+    known = set()
+    for blob in db.query(models.Blob).all():
+        known.add(blob.sha256)
+        count = refs.get(blob.sha256, 0)
+        if count != blob.refcount:
+            blob.refcount = count
+            blob.updated_at = datetime.now(timezone.utc)
+            continue
+        if (
+            count <= 0
+            and _epoch(blob.updated_at) < cutoff
+            and store.mtime(blob.sha256) < cutoff
+        ):
+            freed += store.delete(blob.sha256)
+            db.delete(blob)
+            removed += 1
+    db.commit()
+
+    # Files without a row (crash between write and commit) and stale temp files.
+    if store.root.exists():
+        for path in store.root.glob("??/??/*"):
+            if path.name in known or not path.is_file():
+                continue
+            if path.stat().st_mtime < cutoff:
+                freed += store.delete(path.name)
+                removed += 1
+    if store.tmp_dir.exists():
+        for path in store.tmp_dir.iterdir():
+            if path.is_file() and path.stat().st_mtime < cutoff:
+                freed += path.stat().st_size
+                path.unlink()
+    if removed:
+        logger.info("Blob GC removed %s blob(s), %s bytes", removed, freed)
+    return {"blobs_removed": removed, "bytes_freed": freed}
@@ -0,0 +1,252 @@
+from __future__ import annotations
+
+import os
+import re
+import shutil
+import threading
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+from sqlalchemy.orm import Session
+
+from .. import models
+from ..config import settings
+from ..logging import get_logger
+from .ai_bridge import AI_DIR
+from .blob_store import BlobStore, collect_garbage, get_blob_store
+from .system_log_service import record_system_log
+
+logger = get_logger(__name__)
+
+WORKSPACE_ROOT = AI_DIR / "workspaces"
+LLM_LOG_DIR = AI_DIR / "logs" / "llm_calls"
+
+# uploads/<course-term>/<assignment-slug>-<assignment id>
+_ASSIGNMENT_DIR = re.compile(r"-(\d+)$")
+
+
+@dataclass
+class JanitorReport:
+    workspaces_removed: int = 0
+    uploads_removed: int = 0
+    logs_removed: int = 0
+    blobs_removed: int = 0
+    bytes_freed: int = 0
+    seconds: float = 0.0
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+    @property
+    def removed(self) -> int:
+        return (
+            self.workspaces_removed
+            + self.uploads_removed
+            + self.logs_removed
+            + self.blobs_removed
+        )
+
+
+def _walk_files(root: Path) -> Iterator[os.stat_result]:
+    for dirpath, _dirs, files in os.walk(root):
+        for name in files:
+            try:
+                yield os.lstat(os.path.join(dirpath, name))
+            except OSError:
+                continue
+
+
+def _newest_mtime(root: Path) -> float:
+    newest = root.stat().st_mtime
+    for st in _walk_files(root):
+        newest = max(newest, st.st_mtime)
+    return newest
+
+
+def _reclaimable_bytes(root: Path) -> int:
+    # Hardlinks into the blob store free nothing until the blob itself goes.
+    return sum(st.st_size for st in _walk_files(root) if st.st_nlink <= 1)
+
+
+def _remove_tree(root: Path) -> int:
+    freed = _reclaimable_bytes(root)
+    shutil.rmtree(root, ignore_errors=True)
+    return freed
+
+
+class Janitor:
+    """
+    Reclaims disk off the request/job path: run workspaces left behind by
+    crashed jobs, upload trees of deleted assignments, old LLM call logs
+    and unreferenced blobs. A retention of 0 disables that sweep.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        upload_root: Path,
+        workspace_root: Path = WORKSPACE_ROOT,
+        llm_log_dir: Path = LLM_LOG_DIR,
+        blob_store: Optional[BlobStore] = None,
+        workspace_retention: float = 86400,
+        upload_retention: float = 7 * 86400,
+        log_retention: float = 30 * 86400,
+        blob_grace: float = 3600,
+        interval: float = 3600,
+    ):
+        self.session_factory = session_factory
+        self.upload_root = Path(upload_root)
+        self.workspace_root = Path(workspace_root)
+        self.llm_log_dir = Path(llm_log_dir)
+        self.blob_store = blob_store
+        self.workspace_retention = workspace_retention
+        self.upload_retention = upload_retention
+        self.log_retention = log_retention
+        self.blob_grace = blob_grace
+        self.interval = interval
+        self.last_report: Optional[JanitorReport] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- sweeps ----------
+
+    def sweep_workspaces(self, report: JanitorReport, now: float) -> None:
+        if not self.workspace_retention or not self.workspace_root.is_dir():
+            return
+        cutoff = now - self.workspace_retention
+        for ws in self.workspace_root.iterdir():
+            # A live run keeps touching its files, so only idle trees qualify.
+            if not ws.is_dir() or _newest_mtime(ws) >= cutoff:
+                continue
+            report.bytes_freed += _remove_tree(ws)
+            report.workspaces_removed += 1
+
+    def sweep_uploads(self, db: Session, report: JanitorReport, now: float) -> None:
+        if not self.upload_retention or not self.upload_root.is_dir():
+            return
+        cutoff = now - self.upload_retention
+        live = {aid for (aid,) in db.query(models.Assignment.id)}
+        blob_root = (self.blob_store or get_blob_store()).root.resolve()
+        for course_dir in self.upload_root.iterdir():
+            if not course_dir.is_dir() or course_dir.resolve() == blob_root:
+                continue
+            for adir in course_dir.iterdir():
+                m = _ASSIGNMENT_DIR.search(adir.name)
+                # Id 0 holds submissions created without an assignment.
+                if not adir.is_dir() or not m or int(m.group(1)) in (0, *live):
+                    continue
+                if _newest_mtime(adir) >= cutoff:
+                    continue
+                report.bytes_freed += _remove_tree(adir)
+                report.uploads_removed += 1
+            try:
+                course_dir.rmdir()  # only succeeds once the course tree is empty
+            except OSError:
+                pass
+
+    def sweep_logs(self, report: JanitorReport, now: float) -> None:
+        if not self.log_retention or not self.llm_log_dir.is_dir():
+            return
+        cutoff = now - self.log_retention
+        for path in self.llm_log_dir.iterdir():
+            try:
+                st = path.stat()
+                if not path.is_file() or st.st_mtime >= cutoff:
+                    continue
+                path.unlink()
+            except OSError:
+                continue
+            report.bytes_freed += st.st_size
+            report.logs_removed += 1
+
+    def sweep_blobs(self, db: Session, report: JanitorReport) -> None:
+        result = collect_garbage(
+            db, self.blob_store or get_blob_store(), grace_seconds=self.blob_grace
+        )
+        report.blobs_removed += result["blobs_removed"]
+        report.bytes_freed += result["bytes_freed"]
+
+    def run_once(self, now: Optional[float] = None) -> JanitorReport:
+        started = time.perf_counter()
+        now = now or time.time()
+        report = JanitorReport()
+        self.sweep_workspaces(report, now)
+        self.sweep_logs(report, now)
+        db = self.session_factory()
+        try:
+            self.sweep_uploads(db, report, now)
+            self.sweep_blobs(db, report)
+            report.seconds = time.perf_counter() - started
+            if report.removed:
+                record_system_log(
+                    db,
+                    action="janitor.sweep",
+                    message=(
+                        f"Janitor freed {report.bytes_freed} bytes "
+                        f"({report.removed} item(s)) in {report.seconds:.2f}s"
+                    ),
+                    metadata=report.as_dict(),
+                )
+        finally:
+            db.close()
+        self.last_report = report
+        return report
+
+    # ---------- background thread ----------
+
+    def start(self) -> None:
+        if self._thread is not None or not self.interval:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True, name="janitor")
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout=5)
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                logger.exception("Janitor sweep failed")
+
+
+_janitor: Optional[Janitor] = None
+_janitor_lock = threading.Lock()
+
+
+def get_janitor() -> Janitor:
+    global _janitor
+    with _janitor_lock:
+        if _janitor is None:
+            from ..db import SessionLocal
+
+            _janitor = Janitor(
+                SessionLocal,
+                upload_root=settings.UPLOAD_ROOT,
+                workspace_retention=settings.janitor_workspace_retention_seconds,
+                upload_retention=settings.janitor_upload_retention_seconds,
+                log_retention=settings.janitor_log_retention_seconds,
+                blob_grace=settings.blob_gc_grace_seconds,
+                interval=settings.janitor_interval_seconds,
+            )
+        return _janitor
+
+
+def start_janitor() -> None:
+    """Start the background sweeps; JANITOR_INTERVAL_SECONDS=0 disables them."""
+    get_janitor().start()
+
+
+def stop_janitor() -> None:
+    global _janitor
+    with _janitor_lock:
+        janitor, _janitor = _janitor, None
+    if janitor is not None:
+        janitor.stop()
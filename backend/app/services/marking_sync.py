@@ -11,6 +11,7 @@ from ..logging import get_logger
 from ..routers.marking_result_manage import (
     _REVIEW_DIFF_THRESHOLD,
     _now_utc_iso,
+    course_json_lock,
     course_json_path_by_course,
     load_json,
     save_json_atomic,
@@ -136,73 +137,79 @@ def sync_tutor_mark_from_file(
     course = _resolve_course(db, submission)
     json_path = course_json_path_by_course(course)
 
-    data = load_json(json_path)
-    data["course"] = course.code
-    data["name"] = course.name or ""
-    data["term"] = course.term or ""
+    with course_json_lock(json_path):
+        data = load_json(json_path)
+        data["course"] = course.code
+        data["name"] = course.name or ""
+        data["term"] = course.term or ""
 
-    zid = (extracted.get("zid") or "").lower()
-    assignment_id: int | None = submission.assignment_id
-    existing: Optional[Dict[str, Any]] = None
-    for item in data["marking_results"]:
-        if not isinstance(item, dict):
-            continue
-        if (
-            item.get("zid", "").lower() == zid
-            and item.get("assignment_id") == assignment_id
-        ):
-            existing = item
-            break
+        zid = (extracted.get("zid") or "").lower()
+        assignment_id: int | None = submission.assignment_id
+        existing: Optional[Dict[str, Any]] = None
+        for item in data["marking_results"]:
+            if not isinstance(item, dict):
+                continue
+            if (
+                item.get("zid", "").lower() == zid
+                and item.get("assignment_id") == assignment_id
+            ):
+                existing = item
+                break
 
-    ai_total = _to_float(existing.get("ai_total")) if existing else None
-    tutor_total = _to_float(extracted.get("tutor_total"))
+        ai_total = _to_float(existing.get("ai_total")) if existing else None
+        tutor_total = _to_float(extracted.get("tutor_total"))
 
-    difference: Optional[float] = None
-    if ai_total is not None and tutor_total is not None:
-        difference = round(ai_total - tutor_total, 2)
+        difference: Optional[float] = None
+        if ai_total is not None and tutor_total is not None:
+            difference = round(ai_total - tutor_total, 2)
 
-    # Respect already reviewed status to avoid re-flagging
-    existing_status = (existing or {}).get("review_status") or ""
-    status_lower = str(existing_status).lower()
-    already_reviewed = status_lower in {"reviewed", "completed", "resolved", "checked"}
+        # Respect already reviewed status to avoid re-flagging
+        existing_status = (existing or {}).get("review_status") or ""
+        status_lower = str(existing_status).lower()
+        already_reviewed = status_lower in {
+            "reviewed",
+            "completed",
+            "resolved",
+            "checked",
+        }
 
-    if already_reviewed:
-        needs_review = False
-    else:
-        if ai_total is not None and tutor_total is not None:
-            denom = abs(tutor_total) if abs(tutor_total) > 1e-9 else 1.0
-            needs_review = (
-                abs(ai_total - tutor_total) / denom
-            ) >= _REVIEW_DIFF_THRESHOLD
+        if already_reviewed:
+            needs_review = False
         else:
-            needs_review = bool((existing or {}).get("needs_review"))
-
-    payload = {
-        "zid": zid,
-        "assignment_id": assignment_id,
-        "assignment": (existing or {}).get("assignment")
-        or submission.assignment_name
-        or "",
-        "student_name": (existing or {}).get("student_name")
-        or submission.student_id
-        or "",
-        "ai_marking_detail": (existing or {}).get("ai_marking_detail"),
-        "ai_total": ai_total,
-        "tutor_marking_detail": extracted.get("tutor_marking_detail"),
-        "tutor_total": tutor_total,
-        "marked_by": "tutor",
-        "difference": difference,
-        "needs_review": needs_review,
-        "review_status": (existing or {}).get("review_status", "pending"),
-        "review_comments": (existing or {}).get("review_comments", ""),
-        "ai_feedback": (existing or {}).get("ai_feedback"),
-        "tutor_feedback": (existing or {}).get("tutor_feedback"),
-        "created_at": _now_utc_iso(),
-    }
-
-    record = _upsert_record(data, zid, assignment_id, payload)
+            if ai_total is not None and tutor_total is not None:
+                denom = abs(tutor_total) if abs(tutor_total) > 1e-9 else 1.0
+                needs_review = (
+                    abs(ai_total - tutor_total) / denom
+                ) >= _REVIEW_DIFF_THRESHOLD
+            else:
+                needs_review = bool((existing or {}).get("needs_review"))
 
-    save_json_atomic(json_path, data)
+        payload = {
+            "zid": zid,
+            "assignment_id": assignment_id,
+            "assignment": (existing or {}).get("assignment")
+            or submission.assignment_name
+            or "",
+            "student_name": (existing or {}).get("student_name")
+            or submission.student_id
+            or "",
+            "ai_marking_detail": (existing or {}).get("ai_marking_detail"),
+            "ai_total": ai_total,
+            "tutor_marking_detail": extracted.get("tutor_marking_detail"),
+            "tutor_total": tutor_total,
+            "marked_by": "tutor",
+            "difference": difference,
+            "needs_review": needs_review,
+            "review_status": (existing or {}).get("review_status", "pending"),
+            "review_comments": (existing or {}).get("review_comments", ""),
+            "ai_feedback": (existing or {}).get("ai_feedback"),
+            "tutor_feedback": (existing or {}).get("tutor_feedback"),
+            "created_at": _now_utc_iso(),
+        }
+
+        record = _upsert_record(data, zid, assignment_id, payload)
+
+        save_json_atomic(json_path, data)
     return record
 
 
@@ -228,6 +235,30 @@ def sync_ai_predictions_from_file(
     except Exception as exc:
         raise ValueError(f"Failed to parse prediction JSON: {exc}") from exc
     json_path = course_json_path_by_course(course)
+    with course_json_lock(json_path):
+        updated_records = _merge_ai_predictions(
+            json_path, course, assignment, predictions, prediction_path
+        )
+    logger.info(
+        "ai_prediction_sync_completed",
+        extra={
+            "assignment_id": assignment_id,
+            "course_id": course.id,
+            "count": len(updated_records),
+        },
+    )
+    return {"updated": len(updated_records), "path": str(json_path)}
+
+
+def _merge_ai_predictions(
+    json_path: Path,
+    course: models.Course,
+    assignment: models.Assignment,
+    predictions: Iterable[Dict[str, Any]],
+    prediction_path: Path,
+) -> list[Dict[str, Any]]:
+    """Upsert each prediction into the course JSON, keeping unrelated records."""
+    assignment_id = assignment.id
     data = load_json(json_path)
     data["course"] = course.code
     data["name"] = course.name or ""
@@ -329,12 +360,4 @@ def sync_ai_predictions_from_file(
         updated_records.append(record)
 
     save_json_atomic(json_path, data)
-    logger.info(
-        "ai_prediction_sync_completed",
-        extra={
-            "assignment_id": assignment_id,
-            "course_id": course.id,
-            "count": len(updated_records),
-        },
-    )
-    return {"updated": len(updated_records), "path": str(json_path)}
+    return updated_records
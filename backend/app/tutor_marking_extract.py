@@ -1,10 +1,18 @@
 import json
 import os
 import re
+import sys
+from pathlib import Path
 from typing import Any, Dict, Optional
 
 import fitz
-from docx import Document
+
+# The AI modules import each other as src.*, so AI/ itself goes on sys.path.
+AI_DIR = Path(__file__).resolve().parents[2] / "AI"
+if str(AI_DIR) not in sys.path:
+    sys.path.insert(0, str(AI_DIR))
+
+from src.preprocess.DocCache import get_doc_cache, load_docx_lines  # noqa: E402
 
 
 class TutorMarkExtractor:
@@ -24,8 +32,8 @@ class TutorMarkExtractor:
         """Read docx or pdf files"""
         ext = os.path.splitext(file_path)[1].lower()
         if ext in [".docx", ".doc"]:
-            doc = Document(file_path)
-            text = "\n".join(p.text for p in doc.paragraphs)
+            # Shared with the AI stages: a mark sheet they already parsed is not parsed again.
+            text = "\n".join(load_docx_lines(file_path, cache=get_doc_cache()))
         elif ext == ".pdf":
             doc = fitz.open(file_path)
             text = "\n".join(page.get_text("text") for page in doc)
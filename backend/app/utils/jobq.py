@@ -3,7 +3,13 @@ from __future__ import annotations
 
 from threading import Lock
 
-from ..services.ai_job_queue import AIJobQueue
+from fastapi import HTTPException
+
+from ..config import settings
+from ..db import SessionLocal
+from ..services.ai_job_events import job_event_hub
+from ..services.ai_job_queue import AIJobQueue, EnqueueResult, QueueFull
+from ..services.ai_job_store import AIJobStore
 from ..services.ai_runner import ai_worker
 
 _jobq = None
@@ -14,5 +20,33 @@ def get_jobq() -> AIJobQueue:
     global _jobq
     with _lock:
         if _jobq is None:
-            _jobq = AIJobQueue.instance(ai_worker)
+            _jobq = AIJobQueue.instance(
+                ai_worker,
+                workers=settings.ai_worker_count,
+                store=AIJobStore(SessionLocal),
+                job_timeout=settings.ai_job_timeout_seconds or None,
+                interactive_weight=settings.ai_interactive_weight,
+                retention=settings.ai_job_retention_seconds or None,
+                max_pending=settings.ai_queue_max_pending or None,
+                max_pending_per_course=settings.ai_queue_max_pending_per_course or None,
+            )
+            _jobq.add_listener(job_event_hub.on_job_status)
         return _jobq
+
+
+def queue_full_error(exc: QueueFull) -> HTTPException:
+    """429 when the course's own backlog is full, 503 when the whole queue is."""
+    return HTTPException(
+        status_code=429 if exc.scope == "course" else 503,
+        detail=str(exc),
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+def enqueue_headers(result: EnqueueResult) -> dict[str, str]:
+    headers = {"X-AI-Queue-Outcome": result.outcome}
+    if result.position is not None:
+        headers["X-AI-Queue-Position"] = str(result.position)
+    if result.estimated_start is not None:
+        headers["X-AI-Estimated-Start"] = str(int(result.estimated_start))
+    return headers
@@ -0,0 +1,73 @@
+import io
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.db import Base
+from app.services.ai_bridge import build_predict_manifest
+from app.services.blob_store import BlobStore, store_upload
+
+
+def test_manifest_lists_latest_tutor_file_per_student(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'manifest.db'}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False, autocommit=False)()
+    user = models.User(email="c@example.com", password_hash="x")
+    course = models.Course(code="COMP1", name="c", term="2025 T3", owner=user)
+    assignment = models.Assignment(title="a1", course=course)
+    db.add_all([user, course, assignment])
+    db.commit()
+    store = BlobStore(tmp_path / "blobs")
+    t0 = datetime(2025, 1, 1)
+
+    def upload(zid, data, filename, role, kind, minutes):
+        sub = models.Submission(
+            assignment_id=assignment.id,
+            assignment_name="a1",
+            course="COMP1",
+            term="2025 T3",
+            created_by=user.id,
+            student_id=zid,
+        )
+        db.add(sub)
+        db.flush()
+        blob = store_upload(db, io.BytesIO(data), store=store)
+        db.add(
+            models.SubmissionFile(
+                submission_id=sub.id,
+                step_index=5,
+                actor_role=role,
+                part_kind=kind,
+                filename=filename,
+                path=str(blob.path),
+                sha256=blob.sha256,
+                mime="application/octet-stream",
+                size=blob.size,
+                uploaded_by=user.id,
+                uploaded_at=t0 + timedelta(minutes=minutes),
+            )
+        )
+        db.commit()
+        return blob
+
+    tutor, coord = models.ActorRole.TUTOR, models.ActorRole.COORDINATOR
+    work, mark = models.PartKind.ASSIGNMENT, models.PartKind.SCORE
+    upload("z1111111", b"old", "z1111111_assignment.docx", tutor, work, 0)
+    newest = upload("z1111111", b"new", "z1111111_assignment.docx", tutor, work, 5)
+    other = upload("z2222222", b"two", "z2222222_assignment.docx", tutor, work, 1)
+    upload("z2222222", b"score", "z2222222_mark.docx", tutor, mark, 2)
+    upload("z3333333", b"coord", "z3333333_assignment.docx", coord, work, 3)
+    upload("z4444444", b"pdf", "z4444444_assignment.pdf", tutor, work, 4)
+
+    manifest = build_predict_manifest(db, assignment.id)
+
+    assert [(m["zid"], m["sha256"]) for m in manifest] == [
+        ("z1111111", newest.sha256),
+        ("z2222222", other.sha256),
+    ]
+    assert manifest[0]["path"] == str(newest.path)
+    assert manifest[0]["filename"] == "z1111111_assignment.docx"
+    only = build_predict_manifest(db, assignment.id, zids=["Z2222222"])
+    assert [m["zid"] for m in only] == ["z2222222"]
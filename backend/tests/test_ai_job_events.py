@@ -0,0 +1,65 @@
+import asyncio
+import threading
+
+from app.services.ai_job_events import JobEventHub
+from app.services.ai_job_queue import AIJobQueue
+
+
+def test_hub_delivers_worker_thread_events_to_course_subscribers():
+    hub = JobEventHub()
+
+    async def scenario():
+        mine = hub.subscribe(10)
+        other = hub.subscribe(11)
+        t = threading.Thread(target=hub.publish, args=(10, {"state": "running"}))
+        t.start()
+        t.join()
+        event = await asyncio.wait_for(mine.get(), timeout=2)
+        await asyncio.sleep(0)
+        assert other.empty()
+        hub.unsubscribe(10, mine)
+        hub.unsubscribe(11, other)
+        return event
+
+    assert asyncio.run(scenario()) == {"state": "running"}
+    assert hub.subscriber_count() == 0
+
+
+def test_queue_listener_sees_progress_and_completion():
+    seen = []
+    done = threading.Event()
+
+    def listener(key, course_id, st):
+        seen.append((key, course_id, st.state, st.message))
+        if st.state == "done":
+            done.set()
+
+    q = AIJobQueue(lambda aid, st, zid: st.update(progress=0.5, message="half"))
+    remove = q.add_listener(listener)
+    q.enqueue(1, zid="z1234567", course_id=3)
+
+    assert done.wait(5)
+    remove()
+    assert seen[0] == ((1, "z1234567"), 3, "queued", "queued")
+    assert ((1, "z1234567"), 3, "running", "half") in seen
+    assert seen[-1] == ((1, "z1234567"), 3, "done", "done")
+
+
+def test_stream_token_only_opens_its_own_course_stream():
+    import pytest
+    from fastapi import HTTPException
+
+    from app.deps import user_from_token
+    from app.security import create_access_token, create_stream_token
+
+    stream = create_stream_token("7", "events:3")
+    assert user_from_token(stream, scope="events:3").sub == "7"
+    for token, scope in [
+        (stream, "events:4"),  # another course
+        (stream, None),  # used as a login token
+        (create_access_token("7"), "events:3"),  # login token in a URL
+        (create_stream_token("7", "events:3", expires_seconds=-1), "events:3"),
+    ]:
+        with pytest.raises(HTTPException) as exc:
+            user_from_token(token, scope=scope)
+        assert exc.value.status_code == 401
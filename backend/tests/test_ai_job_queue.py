@@ -0,0 +1,392 @@
+import threading
+import time
+
+from app.services.ai_job_queue import AIJobQueue
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def test_workers_run_different_assignments_concurrently():
+    started = threading.Barrier(2, timeout=5)
+    release = threading.Event()
+
+    def worker(aid, st, zid):
+        started.wait()
+        release.wait(5)
+
+    q = AIJobQueue(worker, workers=2)
+    assert q.worker_count == 2
+    q.enqueue(1)
+    q.enqueue(2)
+
+    assert wait_for(lambda: all(q.get_status(a).state == "running" for a in (1, 2)))
+    release.set()
+    assert wait_for(lambda: all(q.get_status(a).state == "done" for a in (1, 2)))
+
+
+def test_duplicate_enqueue_marks_rerun_and_never_overlaps():
+    active: dict[int, int] = {}
+    overlap = []
+    calls = []
+    lock = threading.Lock()
+    gate = threading.Event()
+
+    def worker(aid, st, zid):
+        with lock:
+            active[aid] = active.get(aid, 0) + 1
+            if active[aid] > 1:
+                overlap.append(aid)
+            calls.append(aid)
+        gate.wait(5)
+        with lock:
+            active[aid] -= 1
+
+    q = AIJobQueue(worker, workers=3)
+    assert q.enqueue(7).accepted is True
+    assert wait_for(lambda: q.get_status(7).state == "running")
+    assert q.enqueue(7).outcome == "rerun"
+    assert not q.enqueue(7)
+    gate.set()
+
+    assert wait_for(lambda: len(calls) == 2 and q.get_status(7).state == "done")
+    assert overlap == []
+    assert 7 not in q._in_queue
+    assert 7 not in q._rerun
+
+
+def test_failed_job_records_error():
+    def worker(aid, st, zid):
+        raise RuntimeError("boom")
+
+    q = AIJobQueue(worker, workers=2)
+    q.enqueue(3)
+
+    assert wait_for(lambda: q.get_status(3).state == "error")
+    assert "boom" in q.get_status(3).error
+
+
+def test_student_units_are_independent_and_covered_by_queued_whole_run():
+    gate = threading.Event()
+    calls = []
+
+    def worker(aid, st, zid):
+        calls.append((aid, zid))
+        gate.wait(5)
+
+    q = AIJobQueue(worker, workers=1)
+    assert q.enqueue(5, zid="Z1111111")
+    assert wait_for(lambda: q.get_status(5, "z1111111").state == "running")
+    # A second student of the same assignment is its own unit.
+    assert q.enqueue(5, zid="z2222222")
+    assert q.enqueue(5)
+    # Whole-assignment run is queued, so further students ride along with it.
+    covered = q.enqueue(5, zid="z3333333")
+    assert not covered and covered.outcome == "covered"
+    assert covered.position == 2
+    gate.set()
+
+    assert wait_for(lambda: q.get_status(5).state == "done")
+    assert calls == [(5, "z1111111"), (5, "z2222222"), (5, None)]
+    assert q.get_status(5, "z3333333") is None
+
+
+def make_store(tmp_path):
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from app import models
+    from app.db import Base
+    from app.services.ai_job_store import AIJobStore
+
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'jobs.db'}",
+        connect_args={"check_same_thread": False},
+    )
+    Base.metadata.create_all(bind=engine)
+    factory = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    db = factory()
+    user = models.User(email="c@example.com", password_hash="x")
+    course = models.Course(code="COMP1", name="c", term="2025 T3", owner=user)
+    db.add_all(
+        [user, course]
+        + [models.Assignment(id=aid, title=f"a{aid}", course=course) for aid in (1, 2)]
+    )
+    db.commit()
+    db.close()
+    return AIJobStore(factory), factory
+
+
+def stored_states(factory):
+    from app import models
+
+    db = factory()
+    try:
+        return {j.assignment_id: j.state for j in db.query(models.AIJob).all()}
+    finally:
+        db.close()
+
+
+def test_store_persists_status_and_attempts(tmp_path):
+    from app import models
+
+    store, factory = make_store(tmp_path)
+    q = AIJobQueue(
+        lambda aid, st, zid: st.update(progress=0.5, message="half"), store=store
+    )
+    q.enqueue(1)
+    assert wait_for(lambda: stored_states(factory) == {1: "done"})
+
+    db = factory()
+    job = db.query(models.AIJob).filter_by(assignment_id=1).one()
+    assert job.progress == 1.0
+    assert job.attempts == 1
+    assert job.finished_at is not None
+    db.close()
+
+
+def test_recover_requeues_queued_and_orphaned_running_jobs(tmp_path):
+    from app import models
+
+    store, factory = make_store(tmp_path)
+    db = factory()
+    db.add_all(
+        [
+            models.AIJob(assignment_id=1, state="running", message="x", attempts=1),
+            models.AIJob(assignment_id=2, state="queued", message="queued"),
+        ]
+    )
+    db.commit()
+    db.close()
+
+    ran = []
+    q = AIJobQueue(lambda aid, st, zid: ran.append(aid), store=store)
+    assert sorted(q.recover()) == [(1, None), (2, None)]
+    assert wait_for(lambda: stored_states(factory) == {1: "done", 2: "done"})
+    assert sorted(ran) == [1, 2]
+
+    db = factory()
+    jobs = {j.assignment_id: j for j in db.query(models.AIJob).all()}
+    assert jobs[1].state == "done" and jobs[1].attempts == 2
+    assert jobs[2].state == "done" and jobs[2].attempts == 1
+    db.close()
+
+
+def test_cancel_stops_running_job_and_skips_queued_one():
+    calls = []
+
+    def worker(aid, st, zid):
+        calls.append(aid)
+        while True:
+            st.cancel_token.check()
+            time.sleep(0.01)
+
+    q = AIJobQueue(worker, workers=1)
+    q.enqueue(1)
+    q.enqueue(2)
+    assert wait_for(lambda: q.get_status(1).state == "running")
+
+    assert q.cancel(2) == [(2, None)]
+    assert q.get_status(2).state == "cancelled"
+    assert q.cancel(1) == [(1, None)]
+
+    assert wait_for(lambda: q.get_status(1).state == "cancelled")
+    assert wait_for(lambda: not q._in_queue)
+    assert calls == [1]
+
+
+def test_job_timeout_cancels_stuck_worker():
+    def worker(aid, st, zid):
+        st.cancel_token.wait(30)
+
+    q = AIJobQueue(worker, workers=1, job_timeout=0.2)
+    q.enqueue(4)
+
+    assert wait_for(lambda: q.get_status(4).state == "cancelled", timeout=3)
+    assert "timed out" in q.get_status(4).message
+
+
+def test_scheduler_prefers_interactive_and_round_robins_courses():
+    from app.services.ai_job_queue import BULK, INTERACTIVE, FairScheduler
+
+    sched = FairScheduler(interactive_weight=2)
+    for aid in (1, 2, 3):
+        sched.put((aid, None), BULK, group="big-course")
+    sched.put((9, None), BULK, group="small-course")
+    for zid in ("z1", "z2", "z3"):
+        sched.put((4, zid), INTERACTIVE, group="other-course")
+
+    expected = [
+        (4, "z1"),
+        (4, "z2"),
+        (1, None),  # bulk gets a turn after two interactive jobs
+        (4, "z3"),
+        (9, None),  # courses alternate within the bulk lane
+        (2, None),
+        (3, None),
+    ]
+    assert sched.order() == expected
+    assert [sched.get() for _ in expected] == expected
+    assert len(sched) == 0
+
+
+def test_queue_reports_position_and_lane():
+    gate = threading.Event()
+
+    def worker(aid, st, zid):
+        gate.wait(5)
+
+    q = AIJobQueue(worker, workers=1)
+    q.enqueue(1, course_id=10)
+    assert wait_for(lambda: q.get_status(1).state == "running")
+    q.enqueue(2, course_id=10)
+    q.enqueue(3, zid="z1234567", course_id=11)
+
+    assert q.get_status(3, "z1234567").lane == "interactive"
+    assert q.get_status(3, "z1234567").position == 1
+    assert q.get_status(2).position == 2
+    assert q.get_status(1).position is None
+    gate.set()
+    assert wait_for(lambda: q.get_status(2).state == "done")
+
+
+def test_retention_moves_finished_jobs_to_history(tmp_path):
+    from app import models
+    from app.services.ai_job_store import list_job_history
+
+    store, factory = make_store(tmp_path)
+
+    def worker(aid, st, zid):
+        if aid == 2:
+            raise RuntimeError("boom")
+
+    q = AIJobQueue(worker, store=store, retention=3600)
+    q.enqueue(1)
+    q.enqueue(2)
+    assert wait_for(lambda: stored_states(factory) == {1: "done", 2: "error"})
+    assert wait_for(
+        lambda: q.get_status(2) is not None and q.get_status(2).state == "error"
+    )
+
+    assert q.compact() == []
+    assert sorted(q.compact(now=time.time() + 7200)) == [(1, None), (2, None)]
+    assert q.list_status() == {}
+    # Failed jobs stay in ai_jobs so the course status still flags them.
+    assert stored_states(factory) == {2: "error"}
+
+    db = factory()
+    try:
+        runs = list_job_history(db, 1)
+        assert [(r.state, r.attempt) for r in runs] == [("done", 1)]
+        assert runs[0].duration_seconds is not None
+        (failed,) = list_job_history(db, 2)
+        assert failed.error == "RuntimeError: boom"
+        assert db.query(models.AIJobHistory).count() == 2
+    finally:
+        db.close()
+
+
+def test_admission_limits_and_start_estimate():
+    import pytest
+
+    from app.services.ai_job_queue import QueueFull
+
+    gate = threading.Event()
+
+    def worker(aid, st, zid):
+        gate.wait(5)
+
+    q = AIJobQueue(
+        worker,
+        workers=1,
+        max_pending=3,
+        max_pending_per_course=2,
+        default_runtime=30,
+    )
+    q.enqueue(1, course_id=10)
+    assert wait_for(lambda: q.get_status(1).state == "running")
+
+    first = q.enqueue(2, course_id=10)
+    assert first.position == 1
+    # One job is running on the only worker, so this one waits one run.
+    assert 25 < first.estimated_start - time.time() <= 30
+    q.enqueue(3, course_id=10)
+
+    with pytest.raises(QueueFull) as exc:
+        q.enqueue(4, course_id=10)
+    assert exc.value.scope == "course" and exc.value.retry_after == 30
+    # Merging into queued work is always allowed.
+    assert q.enqueue(3, course_id=10).outcome == "rerun"
+    q.admit(3, course_id=10)
+
+    q.enqueue(5, course_id=11)
+    with pytest.raises(QueueFull) as exc:
+        q.admit(course_id=12)
+    assert exc.value.scope == "global"
+    gate.set()
+    assert wait_for(lambda: all(q.get_status(a).state == "done" for a in (2, 3, 5)))
+
+
+def test_status_is_stored_outside_the_lock_and_progress_is_throttled():
+    saves = []
+    ticks = []
+    done = threading.Event()
+
+    class Store:
+        def save(self, key, st, *, started=False):
+            # Another thread can still read the queue while a save is in flight.
+            reader = threading.Thread(target=q.list_status)
+            reader.start()
+            reader.join(2)
+            assert not reader.is_alive()
+            saves.append(st.state)
+
+        def archive(self, key, st, started_at):
+            pass
+
+    def listener(key, course_id, st):
+        ticks.append(st.progress)
+        if st.state == "done":
+            done.set()
+
+    def worker(aid, st, zid):
+        for i in range(1, 51):
+            st.update(progress=i / 50)
+
+    q = AIJobQueue(worker, store=Store(), progress_interval=60)
+    q.add_listener(listener)
+    q.enqueue(1, course_id=1)
+
+    assert done.wait(5)
+    # The start and the finish are stored; the 50 ticks in between are not.
+    assert saves == ["queued", "running", "done"]
+    assert len(ticks) == 53
+    assert ticks[-2:] == [1.0, 1.0]
+
+
+def test_reserved_runs_count_against_pending_limits():
+    import pytest
+
+    from app.services.ai_job_queue import QueueFull
+
+    q = AIJobQueue(lambda aid, st, zid: None, max_pending=2, max_pending_per_course=1)
+    release = q.reserve(course_id=10)
+    with pytest.raises(QueueFull) as exc:
+        q.reserve(course_id=10)
+    assert exc.value.scope == "course"
+    other = q.reserve(course_id=11)
+    with pytest.raises(QueueFull) as exc:
+        q.admit(course_id=12)
+    assert exc.value.scope == "global"
+
+    release()
+    release()  # a second call is a no-op
+    other()
+    q.admit(course_id=10)
+    assert q._reserved == {}
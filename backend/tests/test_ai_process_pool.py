@@ -0,0 +1,98 @@
+import os
+import threading
+
+import pytest
+
+from app.services.ai_job_queue import CancelToken, JobCancelled
+from app.services.ai_process_pool import PipelinePool
+
+TARGET = __name__
+
+
+def fake_pipeline(students, progress=None, cancel_token=None):
+    for done in range(students):
+        progress(done + 1, students, f"scored {done + 1}/{students}")
+    return {"pid": os.getpid(), "results": list(range(students))}
+
+
+def stuck_pipeline(progress=None, cancel_token=None):
+    progress(0, 1, "started")
+    while not cancel_token.wait(0.05):
+        pass
+    cancel_token.check()
+
+
+_warmed = []
+
+
+def warm_model():
+    _warmed.append(os.getpid())
+
+
+def warmed_pids(progress=None, cancel_token=None):
+    return list(_warmed)
+
+
+@pytest.fixture
+def pool():
+    pool = PipelinePool(processes=1, max_tasks_per_child=2, preload=())
+    yield pool
+    pool.shutdown()
+
+
+def test_pool_runs_target_in_child_and_relays_progress(pool):
+    seen = []
+    result = pool.run(
+        f"{TARGET}:fake_pipeline",
+        {"students": 3},
+        progress=lambda done, total, msg: seen.append((done, total)),
+    )
+
+    assert result["results"] == [0, 1, 2]
+    assert result["pid"] != os.getpid()
+    assert seen == [(1, 3), (2, 3), (3, 3)]
+
+
+def test_pool_recycles_child_after_max_tasks(pool):
+    pids = [
+        pool.run(f"{TARGET}:fake_pipeline", {"students": 0})["pid"] for _ in range(3)
+    ]
+
+    assert pids[0] == pids[1]
+    assert pids[2] != pids[0]
+
+
+def test_pool_forwards_cancellation_to_child(pool):
+    token = CancelToken()
+    started = threading.Event()
+
+    def progress(done, total, msg):
+        started.set()
+        token.cancel("cancelled by user")
+
+    with pytest.raises(JobCancelled, match="cancelled by user"):
+        pool.run(f"{TARGET}:stuck_pipeline", progress=progress, cancel_token=token)
+    assert started.is_set()
+
+
+def test_pool_runs_warm_up_calls_once_per_process():
+    pool = PipelinePool(processes=1, preload=(), warm_up=(f"{TARGET}:warm_model",))
+    try:
+        first = pool.run(f"{TARGET}:warmed_pids")
+        second = pool.run(f"{TARGET}:warmed_pids")
+    finally:
+        pool.shutdown()
+
+    assert len(first) == 1 and first[0] != os.getpid()
+    assert second == first
+
+
+def test_pool_size_follows_worker_count_unless_set(monkeypatch):
+    from app.config import settings
+    from app.services.ai_process_pool import pipeline_process_count
+
+    monkeypatch.setattr(settings, "ai_worker_count", 3)
+    monkeypatch.setattr(settings, "ai_pipeline_processes", None)
+    assert pipeline_process_count() == 3
+    monkeypatch.setattr(settings, "ai_pipeline_processes", 0)
+    assert pipeline_process_count() == 0
@@ -0,0 +1,146 @@
+import io
+import os
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.db import Base
+from app.services.blob_store import BlobStore, collect_garbage, store_upload
+
+
+def make_db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'blobs.db'}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine, autoflush=False, autocommit=False)()
+    user = models.User(email="c@example.com", password_hash="x")
+    course = models.Course(code="COMP1", name="c", term="2025 T3", owner=user)
+    assignment = models.Assignment(title="a1", course=course)
+    db.add_all([user, course, assignment])
+    db.commit()
+    return db, user, assignment
+
+
+def add_file(db, store, sub, user, data, link_at):
+    blob = store_upload(db, io.BytesIO(data), link_at=link_at, store=store)
+    db.add(
+        models.SubmissionFile(
+            submission_id=sub.id,
+            step_index=5,
+            actor_role=models.ActorRole.TUTOR,
+            part_kind=models.PartKind.ASSIGNMENT,
+            filename=link_at.name,
+            path=str(blob.path),
+            sha256=blob.sha256,
+            size=blob.size,
+            uploaded_by=user.id,
+        )
+    )
+    db.commit()
+    return blob
+
+
+def test_identical_uploads_share_one_refcounted_blob(tmp_path):
+    db, user, assignment = make_db(tmp_path)
+    store = BlobStore(tmp_path / "blobs")
+    sub = models.Submission(
+        assignment_id=assignment.id,
+        assignment_name="a1",
+        course="COMP1",
+        term="2025 T3",
+        created_by=user.id,
+    )
+    db.add(sub)
+    db.commit()
+
+    first = add_file(db, store, sub, user, b"same bytes", tmp_path / "tree" / "z1.docx")
+    second = add_file(
+        db, store, sub, user, b"same bytes", tmp_path / "tree" / "z2.docx"
+    )
+
+    assert first.sha256 == second.sha256
+    assert first.path == store.path_for(first.sha256)
+    assert os.path.samefile(first.path, tmp_path / "tree" / "z2.docx")
+    assert db.get(models.Blob, first.sha256).refcount == 2
+
+    db.delete(sub)
+    db.commit()
+    db.expire_all()
+    assert db.get(models.Blob, first.sha256).refcount == 0
+
+    # Still inside the grace period: kept.
+    assert collect_garbage(db, store, grace_seconds=3600)["blobs_removed"] == 0
+    result = collect_garbage(db, store, grace_seconds=-1)
+    assert result == {"blobs_removed": 1, "bytes_freed": len(b"same bytes")}
+    assert not first.path.exists()
+    assert db.get(models.Blob, first.sha256) is None
+
+
+def test_assignment_file_replacement_moves_the_reference(tmp_path):
+    db, _, assignment = make_db(tmp_path)
+    store = BlobStore(tmp_path / "blobs")
+
+    old = store_upload(db, io.BytesIO(b"spec v1"), store=store)
+    assignment.spec_sha256 = old.sha256
+    db.commit()
+    new = store_upload(db, io.BytesIO(b"spec v2"), store=store)
+    assignment.spec_sha256 = new.sha256
+    db.commit()
+    db.expire_all()
+
+    assert db.get(models.Blob, old.sha256).refcount == 0
+    assert db.get(models.Blob, new.sha256).refcount == 1
+    collect_garbage(db, store, grace_seconds=-1)
+    assert not old.path.exists() and new.path.exists()
+
+
+def test_gc_between_store_and_commit_keeps_the_reused_blob(tmp_path):
+    from datetime import datetime, timedelta, timezone
+
+    db, user, assignment = make_db(tmp_path)
+    store = BlobStore(tmp_path / "blobs")
+    sub = models.Submission(
+        assignment_id=assignment.id,
+        assignment_name="a1",
+        course="COMP1",
+        term="2025 T3",
+        created_by=user.id,
+    )
+    db.add(sub)
+    db.commit()
+    # An unreferenced blob, well past its grace period.
+    old = store_upload(db, io.BytesIO(b"old bytes"), store=store)
+    db.get(models.Blob, old.sha256).updated_at = datetime.now(timezone.utc) - timedelta(
+        hours=2
+    )
+    db.commit()
+    stale = old.path.stat().st_mtime - 7200
+    os.utime(old.path, (stale, stale))
+
+    # The same bytes are uploaded again; GC runs in another session before
+    # the submission row referencing them is committed.
+    blob = store_upload(db, io.BytesIO(b"old bytes"), store=store)
+    other = sessionmaker(bind=db.get_bind())()
+    assert collect_garbage(other, store, grace_seconds=3600)["blobs_removed"] == 0
+    other.close()
+    db.add(
+        models.SubmissionFile(
+            submission_id=sub.id,
+            step_index=5,
+            actor_role=models.ActorRole.TUTOR,
+            part_kind=models.PartKind.ASSIGNMENT,
+            filename="z1.docx",
+            path=str(blob.path),
+            sha256=blob.sha256,
+            size=blob.size,
+            uploaded_by=user.id,
+        )
+    )
+    db.commit()
+
+    assert blob.path.exists()
+    row = db.get(models.Blob, blob.sha256)
+    assert row.refcount == 1
+    assert row.updated_at > datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(
+        minutes=1
+    )
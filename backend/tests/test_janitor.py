@@ -0,0 +1,83 @@
+import os
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.db import Base
+from app.services.blob_store import BlobStore
+from app.services.janitor import Janitor
+
+DAY = 86400
+
+
+def age(path, seconds, now):
+    for dirpath, _dirs, files in os.walk(path):
+        for name in files:
+            os.utime(os.path.join(dirpath, name), (now - seconds, now - seconds))
+    os.utime(path, (now - seconds, now - seconds))
+
+
+def test_janitor_reclaims_stale_files_and_reports_bytes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'janitor.db'}")
+    Base.metadata.create_all(bind=engine)
+    Session = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+    db = Session()
+    user = models.User(email="c@example.com", password_hash="x")
+    course = models.Course(code="COMP1", name="c", term="2025 T3", owner=user)
+    kept = models.Assignment(title="a1", course=course)
+    db.add_all([user, course, kept])
+    db.commit()
+    now = 10 * DAY + 1e9
+
+    uploads = tmp_path / "uploads"
+    live = uploads / "comp1-2025-t3" / f"a1-{kept.id}"
+    orphan = uploads / "comp1-2025-t3" / "gone-999"
+    gone_course = uploads / "old-2024-t1" / "x-998"
+    for d, payload in ((live, b"keep"), (orphan, b"12345"), (gone_course, b"123")):
+        d.mkdir(parents=True)
+        (d / "file.docx").write_bytes(payload)
+        age(d, 30 * DAY, now)
+    # A hardlink into the blob store frees nothing by itself.
+    blob = tmp_path / "blob"
+    blob.write_bytes(b"shared")
+    os.link(blob, orphan / "linked.docx")
+    age(orphan, 30 * DAY, now)
+
+    workspaces = tmp_path / "workspaces"
+    stale_ws, busy_ws = workspaces / "stale", workspaces / "busy"
+    for ws in (stale_ws, busy_ws):
+        (ws / "prediction").mkdir(parents=True)
+        (ws / "prediction" / "out.json").write_bytes(b"{}")
+    age(stale_ws, 2 * DAY, now)
+    age(busy_ws, 60, now)
+
+    logs = tmp_path / "llm_calls"
+    logs.mkdir()
+    (logs / "old.json").write_bytes(b"x" * 10)
+    (logs / "new.json").write_bytes(b"y")
+    age(logs / "old.json", 40 * DAY, now)
+    os.utime(logs / "new.json", (now, now))
+
+    janitor = Janitor(
+        Session,
+        upload_root=uploads,
+        workspace_root=workspaces,
+        llm_log_dir=logs,
+        blob_store=BlobStore(uploads / "blobs"),
+    )
+    report = janitor.run_once(now=now)
+
+    assert live.exists() and not orphan.exists()
+    assert not (uploads / "old-2024-t1").exists()
+    assert busy_ws.exists() and not stale_ws.exists()
+    assert sorted(p.name for p in logs.iterdir()) == ["new.json"]
+    assert (report.uploads_removed, report.workspaces_removed, report.logs_removed) == (
+        2,
+        1,
+        1,
+    )
+    assert report.bytes_freed == 5 + 3 + 2 + 10
+    assert janitor.last_report is report
+    log = db.query(models.SystemLog).filter_by(action="janitor.sweep").one()
+    assert str(report.bytes_freed) in log.message
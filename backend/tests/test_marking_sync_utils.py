@@ -1,3 +1,8 @@
+import threading
+import time
+from types import SimpleNamespace
+
+from app.routers import marking_result_manage
 from app.services import marking_sync
 
 
@@ -60,3 +65,50 @@ def test_upsert_record_distinguishes_assignments_for_same_zid():
     assert len(data["marking_results"]) == 2
     assert record["assignment_id"] == 2
     assert data["marking_results"][0]["assignment_id"] == 1
+
+
+def _course():
+    return SimpleNamespace(code="COMP1234", name="Intro", term="2025 T1")
+
+
+def test_update_course_json_keeps_every_concurrent_write(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    course = _course()
+
+    def add(n):
+        def fn(data):
+            records = list(data["marking_results"])
+            time.sleep(0.01)  # widen the load/save window
+            data["marking_results"] = records + [{"zid": f"z{n}"}]
+
+        marking_result_manage.update_course_json(course, fn)
+
+    threads = [threading.Thread(target=add, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    path = marking_result_manage.course_json_path_by_course(course)
+    zids = {r["zid"] for r in marking_result_manage.load_json(path)["marking_results"]}
+    assert zids == {f"z{n}" for n in range(8)}
+
+
+def test_status_flag_waits_for_a_merge_in_progress(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    course = _course()
+    path = marking_result_manage.course_json_path_by_course(course)
+    done = threading.Event()
+
+    def flag():
+        marking_result_manage.update_course_json(
+            course, lambda data: data.update(ai_completed=True)
+        )
+        done.set()
+
+    # The lock sync_ai_predictions_from_file holds while merging.
+    with marking_sync.course_json_lock(path):
+        threading.Thread(target=flag).start()
+        assert not done.wait(0.1)
+    assert done.wait(2)
+    assert marking_result_manage.load_json(path)["ai_completed"] is True
@@ -0,0 +1,40 @@
+from docx import Document
+
+from app.tutor_marking_extract import TutorMarkExtractor
+
+
+def make_mark_sheet(path):
+    doc = Document()
+    for text in [
+        "Marking sheet",
+        "",
+        "Content: 12/15",
+        "",
+        "",
+        "Writing: 4.5/5 marks",
+        "Total Mark: 16.5/20",
+        "",
+    ]:
+        doc.add_paragraph(text)
+    doc.save(path)
+    return Document(path)
+
+
+def test_docx_text_keeps_empty_paragraphs(tmp_path, monkeypatch):
+    from src.preprocess import DocCache
+
+    cache = DocCache.ParsedDocCache(str(tmp_path / "cache"), 1 << 20)
+    monkeypatch.setattr(DocCache, "_doc_cache", cache)
+    path = str(tmp_path / "z1234567_mark.docx")
+    reference = make_mark_sheet(path)
+    extractor = TutorMarkExtractor()
+
+    expected = "\n".join(p.text for p in reference.paragraphs)
+    assert extractor.load_text(path) == expected
+    assert extractor.load_text(path) == expected  # from the cache
+    assert cache.stats["hits"] == 1
+
+    marks = extractor.extract_marks(path)
+    assert marks["zid"] == "z1234567"
+    assert marks["tutor_total"] == 16.5
+    assert marks["tutor_marking_detail"]["Writing"] == {"score": 4.5, "total": 5.0}
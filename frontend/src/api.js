@@ -44,6 +44,14 @@ export const markingResults = {
     byCourseId: (courseId) => GET(`/v1/marking_result/by_id/${courseId}`),
     upsert: (courseId, payload) => POST(`/v1/marking_result/${courseId}/append`, payload),
     status: (courseId) => GET(`/v1/marking_result/${courseId}/status`),
+    // Server-sent job updates. EventSource cannot send headers, so the URL carries a
+    // short-lived token scoped to this course's stream, never the login token.
+    events: async (courseId) => {
+        const { token } = await POST(`/v1/marking_result/${courseId}/events/token`);
+        return new EventSource(
+            `${BASE_URL}/v1/marking_result/${courseId}/events?token=${encodeURIComponent(token)}`
+        );
+    },
     setStatus: (courseId, aiCompleted) =>
         request(`/v1/marking_result/${courseId}/status`, {
             method: "PUT",
@@ -347,40 +347,54 @@ export default function Airesult() {
     const [fetchError, setFetchError] = useState("");
     const [aiCompleted, setAiCompleted] = useState(true);
     const [statusChecking, setStatusChecking] = useState(false);
-    const statusPollRef = useRef(null);
+    const statusSourceRef = useRef(null);
     const [selectedRowIds, setSelectedRowIds] = useState([]);
 
-    // Check per-course AI status; poll until completed
+    // Check per-course AI status; listen for job updates until completed
     useEffect(() => {
         if (!courseId) return;
         let cancelled = false;
         setStatusChecking(true);
-        // clear any previous poller
-        if (statusPollRef.current) {
-            clearInterval(statusPollRef.current);
-            statusPollRef.current = null;
+        // close any previous event stream
+        if (statusSourceRef.current) {
+            statusSourceRef.current.close();
+            statusSourceRef.current = null;
         }
         API.markingResults
             .status(courseId)
-            .then((s) => {
+            .then(async (s) => {
                 if (cancelled) return;
                 const done = Boolean(s?.ai_completed);
                 setAiCompleted(done);
                 if (!done) {
-                    statusPollRef.current = setInterval(async () => {
+                    let source;
+                    try {
+                        source = await API.markingResults.events(courseId);
+                    } catch {
+                        return; // live updates are optional; the status above still holds
+                    }
+                    if (cancelled) {
+                        source.close();
+                        return;
+                    }
+                    source.addEventListener("job", async (e) => {
+                        let job;
+                        try { job = JSON.parse(e.data); } catch { return; }
+                        if (!["done", "cancelled", "error"].includes(job.state)) return;
                         try {
                             const s2 = await API.markingResults.status(courseId);
                             if (s2?.ai_completed) {
                                 setAiCompleted(true);
-                                if (statusPollRef.current) {
-                                    clearInterval(statusPollRef.current);
-                                    statusPollRef.current = null;
+                                if (statusSourceRef.current) {
+                                    statusSourceRef.current.close();
+                                    statusSourceRef.current = null;
                                 }
                             }
-                        } catch (e) {
+                        } catch (err) {
                             // ignore transient errors
                         }
-                    }, 5000);
+                    });
+                    statusSourceRef.current = source;
                 }
             })
             .catch(() => {
@@ -392,9 +406,9 @@ export default function Airesult() {
             });
         return () => {
             cancelled = true;
-            if (statusPollRef.current) {
-                clearInterval(statusPollRef.current);
-                statusPollRef.current = null;
+            if (statusSourceRef.current) {
+                statusSourceRef.current.close();
+                statusSourceRef.current = null;
             }
         };
     }, [courseId]);
@@ -1,4 +1,4 @@
-import { useEffect, useMemo, useState } from "react";
+import { useEffect, useMemo, useRef, useState } from "react";
 import { useNavigate } from "react-router-dom";
 import { useAuth } from "../context/auth-context";
 import { Box, Stack, Grid, IconButton, Typography, Tooltip } from "@mui/material";
@@ -56,10 +56,15 @@ export default function CoursesPage() {
 
     const [dialogOpen, setDialogOpen] = useState(false);
     const [selectedCourse, setSelectedCourse] = useState(null);
-    const [statusPollId, setStatusPollId] = useState(null);
+    // Open job event stream and the course it belongs to (null when the dialog is closed).
+    const statusSourceRef = useRef(null);
+    const streamCourseRef = useRef(null);
 
     // AI status per course id: { [id]: { loading, aiCompleted, pendingAssignments, stuckAssignments, error } }
     const [aiStatusById, setAiStatusById] = useState({});
+    // Latest aiStatusById for event handlers, which keep the render they were created in.
+    const aiStatusRef = useRef(aiStatusById);
+    aiStatusRef.current = aiStatusById;
 
     const fetchCourseStatus = async (courseId) => {
         if (!courseId) return;
@@ -97,6 +102,73 @@ export default function CoursesPage() {
         }
     };
 
+    const FINISHED_STATES = ["done", "cancelled", "error"];
+
+    // Apply one pushed job update; refetch the full status when a job finishes or appears.
+    const handleJobEvent = (courseId, event) => {
+        let job;
+        try { job = JSON.parse(event.data); } catch { return; }
+        if (FINISHED_STATES.includes(job.state)) {
+            fetchCourseStatus(courseId);
+            return;
+        }
+        const isJob = (info) => info.assignment_id === job.assignment_id && (info.zid || null) === (job.zid || null);
+        const known = (aiStatusRef.current[courseId]?.pendingAssignments || []).some(isJob);
+        if (!known) {
+            fetchCourseStatus(courseId);
+            return;
+        }
+        setAiStatusById((prev) => {
+            const current = prev[courseId] || {};
+            const pending = (current.pendingAssignments || []).map((info) => {
+                if (!isJob(info)) return info;
+                return {
+                    ...info,
+                    state: job.state,
+                    progress: job.progress,
+                    message: job.message,
+                    lane: job.lane,
+                    queue_position: job.position,
+                    updated_at: job.updated_at,
+                    updated_ago: 0,
+                };
+            });
+            return { ...prev, [courseId]: { ...current, aiCompleted: false, pendingAssignments: pending } };
+        });
+    };
+
+    // The stream token is only valid for a minute, so a stream the browser gave up on
+    // (e.g. after a server restart) is reopened with a fresh token while the dialog is open.
+    const subscribeJobEvents = async (courseId) => {
+        let source;
+        try {
+            source = await API.markingResults.events(courseId);
+        } catch {
+            return; // live updates are optional; the status fetched on open still shows
+        }
+        if (streamCourseRef.current !== courseId || statusSourceRef.current) {
+            source.close();
+            return;
+        }
+        source.addEventListener("job", (e) => handleJobEvent(courseId, e));
+        source.addEventListener("error", () => {
+            if (source.readyState !== EventSource.CLOSED || statusSourceRef.current !== source) return;
+            statusSourceRef.current = null;
+            setTimeout(() => {
+                if (streamCourseRef.current === courseId && !statusSourceRef.current) subscribeJobEvents(courseId);
+            }, 3000);
+        });
+        statusSourceRef.current = source;
+    };
+
+    const closeJobEvents = () => {
+        streamCourseRef.current = null;
+        if (statusSourceRef.current) {
+            statusSourceRef.current.close();
+            statusSourceRef.current = null;
+        }
+    };
+
     const grouped = useMemo(() => {
         return termCourse.reduce((acc, c) => {
             (acc[c.year_term] ||= []).push(c);
@@ -167,21 +239,18 @@ export default function CoursesPage() {
         }
         // Fetch latest AI status for this course
         fetchCourseStatus(course?._id);
-        // Start polling while dialog is open to keep status fresh
+        // Subscribe to pushed job updates while the dialog is open
         if (course?._id) {
-            if (statusPollId) clearInterval(statusPollId);
-            const id = setInterval(() => fetchCourseStatus(course._id), 5000);
-            setStatusPollId(id);
+            closeJobEvents();
+            streamCourseRef.current = course._id;
+            subscribeJobEvents(course._id);
         }
     };
 
     const closeActions = () => {
         setDialogOpen(false);
         setSelectedCourse(null);
-        if (statusPollId) {
-            clearInterval(statusPollId);
-            setStatusPollId(null);
-        }
+        closeJobEvents();
     };
 
     const goUpload = () => {